@@ -0,0 +1,85 @@
+"""
+Comando de administración que analiza una flota de vehículos desde un
+archivo CSV con las columnas del catálogo, por lotes, y escribe el análisis
+en formato largo y su resumen.
+
+Uso:
+    python manage.py analyze_fleet flota.csv [--output analisis.csv]
+        [--summary resumen.csv] [--chunk-size N] [--workers N]
+        [--decimal SEP]
+"""
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from utils.fleet_analyzer import FleetAnalyzer
+from utils.fuel_prices import FuelPriceTable
+
+
+
+class Command(BaseCommand):
+    """
+    Comando que analiza una flota de vehículos con FleetAnalyzer sin cargar
+    el archivo completo en memoria.
+    """
+    help = ('Analiza una flota de vehículos desde un archivo CSV y escribe '
+            'el análisis en formato largo y su resumen.')
+
+    def add_arguments(self, parser):
+        """
+        Define los argumentos del comando.
+
+        Args:
+            parser (CommandParser): Analizador de argumentos del comando.
+
+        Returns:
+            None
+        """
+        parser.add_argument('path', help='Archivo CSV de la flota.')
+        parser.add_argument('--output',
+                            help='Archivo CSV del análisis en formato largo.')
+        parser.add_argument('--summary',
+                            help='Archivo CSV del resumen. Por defecto se '
+                                 'muestra en la consola.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=FleetAnalyzer.CHUNK_SIZE,
+                            help='Número de vehículos por lote.')
+        parser.add_argument('--workers', type=int,
+                            help='Número de procesos del análisis.')
+        parser.add_argument('--decimal', default=',',
+                            help='Separador decimal del archivo.')
+
+    def handle(self, *args, **options):
+        """
+        Lee la flota por lotes, escribe cada lote del análisis en el archivo
+        de salida y muestra o guarda el resumen.
+
+        Returns:
+            None
+        """
+        fleet = FleetAnalyzer(FuelPriceTable(),
+                              chunk_size=options['chunk_size'],
+                              workers=options['workers'])
+        chunks = pd.read_csv(options['path'], decimal=options['decimal'],
+                             chunksize=fleet.chunk_size)
+
+        # Escribir el encabezado solo con el primer lote
+        written = []
+
+        def write(long_df):
+            long_df.to_csv(options['output'], mode='a' if written else 'w',
+                           header=not written, index=False)
+            written.append(len(long_df))
+
+        with chunks:
+            result = fleet.analyze(chunks,
+                                   write=write if options['output'] else None)
+
+        summary = result['summary']
+        if options['summary']:
+            summary.to_csv(options['summary'], index=False)
+        else:
+            self.stdout.write(summary.to_string(index=False))
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Análisis escrito en {options["output"]}: '
+                f'{sum(written)} filas.'))
@@ -0,0 +1,84 @@
+"""
+Comando de administración que compara el tamaño y el tiempo de
+construcción y serialización de las páginas de resultados de búsqueda en formato de
+registros (una lista de diccionarios serializada por JsonResponse) y en
+formato columnar (VehicleSearcher.search_page_json).
+
+Uso:
+    python manage.py benchmark_search_payload [--page-size N] [--repeat N]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from utils.catalog_store import CatalogStore
+from utils.search_vehicle import VehicleSearcher
+
+
+
+class Command(BaseCommand):
+    """
+    Comando que mide el tamaño y el tiempo de serialización de las páginas
+    de resultados en los dos formatos de respuesta.
+    """
+    help = ('Compara el tamaño y el tiempo de serialización de las páginas '
+            'de resultados en formato de registros y columnar.')
+
+    # Definir las búsquedas que se miden
+    QUERIES = [{},
+               {'brand': 'toyota'},
+               {'q': 'mazda 3 automatico'},
+               {'model_year': 2020}]
+
+    def add_arguments(self, parser):
+        """
+        Define los argumentos del comando.
+
+        Args:
+            parser (CommandParser): Analizador de argumentos del comando.
+
+        Returns:
+            None
+        """
+        parser.add_argument('--page-size', type=int,
+                            default=VehicleSearcher.PAGE_SIZE,
+                            help='Número de vehículos por página.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Número de repeticiones de cada medición.')
+
+    def handle(self, *args, **options):
+        """
+        Serializa la primera página de cada búsqueda de QUERIES en los dos
+        formatos, sin usar la caché de resultados, y muestra el tamaño y el
+        tiempo medio de construir y serializar cada una.
+
+        Returns:
+            None
+        """
+        searcher = VehicleSearcher(CatalogStore(
+            settings.CATALOG_DIR, offline=settings.CATALOG_OFFLINE))
+        page_size = options['page_size']
+        repeat = max(options['repeat'], 1)
+
+        for query in self.QUERIES:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                # Vaciar la caché para medir siempre la serialización
+                searcher.cache.clear()
+                page = searcher.search_page(query, page_size=page_size)
+                records = JsonResponse(page).content
+            records_time = (time.perf_counter() - start) / repeat * 1000
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                searcher.cache.clear()
+                columnar = searcher.search_page_json(query,
+                                                     page_size=page_size)
+            columnar_time = (time.perf_counter() - start) / repeat * 1000
+
+            self.stdout.write(
+                f'{query}: registros {len(records)} bytes en '
+                f'{records_time:.2f} ms, columnar {len(columnar)} bytes en '
+                f'{columnar_time:.2f} ms')
@@ -0,0 +1,90 @@
+"""
+Comando de administración que muestra la memoria que ocupa el catálogo de
+vehículos por columna, antes y después de los tipos compactos, y la memoria
+que queda disponible en la máquina.
+
+Uso:
+    python manage.py catalog_memory [--budget MB]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utils.catalog_store import CatalogStore
+from utils.search_vehicle import VehicleSearcher
+
+
+
+class Command(BaseCommand):
+    """
+    Comando que carga el catálogo local y muestra su informe de memoria.
+    """
+    help = ('Muestra la memoria del catálogo de vehículos por columna y la '
+            'memoria disponible en la máquina.')
+
+    def add_arguments(self, parser):
+        """
+        Define los argumentos del comando.
+
+        Args:
+            parser (CommandParser): Analizador de argumentos del comando.
+
+        Returns:
+            None
+        """
+        parser.add_argument('--budget', type=int,
+                            default=VehicleSearcher.MEMORY_BUDGET // 2 ** 20,
+                            help='Memoria disponible de la máquina en MB.')
+
+    def handle(self, *args, **options):
+        """
+        Carga el catálogo local y muestra la memoria de cada columna, de
+        los índices y del proceso.
+
+        Returns:
+            None
+        """
+        searcher = VehicleSearcher(CatalogStore(
+            settings.CATALOG_DIR, offline=settings.CATALOG_OFFLINE))
+        report = searcher.memory_report(options['budget'] * 2 ** 20)
+
+        self.stdout.write(f'Catálogo versión {report["version"]}')
+        self.stdout.write(f'{"columna":<24}{"tipo":<12}{"antes":>12}'
+                          f'{"después":>12}  mapeada')
+        for column in report['columns']:
+            self.stdout.write(
+                f'{column["name"]:<24}{column["dtype"]:<12}'
+                f'{self._megabytes(column["default_bytes"]):>12}'
+                f'{self._megabytes(column["bytes"]):>12}  '
+                f'{"sí" if column["mapped"] else "no"}')
+
+        total = report['total']
+        self.stdout.write(
+            f'{"total columnas":<36}'
+            f'{self._megabytes(total["default_bytes"]):>12}'
+            f'{self._megabytes(total["bytes"]):>12}')
+        self.stdout.write(
+            f'Índices: {self._megabytes(report["indexes"]["mapped"])} '
+            f'mapeados, {self._megabytes(report["indexes"]["private"])} '
+            'propios del proceso')
+        self.stdout.write(
+            f'Memoria compartida entre workers: '
+            f'{self._megabytes(total["mapped"])}, propia de cada worker: '
+            f'{self._megabytes(total["private"])}')
+        if report['rss'] is not None:
+            self.stdout.write(
+                f'Memoria residente del proceso: '
+                f'{self._megabytes(report["rss"])} de '
+                f'{self._megabytes(report["budget"])} '
+                f'(quedan {self._megabytes(report["remaining"])})')
+
+    def _megabytes(self, size: int) -> str:
+        """
+        Formatea un tamaño en megabytes.
+
+        Args:
+            size (int): Tamaño en bytes.
+
+        Returns:
+            str: Tamaño en megabytes con dos decimales.
+        """
+        return f'{size / 2 ** 20:.2f} MB'
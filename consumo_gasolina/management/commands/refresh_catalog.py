@@ -0,0 +1,41 @@
+"""
+Comando de administración que descarga el catálogo de vehículos y actualiza
+su snapshot local. Se ejecuta durante la construcción de la imagen para que
+los workers arranquen sin acceder a la red.
+
+Uso:
+    python manage.py refresh_catalog
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utils.catalog_store import CatalogStore
+
+
+
+class Command(BaseCommand):
+    """
+    Comando que revalida el snapshot local del catálogo de vehículos contra
+    la fuente remota.
+    """
+    help = 'Descarga el catálogo de vehículos y actualiza su snapshot local.'
+
+    def handle(self, *args, **options):
+        """
+        Revalida el snapshot local del catálogo de vehículos y muestra el
+        resumen de los cambios y de las filas rechazadas.
+
+        Returns:
+            None
+        """
+        store = CatalogStore(settings.CATALOG_DIR)
+        if store.revalidate():
+            self.stdout.write(self.style.SUCCESS('Catálogo actualizado.'))
+            store.load()
+            summary = store.report()['summary']
+            self.stdout.write(
+                'Filas insertadas: {inserted}, actualizadas: {updated}, '
+                'eliminadas: {deleted}, sin cambios: {unchanged}, '
+                'rechazadas: {rejected}.'.format(**summary))
+        else:
+            self.stdout.write('El catálogo local ya está actualizado.')
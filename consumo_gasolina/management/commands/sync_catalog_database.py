@@ -0,0 +1,43 @@
+"""
+Comando de administración que copia la versión del snapshot local del
+catálogo de vehículos al modelo CatalogVehicle, para resolver las búsquedas
+en la base de datos (CATALOG_BACKEND = 'database').
+
+Uso:
+    python manage.py sync_catalog_database
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utils.catalog_database import CatalogDatabase
+from utils.catalog_store import CatalogStore
+
+
+
+class Command(BaseCommand):
+    """
+    Comando que sincroniza el snapshot local del catálogo de vehículos con
+    la base de datos.
+    """
+    help = ('Copia la versión del snapshot local del catálogo de vehículos '
+            'a la base de datos.')
+
+    def handle(self, *args, **options):
+        """
+        Carga el snapshot local del catálogo y guarda su versión en la base
+        de datos si aún no está guardada.
+
+        Returns:
+            None
+        """
+        store = CatalogStore(settings.CATALOG_DIR,
+                             offline=settings.CATALOG_OFFLINE)
+        vehicles = store.load()
+        written = CatalogDatabase().sync(vehicles, store.version)
+        if written:
+            self.stdout.write(self.style.SUCCESS(
+                f'Catálogo versión {store.version} sincronizado: '
+                f'{written} vehículos.'))
+        else:
+            self.stdout.write(f'La versión {store.version} del catálogo ya '
+                              'está en la base de datos.')
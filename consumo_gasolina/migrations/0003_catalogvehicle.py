@@ -0,0 +1,94 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+# Columnas normalizadas con índice de texto completo
+TEXT_COLUMNS = ['marca_norm', 'submarca_norm', 'version_norm']
+
+
+def create_text_indexes(apps, schema_editor):
+    """
+    Crea el índice de texto completo de las columnas normalizadas: una tabla
+    FTS5 de contenido externo con tokenizador de trigramas en SQLite y un
+    índice GIN de trigramas por columna en PostgreSQL. Ambos aceleran las
+    búsquedas de subcadenas.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE consumo_gasolina_catalogvehicle_fts '
+            f'USING fts5({", ".join(TEXT_COLUMNS)}, '
+            "content='consumo_gasolina_catalogvehicle', content_rowid='id', "
+            "tokenize='trigram case_sensitive 1')")
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in TEXT_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX catalog_vehicle_{column}_trgm '
+                'ON consumo_gasolina_catalogvehicle '
+                f'USING gin ({column} gin_trgm_ops)')
+
+
+def drop_text_indexes(apps, schema_editor):
+    """
+    Elimina el índice de texto completo de las columnas normalizadas.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'DROP TABLE IF EXISTS consumo_gasolina_catalogvehicle_fts')
+    elif vendor == 'postgresql':
+        for column in TEXT_COLUMNS:
+            schema_editor.execute(
+                f'DROP INDEX IF EXISTS catalog_vehicle_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumo_gasolina', '0002_alter_vehicle_fuel_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog_version', models.PositiveIntegerField()),
+                ('row', models.PositiveIntegerField()),
+                ('marca', models.CharField(max_length=100)),
+                ('submarca', models.CharField(max_length=100)),
+                ('version', models.CharField(max_length=255)),
+                ('modelo', models.IntegerField(null=True)),
+                ('transmision', models.CharField(max_length=50, null=True)),
+                ('combustible', models.CharField(max_length=50, null=True)),
+                ('categoria', models.CharField(max_length=100, null=True)),
+                ('cilindros', models.IntegerField(null=True)),
+                ('potencia', models.IntegerField(null=True)),
+                ('tamano', models.FloatField(null=True)),
+                ('rendimiento_ciudad', models.FloatField(null=True)),
+                ('rendimiento_carretera', models.FloatField(null=True)),
+                ('rendimiento_combinado', models.FloatField(null=True)),
+                ('co2', models.FloatField(null=True)),
+                ('nox', models.FloatField(null=True)),
+                ('efecto_invernadero', models.IntegerField(null=True)),
+                ('contaminacion_aire', models.CharField(max_length=20, null=True)),
+                ('contaminacion_aire_valor', models.FloatField(null=True)),
+                ('marca_norm', models.CharField(max_length=100)),
+                ('submarca_norm', models.CharField(max_length=100)),
+                ('version_norm', models.CharField(max_length=255)),
+                ('transmision_norm', models.CharField(max_length=50, null=True)),
+                ('combustible_norm', models.CharField(max_length=50, null=True)),
+                ('categoria_norm', models.CharField(max_length=100, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['catalog_version', 'marca_norm', 'submarca_norm'], name='catalog_vehicle_brand'), models.Index(fields=['catalog_version', 'modelo'], name='catalog_vehicle_model_year'), models.Index(fields=['catalog_version', 'combustible_norm'], name='catalog_vehicle_fuel'), models.Index(fields=['catalog_version', 'rendimiento_ciudad'], name='catalog_vehicle_efficiency')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='catalogvehicle',
+            constraint=models.UniqueConstraint(fields=('catalog_version', 'row'), name='catalog_vehicle_version_row'),
+        ),
+        migrations.RunPython(create_text_indexes, drop_text_indexes),
+    ]
@@ -55,4 +55,84 @@ class Route(models.Model):
     date_completed = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"start:{self.start} - end:{self.end} date_c({self.date_created}) date_f({self.date_completed}) start_coords:{self.start_coords} end_coords:{self.end_coords}"
\ No newline at end of file
+        return f"start:{self.start} - end:{self.end} date_c({self.date_created}) date_f({self.date_completed}) start_coords:{self.start_coords} end_coords:{self.end_coords}"
+
+class CatalogVehicle(models.Model):
+    """
+    Modelo para almacenar el catálogo de vehículos en la base de datos, como
+    alternativa a cargarlo completo en memoria en cada proceso. Cada fila
+    guarda una versión del catálogo y su número de fila en ella, de modo que
+    los resultados identifican a los vehículos igual que el catálogo en
+    memoria. Los textos se guardan además normalizados (minúsculas y sin
+    tildes) para filtrarlos con índices.
+
+    Las columnas normalizadas de texto tienen un índice de texto completo
+    que crea la migración según la base de datos: una tabla FTS5 con
+    tokenizador de trigramas en SQLite y un índice GIN de trigramas
+    (pg_trgm) en PostgreSQL.
+
+    Atributos:
+        catalog_version (PositiveIntegerField): Versión del catálogo.
+        row (PositiveIntegerField): Número de fila del vehículo en la versión.
+        marca, submarca, version, transmision, combustible, categoria
+            (CharField): Textos del vehículo tal como aparecen en el catálogo.
+        marca_norm, submarca_norm, version_norm, transmision_norm,
+            combustible_norm, categoria_norm (CharField): Textos
+            normalizados del vehículo.
+        modelo (IntegerField): Año modelo del vehículo.
+        cilindros, potencia, efecto_invernadero (IntegerField): Valores
+            enteros del vehículo.
+        tamano, rendimiento_ciudad, rendimiento_carretera,
+            rendimiento_combinado, co2, nox (FloatField): Valores reales del
+            vehículo.
+        contaminacion_aire (CharField): Calificación de contaminación del
+            aire tal como aparece en el catálogo.
+        contaminacion_aire_valor (FloatField): Calificación de
+            contaminación del aire como número, para filtrarla por rango.
+    """
+    catalog_version = models.PositiveIntegerField()
+    row = models.PositiveIntegerField()
+    marca = models.CharField(max_length=100)
+    submarca = models.CharField(max_length=100)
+    version = models.CharField(max_length=255)
+    modelo = models.IntegerField(null=True)
+    transmision = models.CharField(max_length=50, null=True)
+    combustible = models.CharField(max_length=50, null=True)
+    categoria = models.CharField(max_length=100, null=True)
+    cilindros = models.IntegerField(null=True)
+    potencia = models.IntegerField(null=True)
+    tamano = models.FloatField(null=True)
+    rendimiento_ciudad = models.FloatField(null=True)
+    rendimiento_carretera = models.FloatField(null=True)
+    rendimiento_combinado = models.FloatField(null=True)
+    co2 = models.FloatField(null=True)
+    nox = models.FloatField(null=True)
+    efecto_invernadero = models.IntegerField(null=True)
+    contaminacion_aire = models.CharField(max_length=20, null=True)
+    contaminacion_aire_valor = models.FloatField(null=True)
+    marca_norm = models.CharField(max_length=100)
+    submarca_norm = models.CharField(max_length=100)
+    version_norm = models.CharField(max_length=255)
+    transmision_norm = models.CharField(max_length=50, null=True)
+    combustible_norm = models.CharField(max_length=50, null=True)
+    categoria_norm = models.CharField(max_length=100, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['catalog_version', 'row'],
+                                    name='catalog_vehicle_version_row'),
+        ]
+        indexes = [
+            models.Index(fields=['catalog_version', 'marca_norm',
+                                 'submarca_norm'],
+                         name='catalog_vehicle_brand'),
+            models.Index(fields=['catalog_version', 'modelo'],
+                         name='catalog_vehicle_model_year'),
+            models.Index(fields=['catalog_version', 'combustible_norm'],
+                         name='catalog_vehicle_fuel'),
+            models.Index(fields=['catalog_version', 'rendimiento_ciudad'],
+                         name='catalog_vehicle_efficiency'),
+        ]
+
+    def __str__(self):
+        return f"catalog_version:{self.catalog_version} row:{self.row} marca:{self.marca} submarca:{self.submarca} version:{self.version} modelo:({self.modelo})"
@@ -1,3 +1,1553 @@
-from django.test import TestCase
+import atexit
+import datetime
+import json
+import random
+import tempfile
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from consumo_gasolina import views
+from utils.analyze_vehicles import VehicleAnalyzer
+from utils.autocomplete import PrefixCompleter
+from utils.calculate_cost import CostCalculator
+from utils.catalog_database import CatalogDatabase
+from utils.catalog_ingest import CatalogIngest
+from utils.catalog_store import CatalogStore
+from utils.fleet_analyzer import FleetAnalyzer
+from utils.fuel_prices import FuelPriceTable
+from utils.fuzzy_index import FuzzyIndex
+from utils.ngram_index import NGramIndex
+from utils.query_log import QueryLog
+from utils.range_index import NumericRangeIndex
+from utils.result_cache import ResultCache
+from utils.search_vehicle import VehicleSearcher
+from utils.similarity_index import SimilarityIndex
+from utils.text_utils import normalize_text
+
+
+class ConcurrentEnginesTest(SimpleTestCase):
+    """
+    Prueba de estrés que ejecuta muchas búsquedas, análisis y cálculos de
+    costo en paralelo, mientras otro hilo recarga el catálogo y vacía la
+    caché de resultados, y comprueba que los resultados son idénticos a los
+    de una ejecución secuencial.
+    """
+    # Definir el número de hilos y de repeticiones de cada operación
+    THREADS = 16
+    REPEAT = 20
+
+    # Definir las búsquedas de la prueba
+    QUERIES = [{},
+               {'brand': 'toyota'},
+               {'brand': 'Mazda', 'sub_brand': 'cx'},
+               {'version': 'automático', 'model_year': 2020},
+               {'q': 'mazda 3 2018 gasolina'},
+               {'brand': 'toyta', 'sub_brand': 'corola'},
+               {'ranges': {'rendimiento_ciudad': (15, None),
+                           'potencia': (None, 200)}},
+               {'brand': 'ford', 'filters': {'combustible': 'diesel'}}]
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Genera un catálogo sintético, lo ingiere con CatalogStore desde un
+        archivo local y crea los motores de búsqueda, análisis y costo.
+        """
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        path = Path(cls.directory.name)
+        cls._write_catalog(path / 'catalog.csv')
+        store = CatalogStore(path / 'snapshot',
+                             csv_url=(path / 'catalog.csv').as_uri())
+        store.revalidate()
+        cls.searcher = VehicleSearcher(store)
+        cls.analyzer = VehicleAnalyzer()
+        cls.calculator = CostCalculator()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    @staticmethod
+    def _write_catalog(path: Path, size: int = 3000):
+        """
+        Escribe un CSV sintético con el formato del catálogo de vehículos.
+        """
+        rng = np.random.default_rng(0)
+        brands = {'Toyota': ['Corolla', 'Yaris', 'Hilux'],
+                  'Mazda': ['Mazda 3', 'CX-5', 'CX-30'],
+                  'Ford': ['Fiesta', 'Ranger', 'Escape'],
+                  'Kia': ['Picanto', 'Rio', 'Sportage']}
+        marca = rng.choice(list(brands), size)
+        vehicles = pd.DataFrame({
+            'marca': marca,
+            'submarca': [rng.choice(brands[brand]) for brand in marca],
+            'version': rng.choice(['LE', 'XLE Automático', 'Sport',
+                                   'GT Line', 'Básico Mecánico'], size),
+            'modelo': rng.integers(2012, 2024, size),
+            'transmision': rng.choice(['A', 'M', 'CVT'], size),
+            'combustible': rng.choice(['Gasolina', 'Diesel'], size),
+            'categoria': rng.choice(['Compactos', 'SUV', 'Pick-up'], size),
+            'cilindros': rng.choice([3, 4, 6, 8], size),
+            'potencia': rng.integers(60, 400, size),
+            'tamano': np.round(rng.uniform(1, 5, size), 1),
+            'rendimiento_ciudad': np.round(rng.uniform(5, 25, size), 2),
+            'rendimiento_carretera': np.round(rng.uniform(8, 30, size), 2),
+            'rendimiento_combinado': np.round(rng.uniform(6, 27, size), 2),
+            'co2': rng.integers(90, 350, size),
+            'nox': np.round(rng.uniform(0.001, 0.05, size), 4),
+            'efecto_invernadero': rng.integers(1, 11, size),
+            'contaminacion_aire': rng.choice(['1', '5', '8', '10', '?'],
+                                             size)})
+        vehicles.to_csv(path, index=False, decimal=',')
+
+    def _operations(self) -> list:
+        """
+        Obtiene las operaciones de la prueba como tuplas con su nombre y
+        sus argumentos.
+        """
+        operations = []
+        for position, query in enumerate(self.QUERIES):
+            operations.append(('search', position))
+            operations.append(('page', position))
+            operations.append(('analyze', position))
+        for row in (0, 10, 500, 2999):
+            operations.append(('similar', row))
+        for fuel_type in self.calculator.prices.fuels:
+            operations.append(('cost', fuel_type))
+        return operations
+
+    def _run(self, operation: tuple):
+        """
+        Ejecuta una operación y devuelve su resultado serializado.
+        """
+        name, argument = operation
+        if name == 'search':
+            return self.searcher.search(self.QUERIES[argument]).to_json()
+        if name == 'page':
+            return self.searcher.search_page_json(self.QUERIES[argument])
+        if name == 'analyze':
+            vehicles = self.searcher.search_page(
+                self.QUERIES[argument], page_size=5)['vehicles']
+            return self.analyzer.analyze(vehicles).to_json()
+        if name == 'similar':
+            return repr(self.searcher.similar(argument, 5,
+                                              better_efficiency=True))
+        return repr(self.calculator.calculate(
+            {'start_address': 'Bogotá',
+             'end_address': 'Medellín',
+             'fuel_type': argument,
+             'fuel_efficiency': 12.5}))
+
+    def test_parallel_results_match_sequential(self):
+        """
+        Los resultados en paralelo son idénticos a los secuenciales.
+        """
+        operations = self._operations()
+        with mock.patch.object(CostCalculator, '_calculate_distance',
+                               return_value=415.0):
+            expected = {operation: self._run(operation)
+                        for operation in operations}
+
+            tasks = operations * self.REPEAT
+            random.Random(0).shuffle(tasks)
+
+            # Recargar el catálogo y vaciar la caché mientras se busca
+            stop = threading.Event()
+
+            def reload():
+                while not stop.is_set():
+                    self.searcher.reload()
+                    self.searcher.cache.clear()
+
+            reloader = threading.Thread(target=reload)
+            reloader.start()
+            try:
+                with ThreadPoolExecutor(self.THREADS) as executor:
+                    results = list(executor.map(self._run, tasks))
+            finally:
+                stop.set()
+                reloader.join()
+
+        for operation, result in zip(tasks, results):
+            self.assertEqual(result, expected[operation], operation)
+
+    def test_catalog_indexes_are_read_only(self):
+        """
+        Los arreglos de los índices del catálogo publicado no se pueden
+        modificar.
+        """
+        catalog = self.searcher.catalog
+        with self.assertRaises(ValueError):
+            catalog.efficiency[0] = 0
+        with self.assertRaises(ValueError):
+            catalog.range_indexes['potencia'].order[0] = 0
+
+
+class CatalogDeltaTest(SimpleTestCase):
+    """
+    Prueba que aplicar una nueva revisión del catálogo como cambios sobre
+    la versión anterior produce el mismo catálogo que una ingesta completa.
+    """
+    # Definir el número de filas eliminadas, actualizadas e insertadas
+    DELETED = 40
+    UPDATED = 25
+    INSERTED = 30
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = Path(self.directory.name)
+
+    def _store(self, name: str, csv: str) -> CatalogStore:
+        return CatalogStore(self.path / name,
+                            csv_url=(self.path / csv).as_uri())
+
+    def _write_revision(self):
+        """
+        Escribe la segunda revisión del catálogo: elimina, actualiza e
+        inserta filas y cambia el orden de las restantes.
+        """
+        vehicles = pd.read_csv(self.path / 'catalog.csv', decimal=',')
+        rng = np.random.default_rng(1)
+        rows = rng.permutation(len(vehicles))
+        deleted = rows[:self.DELETED]
+        updated = rows[self.DELETED:self.DELETED + self.UPDATED]
+
+        vehicles.loc[updated, 'rendimiento_combinado'] += 1
+        inserted = vehicles.iloc[rows[-self.INSERTED:]].copy()
+        inserted['version'] = [f'Nueva {number}'
+                               for number in range(self.INSERTED)]
+        vehicles = pd.concat([vehicles.drop(index=deleted), inserted])
+        vehicles = vehicles.sample(frac=1, random_state=2)
+        vehicles.to_csv(self.path / 'revision.csv', index=False,
+                        decimal=',')
+
+    def _sorted(self, vehicles: pd.DataFrame) -> pd.DataFrame:
+        return vehicles.astype(str).sort_values(
+            list(vehicles.columns)).reset_index(drop=True)
+
+    def test_delta_matches_full_ingest(self):
+        """
+        El informe cuenta los cambios, cada permutación guardada ordena su
+        columna y el catálogo resultante es igual al de una ingesta
+        completa de la misma revisión.
+        """
+        ConcurrentEnginesTest._write_catalog(self.path / 'catalog.csv')
+        store = self._store('snapshot', 'catalog.csv')
+        self.assertTrue(store.revalidate())
+        store.load()
+        self.assertEqual(store.report()['summary']['inserted'], 3000)
+
+        # Aplicar la segunda revisión sobre la primera
+        self._write_revision()
+        store.csv_url = (self.path / 'revision.csv').as_uri()
+        self.assertTrue(store.revalidate())
+        vehicles = store.load()
+        self.assertEqual(store.version, 2)
+        self.assertEqual(store.report()['summary'],
+                         {'inserted': self.INSERTED,
+                          'updated': self.UPDATED,
+                          'deleted': self.DELETED,
+                          'unchanged': 3000 - self.DELETED - self.UPDATED,
+                          'rejected': 0})
+
+        orders = sorted(store.snapshot_path.glob('*.order.npy'))
+        self.assertTrue(orders)
+        for path in orders:
+            column = path.name[:-len('.order.npy')]
+            with self.subTest(column=column):
+                values = np.load(store.snapshot_path / f'{column}.npy')
+                order = np.load(path)
+                present = values >= 0 if values.dtype.kind in 'iu' \
+                    else ~pd.isna(values)
+                self.assertEqual(sorted(order), list(np.flatnonzero(present)))
+                self.assertTrue(np.all(values[order][1:]
+                                       >= values[order][:-1]))
+
+        # Comparar con una ingesta completa de la misma revisión
+        fresh = self._store('fresh', 'revision.csv')
+        self.assertTrue(fresh.revalidate())
+        pd.testing.assert_frame_equal(self._sorted(vehicles),
+                                      self._sorted(fresh.load()))
+
+        delta_searcher = VehicleSearcher(store)
+        fresh_searcher = VehicleSearcher(fresh)
+        for query in ConcurrentEnginesTest.QUERIES + [{'version': 'nueva'}]:
+            with self.subTest(query=query):
+                self.assertEqual(self._results(delta_searcher, query),
+                                 self._results(fresh_searcher, query))
+
+    def _results(self, searcher: VehicleSearcher, query: dict) -> tuple:
+        """
+        Recorre todas las páginas de una búsqueda y devuelve sus facetas y
+        sus vehículos sin los números de fila, que dependen del orden en
+        que se guardó cada versión.
+        """
+        page = searcher.search_page(query)
+        facets = page['facets']
+        vehicles = []
+        while True:
+            vehicles.extend(sorted((key, str(value))
+                                   for key, value in vehicle.items()
+                                   if key not in ('id', 'row'))
+                            for vehicle in page['vehicles'])
+            if page['next_cursor'] is None:
+                break
+            page = searcher.search_page(query, cursor=page['next_cursor'])
+        return facets, sorted(vehicles)
+
+
+class CatalogDatabaseTest(TestCase):
+    """
+    Prueba que las búsquedas resueltas en la base de datos devuelven los
+    mismos resultados que las búsquedas en memoria.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Genera un catálogo sintético y crea un buscador en memoria. El
+        buscador que usa la base de datos se crea en cada prueba.
+        """
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        path = Path(cls.directory.name)
+        ConcurrentEnginesTest._write_catalog(path / 'catalog.csv')
+        store = CatalogStore(path / 'snapshot',
+                             csv_url=(path / 'catalog.csv').as_uri())
+        store.revalidate()
+        cls.store = store
+        cls.memory = VehicleSearcher(store)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        # Recordar las versiones sincronizadas solo dentro de cada prueba,
+        # porque la base de datos se restaura al terminarla
+        self.database = CatalogDatabase()
+        self.searcher = VehicleSearcher(self.store, database=self.database)
+
+    def test_database_results_match_memory(self):
+        """
+        Los resultados de la base de datos son iguales a los de memoria.
+        """
+        self.assertEqual(
+            self.database.sync(self.memory.vehicles, self.memory.version),
+            len(self.memory.vehicles))
+        self.assertEqual(
+            self.database.sync(self.memory.vehicles, self.memory.version), 0)
+
+        queries = ConcurrentEnginesTest.QUERIES + [
+            {'brand': 'yo'},
+            {'sub_brand': 'cx-5', 'model_year': 2015},
+            {'ranges': {'contaminacion_aire': (5, 8)}, 'brand': 'kia'},
+            {'brand': 'a*b'}]
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.searcher.search(query).to_json(),
+                                 self.memory.search(query).to_json())
+
+    def test_database_pages_match_memory(self):
+        """
+        La primera página de search_page() se resuelve en la base de datos
+        con los mismos vehículos, facetas y cursor que en memoria, y la
+        siguiente página se pide en memoria con ese cursor.
+        """
+        self.database.sync(self.memory.vehicles, self.memory.version)
+        self.searcher.cache.clear()
+        self.memory.cache.clear()
+
+        queries = ConcurrentEnginesTest.QUERIES + [
+            {'sub_brand': 'cx-5', 'model_year': 2015},
+            {'ranges': {'co2': (None, 120)}}]
+        with mock.patch.object(self.searcher, '_match_rows',
+                               wraps=self.searcher._match_rows) as spy:
+            for query in queries:
+                with self.subTest(query=query):
+                    page = self.searcher.search_page(query, page_size=7)
+                    self.assertEqual(
+                        page, self.memory.search_page(query, page_size=7))
+                    self.assertEqual(
+                        self.searcher.search_page_json(query, page_size=7),
+                        self.memory.search_page_json(query, page_size=7))
+        # Solo la búsqueda difusa se resuelve en memoria
+        self.assertEqual({call.kwargs.get('fuzzy', False)
+                          for call in spy.call_args_list}, {False, True})
+        self.assertEqual(len(spy.call_args_list), 4)
+
+        query = {'brand': 'toyota'}
+        page = self.searcher.search_page(query, page_size=7)
+        self.assertEqual(
+            self.searcher.search_page(query, page['next_cursor'], 7),
+            self.memory.search_page(query, page['next_cursor'], 7))
+
+    def test_missing_version_is_remembered(self):
+        """
+        Una versión que aún no está en la base de datos se consulta una
+        vez cada CHECK_INTERVAL segundos.
+        """
+        database = CatalogDatabase()
+        with mock.patch('utils.catalog_database.time.monotonic',
+                        return_value=1000.0) as monotonic, \
+                self.assertNumQueries(1):
+            self.assertFalse(database.contains(99))
+            self.assertFalse(database.contains(99))
+            monotonic.return_value += database.CHECK_INTERVAL - 1
+            self.assertFalse(database.contains(99))
+        with mock.patch('utils.catalog_database.time.monotonic',
+                        return_value=1000.0 + database.CHECK_INTERVAL), \
+                self.assertNumQueries(1):
+            self.assertFalse(database.contains(99))
+
+
+class FleetAnalyzerTest(SimpleTestCase):
+    """
+    Prueba que el análisis de flotas por lotes y en varios procesos da el
+    mismo resultado que el análisis en un solo lote.
+    """
+
+    def test_chunked_analysis_matches_single_chunk(self):
+        """
+        Los lotes en paralelo dan el mismo análisis y el mismo resumen.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'fleet.csv'
+            ConcurrentEnginesTest._write_catalog(path)
+            vehicles = pd.read_csv(path, decimal=',')
+
+        expected = FleetAnalyzer(chunk_size=len(vehicles),
+                                 workers=1).analyze(vehicles)
+        fleet = FleetAnalyzer(chunk_size=250, workers=2)
+        result = fleet.analyze(vehicles.to_dict('records'))
+        pd.testing.assert_frame_equal(result['vehicles'],
+                                      expected['vehicles'])
+        pd.testing.assert_frame_equal(result['summary'],
+                                      expected['summary'])
+
+        summary = result['summary'].set_index('caracteristica')
+        co2 = vehicles['co2'] * VehicleAnalyzer.KILOMETROS_ANUALES / 1000
+        self.assertAlmostEqual(summary.loc['co2_anual_kg', 'total'],
+                               co2.sum())
+        self.assertAlmostEqual(summary.loc['co2_anual_kg', 'p50'],
+                               co2.median())
+        self.assertEqual(summary.loc['co2_anual_kg', 'mejor'],
+                         co2.idxmin())
+
+
+class SimilarityIndexTest(SimpleTestCase):
+    """
+    Prueba que los vecinos del árbol k-d coinciden con los de calcular la
+    distancia a todos los vehículos, también cuando hay pocas filas
+    permitidas.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Construye el índice con características aleatorias.
+        """
+        super().setUpClass()
+        rng = np.random.default_rng(1)
+        cls.features = pd.DataFrame(rng.normal(size=(5000, 4)),
+                                    columns=['a', 'b', 'c', 'd'])
+        cls.index = SimilarityIndex(cls.features)
+        cls.efficiency = cls.features['a'].to_numpy()
+
+    def _expected(self, row: int, k: int, allowed: np.ndarray) -> tuple:
+        """
+        Calcula los k vecinos permitidos con la distancia a todas las filas.
+        """
+        points = self.index.tree.data
+        distances = np.sqrt(((points - points[row]) ** 2).sum(axis=1))
+        candidates = np.flatnonzero(allowed)
+        candidates = candidates[candidates != row]
+        order = np.lexsort((candidates, distances[candidates]))[:k]
+        return candidates[order], distances[candidates][order]
+
+    def test_neighbors_match_brute_force(self):
+        """
+        Los vecinos con y sin filas permitidas son los más cercanos.
+        """
+        everything = np.ones(len(self.features), dtype=bool)
+        for row in (0, 17, 2500):
+            for allowed in (None, self.efficiency > self.efficiency[row]):
+                rows, distances = self.index.neighbors(row, 10, allowed)
+                expected_rows, expected_distances = self._expected(
+                    row, 10, everything if allowed is None else allowed)
+                self.assertEqual(set(rows), set(expected_rows))
+                np.testing.assert_allclose(distances, expected_distances)
+
+    def test_most_efficient_vehicles(self):
+        """
+        Los vehículos más eficientes devuelven solo los que los superan.
+        """
+        ranking = np.argsort(self.efficiency)
+        top, third = int(ranking[-1]), int(ranking[-3])
+
+        rows, distances = self.index.neighbors(
+            top, 10, self.efficiency > self.efficiency[top])
+        self.assertEqual(len(rows), 0)
+        self.assertEqual(len(distances), 0)
+
+        allowed = self.efficiency > self.efficiency[third]
+        rows, _ = self.index.neighbors(third, 10, allowed)
+        self.assertEqual(sorted(rows), sorted(ranking[-2:]))
+
+        # Recorrer el árbol aunque haya menos filas permitidas que k
+        with mock.patch.object(SimilarityIndex, 'DIRECT_SIZE', 0):
+            rows, distances = self.index.neighbors(third, 10, allowed)
+        self.assertEqual(sorted(rows), sorted(ranking[-2:]))
+        np.testing.assert_allclose(distances,
+                                   self._expected(third, 10, allowed)[1])
+
+
+class ResultCacheTest(SimpleTestCase):
+    """
+    Prueba el desalojo LRU, la caducidad por TTL y los contadores de la
+    caché de resultados.
+    """
+
+    def test_lru_eviction_and_counters(self):
+        """
+        Se desaloja la entrada usada hace más tiempo.
+        """
+        cache = ResultCache(max_size=2, ttl=None)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'size': 2,
+                                         'max_size': 2,
+                                         'hits': 3,
+                                         'misses': 1,
+                                         'evictions': 1,
+                                         'expirations': 0})
+
+    def test_ttl_expiration(self):
+        """
+        Las entradas más antiguas que el TTL se descartan al consultarlas.
+        """
+        cache = ResultCache(max_size=4, ttl=60)
+        with mock.patch('utils.result_cache.time.monotonic',
+                        return_value=1000.0) as monotonic:
+            cache.put('a', 1)
+            monotonic.return_value = 1060.0
+            self.assertEqual(cache.get('a'), 1)
+            self.assertIn('a', cache)
+            monotonic.return_value = 1060.5
+            self.assertNotIn('a', cache)
+            self.assertIsNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses'],
+                          stats['expirations']), (0, 1, 1, 1))
+
+    def test_empty_cache_is_shared(self):
+        """
+        Una caché vacía recibida en el constructor se usa, aunque su
+        longitud sea cero.
+        """
+        cache = ResultCache(max_size=4)
+        with tempfile.TemporaryDirectory() as directory:
+            store = CatalogStore(directory, offline=True)
+            self.assertIs(VehicleSearcher(store, cache=cache).cache, cache)
+
+
+class SyntheticCatalogTestCase(SimpleTestCase):
+    """
+    Clase base de las pruebas que buscan en el catálogo sintético de
+    ConcurrentEnginesTest, ingerido con CatalogStore desde un archivo local.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Genera el catálogo sintético y crea el buscador.
+        """
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        path = Path(cls.directory.name)
+        ConcurrentEnginesTest._write_catalog(path / 'catalog.csv')
+        cls.store = CatalogStore(path / 'snapshot',
+                                 csv_url=(path / 'catalog.csv').as_uri())
+        cls.store.revalidate()
+        cls.searcher = VehicleSearcher(cls.store)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def _facet_total(self, query: dict) -> int:
+        """
+        Cuenta los vehículos encontrados por una búsqueda con sus facetas.
+        """
+        facets = self.searcher.search_page(query)['facets']
+        return sum(facet['count'] for facet in facets['combustible'])
+
+
+class NGramIndexTest(SyntheticCatalogTestCase):
+    """
+    Prueba que el índice de n-gramas encuentra las mismas filas que
+    comparar la subcadena con cada valor de la columna.
+    """
+
+    def test_substring_rows_match_scan(self):
+        """
+        Las filas de cada subcadena son las que la contienen.
+        """
+        column = pd.Series(['XLE Automático', 'GT Line', None, 'LE',
+                            'Básico Mecánico', 'GT Line'],
+                           dtype='category')
+        index = NGramIndex(column)
+        expected = {'line': [1, 5],
+                    'le': [0, 3],
+                    'e a': [0],
+                    'mecan': [4],
+                    'xyz': [],
+                    'linea': [],
+                    '': [0, 1, 2, 3, 4, 5]}
+        for text, rows in expected.items():
+            with self.subTest(text=text):
+                self.assertEqual(index.search(text).tolist(), rows)
+                self.assertEqual(
+                    index.contains(np.arange(len(column)), text).tolist(),
+                    [row in rows for row in range(len(column))])
+
+    def test_substring_inside_version(self):
+        """
+        Una subcadena dentro de la versión encuentra todos sus vehículos.
+        """
+        versions = self.searcher.vehicles['version'].astype(str)
+        for text in ('line', 'e aut', 'sic'):
+            with self.subTest(text=text):
+                expected = versions.str.lower().str.contains(text).sum()
+                self.assertGreater(expected, 0)
+                self.assertEqual(self._facet_total({'version': text}),
+                                 expected)
+
+
+class TextFoldingTest(SyntheticCatalogTestCase):
+    """
+    Prueba que las búsquedas de texto no distinguen mayúsculas, minúsculas
+    ni tildes.
+    """
+
+    def test_normalize_text(self):
+        """
+        El texto normalizado está en minúsculas y sin tildes.
+        """
+        self.assertEqual(normalize_text('Automático'), 'automatico')
+        self.assertEqual(normalize_text('BÁSICO Mecánico'), 'basico mecanico')
+        self.assertEqual(normalize_text('Ñandú'), 'nandu')
+
+    def test_accent_and_case_insensitive_search(self):
+        """
+        'automatico' y 'AUTOMÁTICO' encuentran las versiones 'Automático'.
+        """
+        versions = self.searcher.vehicles['version'].astype(str)
+        expected = (versions == 'XLE Automático').sum()
+        for text in ('automatico', 'AUTOMÁTICO', 'Automático'):
+            with self.subTest(text=text):
+                result = self.searcher.search({'version': text})
+                self.assertEqual(set(result['version']), {'XLE Automático'})
+                self.assertEqual(self._facet_total({'version': text}),
+                                 expected)
+        self.assertEqual(self._facet_total({'brand': 'TOYOTA'}),
+                         self._facet_total({'brand': 'toyota'}))
+
+
+class FuzzySearchTest(SyntheticCatalogTestCase):
+    """
+    Prueba que las búsquedas con errores de escritura encuentran los
+    vehículos con los textos parecidos.
+    """
+
+    def test_fuzzy_index_match(self):
+        """
+        Los valores más parecidos a la consulta tienen mayor similitud.
+        """
+        index = FuzzyIndex(np.array(['toyota', 'corolla', 'mazda 3',
+                                     'cx-5']))
+        codes, similarity = index.match('Toyta')
+        self.assertEqual(codes[np.argmax(similarity)], 0)
+        codes, _ = index.match('qwerty')
+        self.assertEqual(len(codes), 0)
+
+    def test_search_page_falls_back_to_fuzzy(self):
+        """
+        'Toyta Corola' encuentra los Toyota Corolla con search_page().
+        """
+        query = {'brand': 'toyta', 'sub_brand': 'corola'}
+        vehicles = self.searcher.search_page(query)['vehicles']
+        self.assertEqual(len(vehicles), self.searcher.PAGE_SIZE)
+        self.assertEqual({(vehicle['marca'], vehicle['submarca'])
+                          for vehicle in vehicles},
+                         {('Toyota', 'Corolla')})
+
+    def test_search_requires_fuzzy(self):
+        """
+        search() solo encuentra vehículos parecidos con fuzzy=True.
+        """
+        query = {'brand': 'toyta', 'sub_brand': 'corola'}
+        self.assertEqual(len(self.searcher.search(query)), 0)
+        result = self.searcher.search(query, fuzzy=True)
+        self.assertEqual(set(zip(result['marca'], result['submarca'])),
+                         {('Toyota', 'Corolla')})
+
+
+class QueryParserTest(SyntheticCatalogTestCase):
+    """
+    Prueba la asignación de las palabras de una búsqueda de texto libre a
+    los criterios de búsqueda.
+    """
+
+    def test_parse_routes_tokens(self):
+        """
+        El año, la marca, la submarca y la versión se reconocen.
+        """
+        parser = self.searcher.catalog.parser
+        self.assertEqual(parser.parse('mazda 3 2020 automático'),
+                         {'brand': '',
+                          'sub_brand': 'mazda 3',
+                          'version': 'automatico',
+                          'model_year': 2020,
+                          'filters': {}})
+        self.assertEqual(parser.parse('Toyota Corolla 2018 diesel'),
+                         {'brand': 'toyota',
+                          'sub_brand': 'corolla',
+                          'version': '',
+                          'model_year': 2018,
+                          'filters': {'combustible': 'diesel'}})
+
+        vehicles = self.searcher.search_page(
+            {'q': 'mazda 3 2020 automático'})['vehicles']
+        self.assertTrue(vehicles)
+        self.assertEqual({(vehicle['marca'], vehicle['submarca'],
+                           vehicle['modelo'], vehicle['version'])
+                          for vehicle in vehicles},
+                         {('Mazda', 'Mazda 3', 2020, 'XLE Automático')})
+
+    def test_parse_unknown_tokens(self):
+        """
+        Las palabras desconocidas van a la columna más parecida o a la
+        versión, y los años fuera del catálogo no son el año modelo.
+        """
+        parser = self.searcher.catalog.parser
+        result = parser.parse('toyta zzzq 1990 2015')
+        self.assertEqual(result['brand'], 'toyta')
+        self.assertEqual(result['version'], 'zzzq 1990')
+        self.assertEqual(result['model_year'], 2015)
+        self.assertEqual(parser.parse('')['model_year'], None)
+
+
+class NumericRangeIndexTest(SyntheticCatalogTestCase):
+    """
+    Prueba los filtros por rango con límites float32, rangos abiertos y
+    valores nulos.
+    """
+
+    def test_float32_bounds_and_nulls(self):
+        """
+        Los límites coinciden con los valores float32 guardados y los
+        valores nulos no cumplen ningún rango.
+        """
+        column = np.array([24.73, 10.5, np.nan, 30.0, 24.73, np.nan],
+                          dtype=np.float32)
+        index = NumericRangeIndex(column)
+        self.assertEqual(index.search(24.73, 24.73).tolist(), [0, 4])
+        self.assertEqual(index.search(10.5, 24.73).tolist(), [0, 1, 4])
+        self.assertEqual(index.search(low=24.73).tolist(), [0, 3, 4])
+        self.assertEqual(index.search(high=24.72).tolist(), [1])
+        self.assertEqual(index.search().tolist(), [0, 1, 3, 4])
+        self.assertEqual(index.search(31, None).tolist(), [])
+
+        texts = NumericRangeIndex(pd.Series(['1', '?', '10', None, '5']))
+        self.assertEqual(texts.search(1, 5).tolist(), [0, 4])
+        self.assertEqual(texts.search().tolist(), [0, 2, 4])
+
+    def test_bounds_outside_dtype_range(self):
+        """
+        Los límites que no caben en el tipo de la columna se recortan sin
+        desbordarse.
+        """
+        column = np.array([1.5, -2.0, 3.25, np.nan], dtype=np.float32)
+        index = NumericRangeIndex(column)
+        integers = NumericRangeIndex(np.array([5, -3, 120], dtype=np.int8))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            self.assertEqual(index.search(-1e40, 1e40).tolist(), [0, 1, 2])
+            self.assertEqual(index.search(high=-1e40).tolist(), [])
+            self.assertEqual(index.search(low=1e40).tolist(), [])
+            self.assertEqual(index.search(-np.inf, np.inf).tolist(),
+                             [0, 1, 2])
+            self.assertEqual(integers.search(-1e40, 1e40).tolist(),
+                             [0, 1, 2])
+            self.assertEqual(integers.search(low=1e5).tolist(), [])
+            self.assertEqual(
+                self._facet_total({'ranges': {'co2': (None, '1e40')}}),
+                len(self.searcher.vehicles))
+
+    def test_form_range_keys(self):
+        """
+        Los límites '<columna>_min' y '<columna>_max' del formulario
+        filtran los vehículos.
+        """
+        query = QueryDict('form-rendimiento_combinado_min=15,5'
+                          '&form-co2_max=200&form-brand=')
+        converted = self.searcher._querydict_to_dict(query)
+        self.assertEqual(converted['rendimiento_combinado_min'], '15,5')
+        self.assertEqual(converted['co2_max'], '200')
+        self.assertNotIn('co2_min', converted)
+
+        vehicles = self.searcher.vehicles
+        expected = ((vehicles['rendimiento_combinado'].astype(str)
+                     .astype(float) >= 15.5)
+                    & (vehicles['co2'] <= 200)).sum()
+        self.assertGreater(expected, 0)
+        self.assertEqual(self._facet_total(query), expected)
+        for vehicle in self.searcher.search_page(query)['vehicles']:
+            self.assertGreaterEqual(vehicle['rendimiento_combinado'], 15.5)
+            self.assertLessEqual(vehicle['co2'], 200)
+
+
+class SearchPaginationTest(SyntheticCatalogTestCase):
+    """
+    Prueba que las páginas de resultados recorren todos los vehículos de
+    una búsqueda sin repetirlos ni saltarlos, y que los cursores no válidos
+    se rechazan.
+    """
+
+    def _rows(self, page: dict) -> list:
+        """
+        Obtiene los números de fila de los vehículos de una página.
+        """
+        return [vehicle['row'] for vehicle in page['vehicles']]
+
+    def test_pages_are_continuous(self):
+        """
+        Las páginas juntas son la misma lista que una sola página grande.
+        """
+        query = {'brand': 'toyota'}
+        total = self._facet_total(query)
+        rows, cursor = [], None
+        while True:
+            page = self.searcher.search_page(query, cursor, page_size=50)
+            rows.extend(self._rows(page))
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(rows), total)
+        self.assertEqual(len(set(rows)), total)
+        self.assertEqual(
+            rows, self._rows(self.searcher.search_page(query,
+                                                       page_size=total)))
+
+    def test_invalid_cursors(self):
+        """
+        Un cursor mal formado o de otra búsqueda produce ValueError.
+        """
+        cursor = self.searcher.search_page({'brand': 'toyota'},
+                                           page_size=5)['next_cursor']
+        for bad in ('no-es-un-cursor', 'e30=', cursor[:-4]):
+            with self.subTest(cursor=bad):
+                with self.assertRaises(ValueError):
+                    self.searcher.search_page({'brand': 'toyota'}, bad)
+        with self.assertRaises(ValueError):
+            self.searcher.search_page({'brand': 'mazda'}, cursor)
+
+    def test_view_rejects_invalid_cursor(self):
+        """
+        La vista de búsqueda responde 400 a un cursor no válido.
+        """
+        with mock.patch.object(views, 'SEARCHER', self.searcher), \
+                mock.patch.object(views, 'QUERY_LOG', QueryLog()):
+            response = self.client.post(reverse('search_vehicles'),
+                                        {'form-brand': 'toyota'})
+            self.assertEqual(response.status_code, 200)
+            cursor = json.loads(response.content)['next_cursor']
+            response = self.client.post(reverse('search_vehicles'),
+                                        {'form-brand': 'toyota',
+                                         'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post(reverse('search_vehicles'),
+                                        {'form-brand': 'mazda',
+                                         'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', json.loads(response.content))
+
+
+class SearchBatchTest(SyntheticCatalogTestCase):
+    """
+    Prueba que la búsqueda por lotes devuelve lo mismo que cada búsqueda
+    por separado y que la vista rechaza los lotes no válidos.
+    """
+    # Definir las búsquedas del lote, con una repetida y una difusa
+    QUERIES = ConcurrentEnginesTest.QUERIES + [
+        {'brand': 'toyota'},
+        {'brand': 'toyta', 'sub_brand': 'corola'},
+        {'brand': 'xyz'}]
+
+    def test_batch_matches_search_page(self):
+        """
+        Cada resultado del lote tiene los vehículos de search_page().
+        """
+        self.searcher.cache.clear()
+        batch = json.loads(self.searcher.search_batch(self.QUERIES, k=7))
+        self.assertEqual(len(batch['results']), len(self.QUERIES))
+        row = batch['columns'].index('row')
+        for query, result in zip(self.QUERIES, batch['results']):
+            with self.subTest(query=query):
+                page = self.searcher.search_page(query, page_size=7)
+                self.assertEqual(result['values'][row],
+                                 [vehicle['row']
+                                  for vehicle in page['vehicles']])
+                self.assertEqual(result['total'],
+                                 sum(facet['count'] for facet
+                                     in page['facets']['combustible']))
+
+    def test_view_rejects_invalid_bodies(self):
+        """
+        La vista responde 400 a los lotes mal formados o demasiado grandes.
+        """
+        url = reverse('search_vehicles_batch')
+        bodies = ['no es JSON',
+                  json.dumps({'k': 5}),
+                  json.dumps({'queries': {'brand': 'toyota'}}),
+                  json.dumps({'queries': ['toyota']}),
+                  json.dumps({'queries': [{}], 'k': 'muchos'}),
+                  json.dumps({'queries': [{}] * (self.searcher.BATCH_SIZE
+                                                 + 1)})]
+        with mock.patch.object(views, 'SEARCHER', self.searcher):
+            response = self.client.post(
+                url, json.dumps({'queries': self.QUERIES[:2], 'k': 100}),
+                content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Server-Timing', response)
+            result = json.loads(response.content)['results'][0]
+            self.assertEqual(len(result['values'][0]), 50)
+
+            for body in bodies:
+                with self.subTest(body=body[:40]):
+                    response = self.client.post(
+                        url, body, content_type='application/json')
+                    self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.client.get(url).status_code, 405)
+
+
+class QueryLogTest(SyntheticCatalogTestCase):
+    """
+    Prueba el registro de búsquedas en disco y la precarga de la caché a
+    partir de sus búsquedas más frecuentes.
+    """
+    def setUp(self):
+        self.log_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.log_directory.cleanup)
+        self.path = Path(self.log_directory.name) / 'queries.jsonl'
+
+    def _log(self, size: int = None) -> QueryLog:
+        log = QueryLog(self.path, size=size)
+        # Evitar que atexit escriba en el directorio ya eliminado
+        self.addCleanup(atexit.unregister, log.flush)
+        return log
+
+    def _lines(self) -> list:
+        return self.path.read_text(encoding='utf-8').splitlines()
+
+    def test_reload_from_disk(self):
+        """
+        Las búsquedas guardadas se recuperan al crear otro registro.
+        """
+        log = self._log()
+        for brand in ['toyota', 'mazda', 'toyota']:
+            log.record('records', {'brand': brand})
+        log.record('json', {'brand': 'toyota'})
+        log.flush()
+        self.assertEqual(len(self._lines()), 4)
+
+        reloaded = self._log()
+        self.assertEqual(len(reloaded), 4)
+        self.assertEqual(reloaded.top(), log.top())
+        self.assertEqual(reloaded.top(1),
+                         [('records', {'brand': 'toyota'}, 2)])
+
+    def test_ring_eviction(self):
+        """
+        El registro solo cuenta las size búsquedas más recientes.
+        """
+        log = self._log(size=3)
+        for brand in ['ford', 'ford', 'kia', 'mazda', 'kia']:
+            log.record('records', {'brand': brand})
+        self.assertEqual(len(log), 3)
+        self.assertEqual(sorted((query['brand'], count)
+                                for _, query, count in log.top()),
+                         [('kia', 2), ('mazda', 1)])
+
+    def test_compaction(self):
+        """
+        El archivo se reescribe con las size búsquedas más recientes al
+        superar el doble de size líneas.
+        """
+        log = self._log(size=3)
+        with mock.patch.object(QueryLog, 'FLUSH_SIZE', 1):
+            for year in range(2010, 2016):
+                log.record('records', {'model_year': year})
+            self.assertEqual(len(self._lines()), 6)
+            log.record('records', {'model_year': 2016})
+        self.assertEqual([json.loads(line)[1]['model_year']
+                          for line in self._lines()], [2014, 2015, 2016])
+        self.assertFalse(list(self.path.parent.glob('.tmp-*')))
+
+        reloaded = self._log(size=3)
+        self.assertEqual(reloaded.top(), log.top())
+
+    def test_corrupt_lines_are_skipped(self):
+        """
+        Las líneas incompletas o no válidas del archivo se descartan.
+        """
+        self.path.write_text('["records",{"brand":"kia"}]\n'
+                             'no es JSON\n'
+                             '["records"]\n'
+                             '\n'
+                             '"x"\n'
+                             '"ab"\n'
+                             '[1]\n'
+                             '[1,2]\n'
+                             '["records",[]]\n'
+                             '[null,{"brand":"kia"}]\n'
+                             '["json",{"brand":"ford"}]\n'
+                             '["records",{"bra', encoding='utf-8')
+        log = self._log()
+        self.assertEqual(len(log), 2)
+        self.assertEqual(sorted(kind for kind, _, _ in log.top()),
+                         ['json', 'records'])
+        self.assertEqual(self.searcher.warm_up(log.top()), 2)
+
+    def test_compaction_blocks_other_writers(self):
+        """
+        Otro registro sobre el mismo archivo espera a que termine la
+        reescritura para añadir sus búsquedas, que no se pierden.
+        """
+        log = self._log(size=2)
+        other = self._log(size=2)
+        other.record('records', {'brand': 'kia'})
+        compact = log._compact
+        writers = []
+
+        def compact_while_writing():
+            # Intentar escribir desde otro hilo durante la reescritura
+            writer = threading.Thread(target=other.flush)
+            writer.start()
+            writers.append(writer)
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+            compact()
+
+        with mock.patch.object(QueryLog, 'FLUSH_SIZE', 1), \
+                mock.patch.object(log, '_compact', compact_while_writing):
+            for year in range(2015, 2020):
+                log.record('records', {'model_year': year})
+        self.assertEqual(len(writers), 1)
+        writers[0].join()
+        self.assertEqual([json.loads(line)[1] for line in self._lines()],
+                         [{'model_year': 2018}, {'model_year': 2019},
+                          {'brand': 'kia'}])
+
+    def test_warm_up_fills_cache(self):
+        """
+        warm_up() guarda en la caché las búsquedas del registro, y buscarlas
+        después no vuelve a calcularlas.
+        """
+        log = self._log()
+        queries = [{'brand': 'Toyota'}, {'sub_brand': 'mazda 3'},
+                   {'brand': 'kia', 'combustible': 'Diesel'}]
+        for query in queries:
+            log.record('records', self.searcher.replayable_query(query))
+        log.record('json', self.searcher.replayable_query(queries[0]))
+        log.flush()
+
+        self.searcher.cache.clear()
+        warmed = self.searcher.warm_up(self._log().top())
+        self.assertEqual(warmed, 4)
+        stats = self.searcher.cache.stats()
+        self.assertGreaterEqual(stats['size'], 4)
+
+        for query in queries:
+            self.searcher.search_page(query)
+        self.searcher.search_page_json(queries[0])
+        after = self.searcher.cache.stats()
+        self.assertEqual(after['misses'], stats['misses'])
+        self.assertEqual(after['hits'], stats['hits'] + 4)
+
+
+class SelectionTest(SyntheticCatalogTestCase, TestCase):
+    """
+    Prueba la selección de vehículos por número de fila, el análisis en
+    caché de la selección y las vistas que la guardan en la sesión y la
+    analizan.
+    """
+    def setUp(self):
+        self.catalog = self.searcher.catalog
+        self.rows = np.flatnonzero(self.catalog.complete)[[5, 40, 7, 900]]
+        self.analyzer = VehicleAnalyzer(cache=ResultCache(16))
+
+    def _table(self, analysis: pd.DataFrame) -> list:
+        return [(label, list(values)) for label, values
+                in zip(analysis.index, analysis.to_numpy().tolist())]
+
+    def test_selection_rejects_invalid_rows(self):
+        """
+        La selección rechaza demasiadas filas, filas inexistentes y filas
+        de otra versión del catálogo.
+        """
+        size = self.searcher.SELECTION_SIZE
+        version = self.searcher.version
+        selected = self.searcher.selection(self.rows.tolist(), version)
+        self.assertEqual(selected['rows'].tolist(), self.rows.tolist())
+        self.assertEqual([vehicle['row'] for vehicle in selected['vehicles']],
+                         self.rows.tolist())
+        self.assertIs(selected['catalog'], self.catalog)
+
+        invalid = [(list(range(size + 1)), version),
+                   ([-1], version),
+                   ([len(self.catalog)], version),
+                   (self.rows.tolist(), version + 1)]
+        for rows, row_version in invalid:
+            with self.subTest(rows=rows[:3], version=row_version):
+                with self.assertRaises(ValueError):
+                    self.searcher.selection(rows, row_version)
+
+        with mock.patch.object(views, 'SEARCHER', self.searcher):
+            self.assertEqual(views._selection('3', ['4', 5]),
+                             {'version': 3, 'rows': [4, 5]})
+            self.assertEqual(views._selection(None, []),
+                             {'version': None, 'rows': []})
+            for version, rows in [(1, list(range(size + 1))), (1, '4'),
+                                  (1, ['a']), ('v1', [4])]:
+                with self.subTest(version=version, rows=rows):
+                    with self.assertRaises(ValueError):
+                        views._selection(version, rows)
+            with self.assertRaises(TypeError):
+                views._selection(None, [4])
+
+    def test_analysis_table_reorders_cached_table(self):
+        """
+        Una selección en otro orden reutiliza la tabla guardada y solo
+        reordena sus columnas.
+        """
+        table = self.analyzer.analysis_table(self.catalog, self.rows)
+        self.assertEqual(table['columns'], list(range(len(self.rows))))
+        self.assertEqual(table['rows'], self._table(
+            self.analyzer.analyze_rows(self.catalog, self.rows)))
+        stats = self.analyzer.cache.stats()
+
+        permuted = self.rows[[2, 0, 3, 1]]
+        with mock.patch.object(self.analyzer, '_analyze_selected',
+                               wraps=self.analyzer._analyze_selected) as spy:
+            table = self.analyzer.analysis_table(self.catalog, permuted)
+        spy.assert_not_called()
+        self.assertEqual(self.analyzer.cache.stats()['hits'],
+                         stats['hits'] + 1)
+        self.assertEqual(table['rows'], self._table(
+            self.analyzer.analyze_rows(self.catalog, permuted)))
+
+    def test_cache_key_changes_with_prices(self):
+        """
+        La tabla guardada no se reutiliza si cambian los precios del
+        combustible.
+        """
+        prices = [(fuel, date, price * 2)
+                  for fuel, date, price in FuelPriceTable.PRICES]
+        expensive = VehicleAnalyzer(FuelPriceTable(prices),
+                                    cache=self.analyzer.cache)
+        cheap = self.analyzer.analysis_table(self.catalog, self.rows)
+        misses = self.analyzer.cache.stats()['misses']
+
+        table = expensive.analysis_table(self.catalog, self.rows)
+        self.assertEqual(self.analyzer.cache.stats()['misses'], misses + 1)
+        self.assertNotEqual(table['rows'], cheap['rows'])
+        self.assertEqual(table['rows'], self._table(
+            expensive.analyze_rows(self.catalog, self.rows)))
+
+    def test_selection_views(self):
+        """
+        Los vehículos guardados en la sesión se analizan en la página de
+        comparación, y las selecciones no válidas se rechazan.
+        """
+        version = self.searcher.version
+        with mock.patch.object(views, 'SEARCHER', self.searcher), \
+                mock.patch.object(views, 'ANALYZER', self.analyzer):
+            response = self.client.post(
+                reverse('get_selected_vehicles'),
+                json.dumps({'version': version,
+                            'rows': self.rows.tolist()}),
+                content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.session['selected_vehicles'],
+                             {'version': version,
+                              'rows': self.rows.tolist()})
+
+            response = self.client.get(reverse('analyze_selected_vehicles'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([vehicle['row'] for vehicle
+                              in response.context['selected_vehicles']],
+                             self.rows.tolist())
+            self.assertEqual(
+                response.context['analysis_vehicles'],
+                self.analyzer.analysis_table(self.catalog, self.rows))
+
+            # Las filas de otra versión del catálogo muestran un error
+            response = self.client.post(
+                reverse('update_selected_vehicles'),
+                {'version': version + 1, 'rows[]': self.rows.tolist()})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('analyze_selected_vehicles'))
+            self.assertEqual(response.context['errorMessage'],
+                             'El catálogo cambió; repita la búsqueda')
+
+            bodies = ['no es JSON',
+                      json.dumps({'version': version}),
+                      json.dumps({'version': version, 'rows': 4}),
+                      json.dumps({'rows': [4]}),
+                      json.dumps({'version': version, 'rows': list(range(
+                          self.searcher.SELECTION_SIZE + 1))})]
+            for body in bodies:
+                with self.subTest(body=body[:40]):
+                    response = self.client.post(
+                        reverse('get_selected_vehicles'), body,
+                        content_type='application/json')
+                    self.assertEqual(response.status_code, 400)
+
+
+class AutocompleteTest(SyntheticCatalogTestCase):
+    """
+    Prueba el autocompletado por prefijo y la vista que lo expone.
+    """
+    def setUp(self):
+        self.completer = PrefixCompleter(
+            ['XLE Automático', 'Automático', 'Sport', 'Auto Sport',
+             'GT Line', 'Básico Mecánico'],
+            [5, 7, 9, 7, 2, 1])
+
+    def test_word_start_and_accent_folding(self):
+        """
+        Un prefijo encuentra los valores con una palabra que empieza por
+        él, sin distinguir mayúsculas ni acentos.
+        """
+        expected = [('Auto Sport', 7), ('Automático', 7),
+                    ('XLE Automático', 5)]
+        for prefix in ['auto', 'AUTO', ' Autó', 'áuto']:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(self.completer.complete(prefix), expected)
+        self.assertEqual(self.completer.complete('automatico m'), [])
+        self.assertEqual(self.completer.complete('mecanico'),
+                         [('Básico Mecánico', 1)])
+        self.assertEqual(self.completer.complete('omat'), [])
+        self.assertEqual(self.completer.complete('zz'), [])
+
+    def test_popularity_order_and_limit(self):
+        """
+        Las sugerencias se ordenan por popularidad, los empates por valor,
+        y solo se devuelven las limit más populares.
+        """
+        self.assertEqual([value for value, _ in self.completer.complete('')],
+                         ['Sport', 'Auto Sport', 'Automático',
+                          'XLE Automático', 'GT Line', 'Básico Mecánico'])
+        self.assertEqual(self.completer.complete('', limit=3),
+                         [('Sport', 9), ('Auto Sport', 7),
+                          ('Automático', 7)])
+        self.assertEqual(self.completer.complete('sport', limit=1),
+                         [('Sport', 9)])
+
+    def test_view(self):
+        """
+        La vista limita el número de sugerencias entre 1 y 50 y rechaza
+        los campos desconocidos.
+        """
+        url = reverse('autocomplete_vehicles')
+        with mock.patch.object(views, 'SEARCHER', self.searcher), \
+                mock.patch.object(self.searcher, 'autocomplete',
+                                  wraps=self.searcher.autocomplete) as spy:
+            response = self.client.get(url, {'field': 'sub_brand',
+                                             'q': 'cx'})
+            self.assertEqual(response.status_code, 200)
+            suggestions = response.json()['suggestions']
+            self.assertEqual(sorted(item['value'] for item in suggestions),
+                             ['CX-30', 'CX-5'])
+            self.assertEqual(sum(item['count'] for item in suggestions),
+                             self._facet_total({'sub_brand': 'cx'}))
+
+            for limit, expected in [('500', 50), ('0', 1), ('-3', 1),
+                                    ('muchas', 10), ('2', 2)]:
+                with self.subTest(limit=limit):
+                    response = self.client.get(url, {'field': 'brand',
+                                                     'q': '',
+                                                     'limit': limit})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(spy.call_args.args[2], expected)
+                    self.assertLessEqual(
+                        len(response.json()['suggestions']), expected)
+
+            for field in ['', 'combustible', 'marca']:
+                with self.subTest(field=field):
+                    response = self.client.get(url, {'field': field,
+                                                     'q': 'a'})
+                    self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.client.post(url).status_code, 405)
+
+
+class CompactCatalogTest(SyntheticCatalogTestCase):
+    """
+    Prueba los tipos compactos de las columnas numéricas del catálogo y el
+    informe de memoria.
+    """
+    def _content(self, **changes) -> bytes:
+        """
+        Obtiene las 20 primeras filas del CSV sintético, con los valores de
+        las columnas indicadas reemplazados.
+        """
+        vehicles = pd.read_csv(Path(self.directory.name) / 'catalog.csv',
+                               dtype=str, nrows=20)
+        for column, value in changes.items():
+            vehicles.loc[3, column] = value
+        return vehicles.to_csv(index=False).encode('utf-8')
+
+    def test_compact_dtypes(self):
+        """
+        Las columnas numéricas se guardan con los tipos de COMPACT_SCHEMA.
+        """
+        vehicles = self.store.load()
+        for column, dtype in CatalogIngest.COMPACT_SCHEMA.items():
+            with self.subTest(column=column):
+                self.assertEqual(vehicles[column].dtype, np.dtype(dtype))
+        self.assertEqual(
+            {str(vehicles[column].dtype)
+             for column in CatalogIngest.COMPACT_SCHEMA},
+            {'int8', 'int16', 'float32'})
+
+    def test_nulls_and_out_of_range(self):
+        """
+        Una columna entera con nulos se guarda como float32 y una columna
+        fuera del rango del tipo compacto conserva su tipo.
+        """
+        ingest = CatalogIngest()
+        vehicles, rejected = ingest.parse(self._content(cilindros=None,
+                                                        potencia='40000'))
+        self.assertEqual(rejected, [])
+        self.assertEqual(vehicles['cilindros'].dtype, np.float32)
+        self.assertTrue(np.isnan(vehicles.loc[3, 'cilindros']))
+        self.assertEqual(vehicles['cilindros'].isna().sum(), 1)
+        self.assertEqual(vehicles['potencia'].dtype, np.int64)
+        self.assertEqual(vehicles.loc[3, 'potencia'], 40000)
+        self.assertEqual(vehicles['modelo'].dtype, np.int16)
+
+        vehicles = CatalogIngest(compact_schema={'co2': 'int8'}).compact(
+            pd.DataFrame({'co2': np.array([90, 350], dtype=np.int64)}))
+        self.assertEqual(vehicles['co2'].dtype, np.int64)
+
+    def test_memory_report(self):
+        """
+        El informe de memoria suma los bytes de cada columna con sus tipos
+        compactos y con los tipos por defecto.
+        """
+        catalog = self.searcher.catalog
+        report = self.searcher.memory_report(budget=2 ** 40)
+        size = len(catalog)
+        columns = {column['name']: column for column in report['columns']}
+        self.assertEqual(list(columns), list(catalog.vehicles.columns))
+
+        for name, itemsize in [('modelo', 2), ('cilindros', 1),
+                               ('rendimiento_ciudad', 4)]:
+            with self.subTest(column=name):
+                self.assertEqual(columns[name]['bytes'], size * itemsize)
+                self.assertEqual(columns[name]['default_bytes'], size * 8)
+                self.assertTrue(columns[name]['mapped'])
+        marca = catalog.vehicles['marca']
+        self.assertEqual(columns['marca']['bytes'],
+                         marca.memory_usage(deep=True, index=False))
+        self.assertEqual(columns['marca']['default_bytes'],
+                         marca.astype(object).memory_usage(deep=True,
+                                                           index=False))
+        self.assertLess(columns['marca']['bytes'],
+                        columns['marca']['default_bytes'])
+
+        total = report['total']
+        self.assertEqual(total['bytes'], sum(column['bytes']
+                                             for column in columns.values()))
+        self.assertEqual(total['default_bytes'],
+                         sum(column['default_bytes']
+                             for column in columns.values()))
+        self.assertLess(total['bytes'], total['default_bytes'])
+        self.assertEqual(report['version'], self.searcher.version)
+        self.assertEqual(report['budget'], 2 ** 40)
+        self.assertEqual(report['remaining'], 2 ** 40 - report['rss'])
+
+
+class FuelPriceTableTest(SimpleTestCase):
+    """
+    Prueba la selección del precio vigente de cada combustible por fecha.
+    """
+    def setUp(self):
+        self.table = FuelPriceTable([
+            ('Gasolina', datetime.date(2024, 1, 1), 3950),
+            ('gasolina ', datetime.date(2024, 6, 1), 4100),
+            ('DIÉSEL', datetime.date(2024, 3, 1), 2650)])
+
+    def test_price_by_effective_date(self):
+        """
+        Cada precio rige desde su fecha hasta la del siguiente precio del
+        mismo combustible.
+        """
+        cases = [(datetime.date(2023, 12, 31), KeyError),
+                 (datetime.date(2024, 1, 1), 3950),
+                 (datetime.date(2024, 5, 31), 3950),
+                 (datetime.date(2024, 6, 1), 4100),
+                 (datetime.date(2030, 1, 1), 4100)]
+        for date, expected in cases:
+            with self.subTest(date=date):
+                if expected is KeyError:
+                    with self.assertRaises(KeyError):
+                        self.table.price('gasolina', date)
+                else:
+                    self.assertEqual(self.table.price('gasolina', date),
+                                     expected)
+        with self.assertRaises(KeyError):
+            self.table.price('diesel', datetime.date(2024, 2, 29))
+
+    def test_fuel_names_are_normalized(self):
+        """
+        Los tipos de combustible se comparan sin mayúsculas, acentos ni
+        espacios sobrantes.
+        """
+        self.assertEqual(self.table.fuels, ['diesel', 'gasolina'])
+        date = datetime.date(2024, 6, 1)
+        for fuel in ['Diesel', ' diésel', 'DIESEL']:
+            with self.subTest(fuel=fuel):
+                self.assertEqual(self.table.price(fuel, date), 2650)
+        with self.assertRaises(KeyError):
+            self.table.price('eléctrico', date)
+
+    def test_prices_per_vehicle(self):
+        """
+        prices() devuelve el precio de cada vehículo y el valor de missing
+        para los combustibles sin precio, también en columnas categóricas.
+        """
+        date = datetime.date(2024, 2, 1)
+        fuels = ['Gasolina', 'Diesel', 'Eléctrico', None, 'GASOLINA']
+        expected = [3950, -1, -1, -1, 3950]
+        np.testing.assert_array_equal(
+            self.table.prices(fuels, date, missing=-1), expected)
+        np.testing.assert_array_equal(
+            self.table.prices(pd.Series(fuels, dtype='category'), date,
+                              missing=-1), expected)
+        np.testing.assert_array_equal(
+            self.table.prices(fuels, datetime.date(2024, 3, 1)),
+            [3950, 2650, 0, 0, 3950])
+
+    def test_version_changes_with_effective_prices(self):
+        """
+        La versión de los precios solo cambia cuando entra en vigencia un
+        precio nuevo.
+        """
+        version = self.table.version
+        self.assertEqual(version(datetime.date(2024, 1, 1)),
+                         version(datetime.date(2024, 2, 15)))
+        self.assertNotEqual(version(datetime.date(2024, 2, 29)),
+                            version(datetime.date(2024, 3, 1)))
+        self.assertNotEqual(version(datetime.date(2024, 5, 31)),
+                            version(datetime.date(2024, 6, 1)))
+        self.assertEqual(version(datetime.date(2024, 6, 1)),
+                         version(datetime.date(2030, 1, 1)))
+
+
+class SimilarVehiclesViewTest(SyntheticCatalogTestCase):
+    """
+    Prueba la vista que devuelve los vehículos más parecidos a uno de los
+    resultados de búsqueda.
+    """
+    ROW = 10
+
+    def _get(self, **params):
+        with mock.patch.object(views, 'SEARCHER', self.searcher):
+            return self.client.get(reverse('similar_vehicles'), params)
+
+    def test_similar_vehicles(self):
+        """
+        La vista devuelve los SIMILAR_SIZE vehículos más parecidos, sin el
+        vehículo de referencia, del más al menos parecido.
+        """
+        response = self._get(row=self.ROW, version=self.searcher.version)
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result['version'], self.searcher.version)
+        vehicles = result['vehicles']
+        self.assertEqual(len(vehicles), self.searcher.SIMILAR_SIZE)
+        self.assertNotIn(self.ROW, [vehicle['row'] for vehicle in vehicles])
+        distances = [vehicle['distance'] for vehicle in vehicles]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_invalid_parameters(self):
+        """
+        Las filas no válidas y las de otra versión del catálogo se
+        rechazan.
+        """
+        size = len(self.searcher.catalog)
+        for params in [{}, {'row': 'abc'}, {'row': '1.5'}, {'row': -1},
+                       {'row': size}, {'row': self.ROW, 'k': 'muchos'},
+                       {'row': self.ROW, 'version': 'v1'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self._get(**params).status_code, 400)
+
+        response = self._get(row=self.ROW, version=self.searcher.version + 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'],
+                         'El catálogo cambió; repita la búsqueda')
+        with mock.patch.object(views, 'SEARCHER', self.searcher):
+            response = self.client.post(reverse('similar_vehicles'),
+                                        {'row': self.ROW})
+        self.assertEqual(response.status_code, 405)
+
+    def test_k_is_clamped(self):
+        """
+        El número de vehículos se limita entre 1 y 50.
+        """
+        for k, expected in [('500', 50), ('0', 1), ('-4', 1), ('3', 3)]:
+            with self.subTest(k=k):
+                response = self._get(row=self.ROW, k=k)
+                self.assertEqual(len(response.json()['vehicles']), expected)
+
+    def test_better_efficiency(self):
+        """
+        Con better solo se devuelven vehículos con mayor rendimiento en
+        ciudad que el de referencia.
+        """
+        reference = self.searcher.catalog.efficiency[self.ROW]
+        similar = self._get(row=self.ROW, k=50).json()['vehicles']
+        self.assertTrue(any(vehicle['rendimiento_ciudad'] <= reference
+                            for vehicle in similar))
+
+        for better in ['1', 'true', 'on']:
+            with self.subTest(better=better):
+                vehicles = self._get(row=self.ROW, k=50,
+                                     better=better).json()['vehicles']
+                self.assertEqual(len(vehicles), 50)
+                self.assertTrue(all(vehicle['rendimiento_ciudad'] > reference
+                                    for vehicle in vehicles))
+        vehicles = self._get(row=self.ROW, k=50, better='0').json()['vehicles']
+        self.assertEqual(vehicles, similar)
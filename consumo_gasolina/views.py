@@ -1,16 +1,20 @@
 # Importa los módulos para el funcionamiento de las vistas de Django
 import base64
 import json
+import threading
+import time
 from datetime import timezone
 from io import BytesIO
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.csrf import csrf_exempt
 
 # Importa los modelos y formularios personalizados
 from consumo_gasolina.models import Route, Vehicle
@@ -28,21 +32,46 @@ from flutasapp.forms import (
 # Importa la clases de utils para buscar y analizar vehículos
 from utils.analyze_vehicles import VehicleAnalyzer
 from utils.calculate_cost import CostCalculator
+from utils.catalog_database import CatalogDatabase
+from utils.catalog_store import CatalogStore
 from utils.draw_graphs import Drawer
+from utils.fuel_prices import FuelPriceTable
 from utils.geo_utils import GeoUtils
+from utils.query_log import QueryLog
 from utils.search_vehicle import VehicleSearcher
 
 # Importa la función para enviar correos electrónicos
 from .courier import send_password_reset_email
 
+# Crea una instancia de CatalogStore para cargar el snapshot local del dataset
+CATALOG_STORE = CatalogStore(settings.CATALOG_DIR,
+                             offline=settings.CATALOG_OFFLINE)
+
+# Crea una instancia de FuelPriceTable con los precios del combustible que 
+# comparten el análisis de vehículos, sus estimaciones precalculadas en el
+# catálogo y el cálculo del costo de las rutas
+FUEL_PRICES = FuelPriceTable()
+
+# Crea una instancia de CatalogDatabase si las búsquedas se resuelven en la
+# base de datos
+CATALOG_DATABASE = None
+if settings.CATALOG_BACKEND == 'database':
+    CATALOG_DATABASE = CatalogDatabase()
+
 # Crea una instancia de VehicleSearcher para buscar vehículos en el dataset
-SEARCHER = VehicleSearcher()
+SEARCHER = VehicleSearcher(store=CATALOG_STORE, database=CATALOG_DATABASE,
+                           prices=FUEL_PRICES)
+
+# Crea una instancia de QueryLog para registrar las búsquedas y precargar las
+# más frecuentes en la caché de resultados al arrancar el worker
+QUERY_LOG = QueryLog(settings.QUERY_LOG_PATH)
+SEARCHER.warm_up(QUERY_LOG.top())
 
 # Crea una instancia de VehicleAnalyzer para analizar la info de los vehículos
-ANALYZER = VehicleAnalyzer()
+ANALYZER = VehicleAnalyzer(prices=FUEL_PRICES)
 
 # Crea una instancia de CostCalculator para calcular el costo de combustible
-CALCULATOR = CostCalculator()
+CALCULATOR = CostCalculator(prices=FUEL_PRICES)
 
 # Crea una instancia de GeoUtils para geocodificar direcciones
 GEOUTILS = GeoUtils()
@@ -50,6 +79,9 @@ GEOUTILS = GeoUtils()
 # Crear una instancia de Drawer para dibujar gráficas
 DRAWER = Drawer()
 
+# Evitar que dos hilos del worker dibujen a la vez con pyplot
+PLOT_LOCK = threading.Lock()
+
 
 
 # Create your views here.
@@ -68,8 +100,9 @@ def search(request):
         form = VehicleSearchForm(request.POST)
         if form.is_valid():
             # Buscar vehículos en el dataset con el objeto VehicleSearcher
-            vehicles = SEARCHER.search(
-                query=form.cleaned_data).to_dict(orient='records')
+            vehicles = SEARCHER.search_records(query=form.cleaned_data)
+            QUERY_LOG.record('records', 
+                             SEARCHER.replayable_query(form.cleaned_data))
                                     
             # Renderizar la página de inicio con los resultados de la búsqueda
             return render(
@@ -79,7 +112,8 @@ def search(request):
         form = VehicleSearchForm()
         
         # Renderizar una búsqueda vacía
-        vehicles = SEARCHER.search(query={}).to_dict(orient='records')
+        vehicles = SEARCHER.search_records(query={})
+        QUERY_LOG.record('records', SEARCHER.replayable_query({}))
     return render(request, 'search.html', {'form': form, 'vehicles': vehicles})
 
 
@@ -281,25 +315,140 @@ def search_vehicles(request):
     """
     Vista que maneja las solicitudes de búsqueda de vehículos para mostrarlas
     en la página de comparación de vehículos sin necesidad de recargar la 
-    página.
+    página. Si la solicitud incluye el parámetro 'cursor' se devuelve la 
+    página de resultados siguiente a ese cursor. Los vehículos se devuelven
+    en formato columnar (ver VehicleSearcher.search_page_json) y el tiempo 
+    de la búsqueda se indica en la cabecera Server-Timing.
     
     Args:
         request (HttpRequest): Solicitud HTTP que se recibe desde el cliente.
         
     Returns:
-        JsonResponse: Respuesta JSON que contiene los vehículos encontrados."""
+        HttpResponse: Respuesta JSON que contiene los vehículos encontrados
+        y el cursor de la siguiente página."""
     if request.method == 'POST':
-        # Procesar los datos del formulario de búsqueda
-        print(request.POST)
+        start = time.perf_counter()
+        cursor = request.POST.get('cursor') or None
+        try:
+            payload = SEARCHER.search_page_json(query=request.POST, 
+                                                cursor=cursor)
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
         
-        vehicles = SEARCHER.search(query=request.POST).to_dict(orient='records')
-        print(vehicles)
-        # Devolver los resultados en formato JSON
-        return JsonResponse({'vehicles': vehicles})
+        # Registrar las búsquedas nuevas, que son las que se precargan
+        if cursor is None:
+            QUERY_LOG.record('json', SEARCHER.replayable_query(request.POST))
+        
+        # Devolver los resultados ya serializados en formato JSON
+        response = HttpResponse(payload, content_type='application/json')
+        response['Server-Timing'] = 'search;dur={:.2f}'.format(
+            (time.perf_counter() - start) * 1000)
+        return response
     else:
         # Manejar el caso en que la solicitud no sea POST
         return JsonResponse({'error': 'Método de solicitud no permitido'}, status=405)
 
+# La búsqueda por lotes solo lee el catálogo y la usan integraciones sin 
+# sesión, por lo que no requiere el token CSRF
+@csrf_exempt
+def search_vehicles_batch(request):
+    """
+    Vista que resuelve varias búsquedas de vehículos en una sola solicitud,
+    por ejemplo para identificar los vehículos de una hoja de cálculo de la
+    flota. El cuerpo de la solicitud es un objeto JSON con la lista de 
+    búsquedas ('queries'), cada una con los mismos criterios que acepta 
+    VehicleSearcher.search, y el número de vehículos por búsqueda ('k'). 
+    El tiempo de las búsquedas se indica en la cabecera Server-Timing.
+    
+    Args:
+        request (HttpRequest): Solicitud HTTP que se recibe desde el cliente.
+        
+    Returns:
+        HttpResponse: Respuesta JSON que contiene los vehículos encontrados
+        por cada búsqueda (ver VehicleSearcher.search_batch).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método de solicitud no permitido'}, status=405)
+    
+    start = time.perf_counter()
+    try:
+        data = json.loads(request.body)
+        queries = data['queries']
+        k = min(max(int(data.get('k', SEARCHER.PAGE_SIZE)), 1), 50)
+        if not isinstance(queries, list):
+            raise ValueError('Las búsquedas deben ser una lista')
+        payload = SEARCHER.search_batch(queries, k)
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        return JsonResponse({'error': f'Solicitud no válida: {error}'}, 
+                            status=400)
+    
+    response = HttpResponse(payload, content_type='application/json')
+    response['Server-Timing'] = 'search;dur={:.2f}'.format(
+        (time.perf_counter() - start) * 1000)
+    return response
+
+def autocomplete_vehicles(request):
+    """
+    Vista que sugiere valores de marca, submarca o versión a partir del 
+    prefijo escrito en los campos de la página de comparación.
+    
+    Args:
+        request (HttpRequest): Solicitud HTTP que se recibe desde el cliente.
+            Los parámetros 'field', 'q' y 'limit' indican el criterio, el 
+            prefijo y el número máximo de sugerencias.
+        
+    Returns:
+        JsonResponse: Respuesta JSON que contiene las sugerencias.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método de solicitud no permitido'}, status=405)
+    
+    field = request.GET.get('field', '')
+    prefix = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        limit = 10
+    
+    try:
+        suggestions = SEARCHER.autocomplete(field, prefix, max(limit, 1))
+    except KeyError:
+        return JsonResponse({'error': 'Campo no válido'}, status=400)
+    return JsonResponse({'field': field, 'suggestions': suggestions})
+
+def similar_vehicles(request):
+    """
+    Vista que devuelve los vehículos más parecidos a un vehículo de los 
+    resultados de búsqueda de la página de comparación.
+    
+    Args:
+        request (HttpRequest): Solicitud HTTP que se recibe desde el cliente.
+            Los parámetros 'row' y 'version' identifican al vehículo en el 
+            catálogo, 'k' indica el número de vehículos y 'better' pide 
+            solo vehículos con mayor rendimiento.
+        
+    Returns:
+        JsonResponse: Respuesta JSON que contiene los vehículos similares.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método de solicitud no permitido'}, status=405)
+    
+    try:
+        row = int(request.GET.get('row', ''))
+        version = request.GET.get('version')
+        version = int(version) if version else None
+        k = min(max(int(request.GET.get('k', SEARCHER.SIMILAR_SIZE)), 1), 50)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros no válidos'}, status=400)
+    better = request.GET.get('better') in ('1', 'true', 'on')
+    
+    try:
+        result = SEARCHER.similar(row, k, better_efficiency=better, 
+                                  version=version)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(result)
+
 def compare_vehicles(request):
     """
     Vista para la página de comparación de vehículos.
@@ -319,9 +468,40 @@ def compare_vehicles(request):
         form = VehicleSearchForm(prefix='form')
         return render(request, 'compare.html', {'form': form})
 
+def _selection(version, rows) -> dict:
+    """
+    Convierte la versión del catálogo y los números de fila de los 
+    vehículos seleccionados en la selección que se guarda en la sesión. 
+    Solo se guardan los números de fila, que son mucho más pequeños que 
+    los registros de los vehículos.
+    
+    Args:
+        version (int | str): Versión del catálogo de las filas.
+        rows (list): Números de fila de los vehículos seleccionados.
+        
+    Returns:
+        dict: Un diccionario con la versión ('version'), o None si no hay 
+        filas, y las filas ('rows') como enteros.
+        
+    Raises:
+        ValueError: Si la versión o alguna fila no es un entero o si hay 
+            más de VehicleSearcher.SELECTION_SIZE filas.
+        TypeError: Si hay filas y no se indica la versión.
+    """
+    if not isinstance(rows, list):
+        raise ValueError('Las filas deben ser una lista')
+    if len(rows) > SEARCHER.SELECTION_SIZE:
+        raise ValueError('Demasiados vehículos seleccionados')
+    
+    # Las selecciones vacías no dependen de ninguna versión del catálogo
+    rows = [int(row) for row in rows]
+    return {'version': int(version) if rows else None, 'rows': rows}
+
 def get_selected_vehicles(request):
     """
     Función que guarda los vehículos seleccionados por el usuario en la sesión.
+    El cuerpo de la solicitud es un objeto JSON con la versión del catálogo
+    ('version') y los números de fila de los vehículos ('rows').
     
     Args:
         request (HttpRequest): Solicitud HTTP que se recibe desde el cliente.
@@ -333,11 +513,15 @@ def get_selected_vehicles(request):
         # Intenta cargar los datos JSON de la solicitud
         try:
             data = json.loads(request.body)
+            selection = _selection(data.get('version'), data['rows'])
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return JsonResponse({'error': f'Solicitud no válida: {error}'}, 
+                                status=400)
         
-        # Guarda los datos en la sesión del usuario
-        request.session['selected_vehicles'] = data
+        # Guarda la selección en la sesión del usuario
+        request.session['selected_vehicles'] = selection
         request.session.save()
         
         # Redirige directamente a la página de análisis
@@ -355,8 +539,13 @@ def update_selected_vehicles(request):
         JsonResponse: Respuesta JSON que indica si la operación fue exitosa.
     """
     if request.method == 'POST':
-        selected_vehicles = request.POST.getlist('selected_vehicles[]')
-        request.session['selected_vehicles'] = selected_vehicles
+        try:
+            selection = _selection(request.POST.get('version'),
+                                   request.POST.getlist('rows[]'))
+        except (ValueError, TypeError) as error:
+            return JsonResponse({'error': f'Solicitud no válida: {error}'}, 
+                                status=400)
+        request.session['selected_vehicles'] = selection
         return JsonResponse({'success': True})
     return JsonResponse({'error': 'Método de solicitud no permitido'}, status=405)
 
@@ -378,12 +567,25 @@ def analyze_selected_vehicles(request):
         print(request.POST)
         return render(request, 'analyze_selected_vehicles.html')
     else:
-        # Obtener los vehículos seleccionados de la sesión
-        selected_vehicles = request.session.get('selected_vehicles', [])
+        # Obtener los vehículos seleccionados de la sesión. Las sesiones 
+        # anteriores guardaban los registros completos y se descartan
+        selection = request.session.get('selected_vehicles')
+        if not isinstance(selection, dict):
+            selection = {'version': None, 'rows': []}
+        try:
+            selected = SEARCHER.selection(selection['rows'], 
+                                          selection['version'])
+        except ValueError as error:
+            return render(request, 
+                          'analyze_selected_vehicles.html',
+                          {'errorMessage': str(error)})
+        selected_vehicles = selected['vehicles']
         
-        # Realizar el análisis de los vehículos seleccionados
-        analysis = ANALYZER.analyze(
-            selected_vehicles)
+        # Analizar los vehículos seleccionados con las columnas 
+        # precalculadas de la versión del catálogo que los contiene. Las 
+        # selecciones ya analizadas se toman de la caché del analizador
+        analysis = ANALYZER.analysis_table(selected['catalog'], 
+                                           selected['rows'])
 
         # Definir las columnas que contienen valores de porcentaje
         columns_with_percentage = ['Rendimiento en ciudad (km/L)', 
@@ -599,35 +801,37 @@ def analyze_vehicles(request):
             'user_vehicles': user_vehicles,
         })
     
-    # Generar las gráficas
-    fuel_efficiency_bar_chart = DRAWER.fuel_efficiency_bar_chart(
-        user_vehicles)
-    vehicles_by_brand_pie_chart = DRAWER.vehicles_by_brand_pie_chart(
-        user_vehicles)
-    fuel_efficiency_distribution = DRAWER.fuel_efficiency_distribution(
-        user_vehicles)
-    
-    # Convertir las gráficas a formato de imagen y base64
-    fuel_efficiency_bar_chart_image = BytesIO()
-    fuel_efficiency_bar_chart.savefig(
-        fuel_efficiency_bar_chart_image, format='png')
-    fuel_efficiency_bar_chart_image.seek(0)
-    fuel_efficiency_bar_chart_base64 = base64.b64encode(
-        fuel_efficiency_bar_chart_image.read()).decode('utf-8')
-    
-    vehicles_by_brand_pie_chart_image = BytesIO()
-    vehicles_by_brand_pie_chart.savefig(
-        vehicles_by_brand_pie_chart_image, format='png')
-    vehicles_by_brand_pie_chart_image.seek(0)
-    vehicles_by_brand_pie_chart_base64 = base64.b64encode(
-        vehicles_by_brand_pie_chart_image.read()).decode('utf-8')
-    
-    fuel_efficiency_distribution_image = BytesIO()
-    fuel_efficiency_distribution.savefig(
-        fuel_efficiency_distribution_image, format='png')
-    fuel_efficiency_distribution_image.seek(0)
-    fuel_efficiency_distribution_base64 = base64.b64encode(
-        fuel_efficiency_distribution_image.read()).decode('utf-8')
+    # Generar las gráficas. pyplot guarda la figura actual en un estado
+    # global, por lo que los hilos del worker dibujan de uno en uno
+    with PLOT_LOCK:
+        fuel_efficiency_bar_chart = DRAWER.fuel_efficiency_bar_chart(
+            user_vehicles)
+        vehicles_by_brand_pie_chart = DRAWER.vehicles_by_brand_pie_chart(
+            user_vehicles)
+        fuel_efficiency_distribution = DRAWER.fuel_efficiency_distribution(
+            user_vehicles)
+
+        # Convertir las gráficas a formato de imagen y base64
+        fuel_efficiency_bar_chart_image = BytesIO()
+        fuel_efficiency_bar_chart.savefig(
+            fuel_efficiency_bar_chart_image, format='png')
+        fuel_efficiency_bar_chart_image.seek(0)
+        fuel_efficiency_bar_chart_base64 = base64.b64encode(
+            fuel_efficiency_bar_chart_image.read()).decode('utf-8')
+
+        vehicles_by_brand_pie_chart_image = BytesIO()
+        vehicles_by_brand_pie_chart.savefig(
+            vehicles_by_brand_pie_chart_image, format='png')
+        vehicles_by_brand_pie_chart_image.seek(0)
+        vehicles_by_brand_pie_chart_base64 = base64.b64encode(
+            vehicles_by_brand_pie_chart_image.read()).decode('utf-8')
+
+        fuel_efficiency_distribution_image = BytesIO()
+        fuel_efficiency_distribution.savefig(
+            fuel_efficiency_distribution_image, format='png')
+        fuel_efficiency_distribution_image.seek(0)
+        fuel_efficiency_distribution_base64 = base64.b64encode(
+            fuel_efficiency_distribution_image.read()).decode('utf-8')
     
     # Imprimir los datos base64 para verificar
     print("Fuel Efficiency Bar Chart Base64:", 
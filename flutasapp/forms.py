@@ -353,10 +353,21 @@ class VehicleSearchForm(forms.Form):
         forms.Form: Clase base de formularios de Django.
     
     Fields:
+        q (CharField): Campo para la búsqueda de texto libre, por ejemplo
+            'mazda 3 2020 automático'.
         brand (CharField): Campo para la marca del vehículo.
         model_year (IntegerField): Campo para el año modelo del vehículo.
         version (CharField): Campo para la versión del vehículo.
+        rendimiento_combinado_min (FloatField): Campo para el rendimiento 
+            combinado mínimo del vehículo.
+        co2_max (FloatField): Campo para las emisiones de CO2 máximas del
+            vehículo.
     """
+    q = forms.CharField(label='Búsqueda',
+     max_length=200,
+      required=False, 
+      widget=forms.TextInput(attrs={'autocomplete': 'off',
+                                    'placeholder': 'mazda 3 2020 automático'}))
     brand = forms.CharField(label='Marca',
      max_length=100,
       required=False, 
@@ -372,6 +383,15 @@ class VehicleSearchForm(forms.Form):
      max_length=100,
       required=False, 
       widget=forms.TextInput(attrs={'autocomplete': 'off'}))
+    rendimiento_combinado_min = forms.FloatField(
+     label='Rendimiento combinado mínimo (km/L)',
+     required=False, 
+     min_value=0.0,
+     widget=forms.NumberInput(attrs={'autocomplete': 'off'}))
+    co2_max = forms.FloatField(label='Emisiones de CO2 máximas (g/km)',
+     required=False, 
+     min_value=0.0,
+     widget=forms.NumberInput(attrs={'autocomplete': 'off'}))
 
 
 class FuelCostForm(forms.Form):
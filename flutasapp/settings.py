@@ -146,4 +146,20 @@ COMPRESS_ROOT = BASE_DIR / 'static'
 
 COMPRESS_ENABLED = True
 
-STATICFILES_FINDERS = ('compressor.finders.CompressorFinder',)
\ No newline at end of file
+STATICFILES_FINDERS = ('compressor.finders.CompressorFinder',)
+
+# Configuración del snapshot local del catálogo de vehículos
+
+CATALOG_DIR = os.environ.get('CATALOG_DIR', BASE_DIR / 'catalog')
+
+# En modo sin conexión el catálogo nunca se descarga de la fuente remota
+CATALOG_OFFLINE = os.environ.get('CATALOG_OFFLINE', '') not in ('', '0', 'False', 'false')
+
+# Catálogo en el que se resuelven las búsquedas: 'memory' busca en el
+# catálogo cargado en cada proceso y 'database' en el modelo CatalogVehicle,
+# que se llena con el comando sync_catalog_database
+CATALOG_BACKEND = os.environ.get('CATALOG_BACKEND', 'memory')
+
+# Archivo del registro de búsquedas, que se usa para precargar en la caché
+# las búsquedas más frecuentes al arrancar cada worker
+QUERY_LOG_PATH = os.environ.get('QUERY_LOG_PATH', Path(CATALOG_DIR) / 'queries.jsonl')
@@ -37,6 +37,9 @@ urlpatterns = [
     path('logout/', views.signout, name='logout'),
     path('my_account/', views.my_account, name='my_account'),
     path('search_vehicles/', views.search_vehicles, name='search_vehicles'),
+    path('search_vehicles/batch/', views.search_vehicles_batch, name='search_vehicles_batch'),
+    path('autocomplete_vehicles/', views.autocomplete_vehicles, name='autocomplete_vehicles'),
+    path('similar_vehicles/', views.similar_vehicles, name='similar_vehicles'),
     path('get_selected_vehicles/', views.get_selected_vehicles, name='get_selected_vehicles'),
     path('compare/analyze/', views.analyze_selected_vehicles, name='analyze_selected_vehicles'),
     path('update_selected_vehicles/', views.update_selected_vehicles, name='update_selected_vehicles'),
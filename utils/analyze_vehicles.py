@@ -14,32 +14,51 @@ Funciones:
 import pandas as pd
 import numpy as np
 
+from utils.fuel_prices import FuelPriceTable
+from utils.result_cache import ResultCache
+
 
 
 class VehicleAnalyzer:
     """
     Clase que permite analizar vehículos en función de los criterios del
-    dataframe.
+    dataframe. El análisis trabaja sobre un DataFrame nuevo construido a
+    partir de los vehículos seleccionados, sin guardar estado en la
+    instancia ni modificar los datos recibidos, por lo que una misma
+    instancia puede usarse desde varios hilos a la vez. Las tablas de 
+    analysis_table se guardan en una caché segura para hilos.
     
     Attributes:
         CUALITATIVAS (list): Lista de columnas cualitativas.
         CUANTITATIVAS_DISCRETAS (list): Lista de columnas cuantitativas 
             discretas.
         CUANTITATIVAS (list): Lista de columnas cuantitativas.
-        PRECIO_COMBUSTIBLE (dict): Diccionario que contiene el precio del 
-        combustible por tipo.
         KILOMETROS_ANUALES (int): Estimación de kilómetros recorridos 
             anualmente.
+        CACHE_SIZE (int): Número máximo de análisis guardados.
+        prices (FuelPriceTable): Tabla de precios del combustible.
+        cache (ResultCache): Caché de las tablas de análisis.
             
     Métodos:
         _differenciate(vehicles): Analiza los vehículos en función a sus 
             características.
+        _relative_difference(informacion, discretas, valores): Calcula las 
+            diferencias de las columnas numéricas ya convertidas.
         _anual_estimation(vehicles): Calcula las estimaciones anuales de 
             emisiones de CO2, NOx y consumo de combustible para los vehículos.
-        _precio_combustible(row): Devuelve el precio del combustible según 
-            el tipo.
+        estimate(co2, nox, rendimiento, precio): Calcula las estimaciones 
+            anuales a partir de arreglos.
+        _format(analysis_df): Aproxima y transpone el análisis.
         analyze(vehicles): Analiza de manera general vehículos en función de 
             sus características.
+        analyze_rows(catalog, rows, date): Analiza vehículos del catálogo a 
+            partir de sus números de fila.
+        analysis_table(catalog, rows, date): Devuelve el análisis de 
+            analyze_rows como una tabla de listas, usando la caché.
+        _selected_rows(catalog, rows): Descarta los vehículos con valores 
+            nulos y los repetidos de una selección.
+        _analyze_selected(catalog, rows, date): Analiza las filas ya 
+            depuradas de una selección.
     """
     # Discriminar las columnas del DataFrame según su tipo
     CUALITATIVAS = ['marca', 
@@ -63,13 +82,12 @@ class VehicleAnalyzer:
                     'nox'
                     ]
     
-    # Definir el precio del combustible según el tipo [$/L] [1gal = 3.79 L]
-    # 15.000 y 10.000 pesos el galón de gasolina y diesel respectivamente
-    PRECIO_COMBUSTIBLE = {'gasolina': 3950, 'diesel': 2650}
-    
     # Definir la estimación de kilómetros recorridos anualmente
     KILOMETROS_ANUALES = 20000
     
+    # Definir el número máximo de análisis guardados en la caché
+    CACHE_SIZE = 256
+    
     INDEX_LABELS = ['Marca',
                      'Submarca',
                      'Modelo',
@@ -92,6 +110,25 @@ class VehicleAnalyzer:
                      'Costo anual de combustible ($)']
         
     
+    def __init__(self, 
+                 prices: FuelPriceTable = None, 
+                 cache: ResultCache = None):
+        """
+        Inicializa la instancia de VehicleAnalyzer.
+        
+        Args:
+            prices (FuelPriceTable): Tabla de precios del combustible. Si no 
+                se indica, se usa una con los precios por defecto.
+            cache (ResultCache): Caché de las tablas de análisis. Si no se 
+                indica, se crea una de CACHE_SIZE entradas.
+            
+        Returns:
+            None
+        """
+        self.prices = prices or FuelPriceTable()
+        self.cache = (ResultCache(self.CACHE_SIZE) if cache is None 
+                      else cache)
+    
     def _differenciate(self, vehicles: pd.DataFrame) -> pd.DataFrame:
         """
         Analiza los vehículos en función a sus características.
@@ -115,6 +152,29 @@ class VehicleAnalyzer:
         valores_vehicles = valores_vehicles.apply(pd.to_numeric, 
                                                   errors='coerce')
         
+        return self._relative_difference(informacion_vehicles, 
+                                         discretas_vehicles, 
+                                         valores_vehicles)
+    
+    def _relative_difference(self, 
+                             informacion_vehicles: pd.DataFrame,
+                             discretas_vehicles: pd.DataFrame,
+                             valores_vehicles: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula las diferencias entre cada valor y el máximo valor de su 
+        columna, a partir de las columnas numéricas ya convertidas.
+        
+        Args:
+            informacion_vehicles (pd.DataFrame): Columnas cualitativas.
+            discretas_vehicles (pd.DataFrame): Columnas cuantitativas 
+                discretas como números.
+            valores_vehicles (pd.DataFrame): Columnas cuantitativas como 
+                números.
+            
+        Returns:
+            pd.DataFrame: DataFrame con las columnas cualitativas y las 
+            diferencias de las columnas numéricas.
+        """
         # Obtener los valores de las columnas discretas
         np_discretas = discretas_vehicles.to_numpy()
         
@@ -168,59 +228,55 @@ class VehicleAnalyzer:
             anuales de emisiones de CO2, NOx y costo del consumo
             de combustible.
         """
-        # Calcular el precio del combustible según el tipo
-        precio_combustible = vehicles['combustible'].apply(
-            self._precio_combustible)
-
-        # Convertir a un arreglo de numpy para realizar operaciones
-        np_precio_comb = precio_combustible.to_numpy()
+        # Obtener el precio del combustible de cada vehículo según el tipo,
+        # con una sola selección en la tabla de precios vigentes. Los 
+        # combustibles sin precio cuestan 0
+        np_precio_comb = self.prices.prices(vehicles['combustible'])
         
-        # Convertir a un arreglo de numpy para realizar operaciones
-        np_rendimiento = vehicles['rendimiento_ciudad'].to_numpy()
-
-        kilometros_anuales = self.KILOMETROS_ANUALES
+        # Crear un DataFrame con las estimaciones anuales
+        return pd.DataFrame(self.estimate(vehicles['co2'].to_numpy(), 
+                                          vehicles['nox'].to_numpy(),
+                                          vehicles['rendimiento_ciudad'].to_numpy(),
+                                          np_precio_comb))
+    
+    @classmethod
+    def estimate(cls, 
+                 co2: np.ndarray, 
+                 nox: np.ndarray, 
+                 rendimiento: np.ndarray, 
+                 precio: np.ndarray) -> dict:
+        """
+        Calcula las estimaciones anuales de emisiones de CO2, NOx y costo 
+        del combustible a partir de los arreglos de cada vehículo. Se usa 
+        tanto para los vehículos seleccionados como para precalcular las 
+        estimaciones de todo el catálogo.
         
-        # [$/L] * [km/L] / [km/año] = [$/año]
-        np_precio_anual = np_precio_comb * kilometros_anuales / np_rendimiento 
+        Args:
+            co2 (np.ndarray): Emisiones de CO2 de cada vehículo [g/km].
+            nox (np.ndarray): Emisiones de NOx de cada vehículo [g/km].
+            rendimiento (np.ndarray): Rendimiento en ciudad [km/L].
+            precio (np.ndarray): Precio del combustible [$/L].
+            
+        Returns:
+            dict: Un diccionario con los arreglos de emisiones de CO2 
+            ('co2_anual_kg') y NOx ('nox_anual_kg') anuales y el costo 
+            anual del combustible ('costo_anual_combustible').
+        """
+        kilometros_anuales = cls.KILOMETROS_ANUALES
         
-        # Convertir a un arreglo de numpy para realizar operaciones
-        np_co2 = vehicles['co2'].to_numpy()
+        # [$/L] * [km/L] / [km/año] = [$/año]
+        np_precio_anual = precio * kilometros_anuales / rendimiento 
         
         # [g/km] * [km/año] = [kg/año] 
-        np_co2_anual = np_co2 * self.KILOMETROS_ANUALES / 1000
-        
-        np_nox = vehicles['nox'].to_numpy()
+        np_co2_anual = co2 * kilometros_anuales / 1000
         
         # [g/km] * [km/año] = [kg/año]
-        np_nox_anual = np_nox * self.KILOMETROS_ANUALES / 1000
+        np_nox_anual = nox * kilometros_anuales / 1000
         
-        # Crear un DataFrame con las estimaciones anuales
-        estimaciones_df = pd.DataFrame({
-            'co2_anual_kg': np_co2_anual,
-            'nox_anual_kg': np_nox_anual,
-            'costo_anual_combustible': np_precio_anual
-        })
+        return {'co2_anual_kg': np_co2_anual,
+                'nox_anual_kg': np_nox_anual,
+                'costo_anual_combustible': np_precio_anual}
         
-        return estimaciones_df
-        
-    def _precio_combustible(self, row: pd.Series) -> float:
-        """
-        Devuelve el precio del combustible según el tipo.
-        
-        Args:
-            combustible (str): Tipo de combustible.
-            
-        Returns:
-            float: Precio del combustible.
-        """
-        # Devolver el precio del combustible según el tipo
-        if row == 'Gasolina':
-            return self.PRECIO_COMBUSTIBLE['gasolina']
-        elif row == 'Diesel':
-            return self.PRECIO_COMBUSTIBLE['diesel']
-        else:
-            return 0
-          
     def _clean_data(self, vehicles: pd.DataFrame) -> pd.DataFrame:
         """
         Limpia los datos del DataFrame de vehículos.
@@ -260,8 +316,9 @@ class VehicleAnalyzer:
         # Convertir la lista de vehículos a un DataFrame de Pandas
         vehicles = pd.DataFrame(selected_vehicles)
         
-        # Limpiar los datos del DataFrame
-        vehicles = self._clean_data(vehicles)
+        # Limpiar los datos del DataFrame y numerar de nuevo las filas, para
+        # alinearlas con las diferencias y las estimaciones
+        vehicles = self._clean_data(vehicles).reset_index(drop=True)
         
         # Analizar los vehículos en función a sus características
         diferencias_df = self._differenciate(vehicles=vehicles)
@@ -270,20 +327,146 @@ class VehicleAnalyzer:
         estimaciones_df = self._anual_estimation(vehicles=vehicles)
         
         # Unir los DataFrames horizontalmente
-        analysis_df = pd.concat([diferencias_df, estimaciones_df], axis=1)
+        return self._format(pd.concat([diferencias_df, estimaciones_df], 
+                                      axis=1))
+    
+    def analyze_rows(self, catalog, rows, date=None) -> pd.DataFrame:
+        """
+        Analiza vehículos del catálogo a partir de sus números de fila, con 
+        el mismo resultado que analyze() para sus registros. Las columnas 
+        numéricas ya convertidas y las estimaciones anuales se toman de las 
+        columnas precalculadas del catálogo, por lo que el análisis solo 
+        selecciona las filas y calcula las diferencias relativas.
         
-        # Aproximar los valores de las columnas cuantitativas a enteros
-        for column in self.CUANTITATIVAS:
-            analysis_df = analysis_df.fillna(0)
-            analysis_df[column] = analysis_df[column].astype(int)
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo a la que 
+                pertenecen las filas.
+            rows (list): Números de fila de los vehículos en el catálogo.
+            date (datetime.date): Fecha de los precios del combustible. Por 
+                defecto es hoy.
             
-        for column in self.CUANTITATIVAS_DISCRETAS:
-            analysis_df = analysis_df.fillna(0)
-            analysis_df[column] = analysis_df[column].astype(int)
+        Returns:
+            pd.DataFrame: DataFrame de vehículos con las diferencias 
+            entre cada valor y el máximo valor en su respectiva columna y
+            las estimaciones anuales.
+        """
+        return self._analyze_selected(catalog, 
+                                      self._selected_rows(catalog, rows), 
+                                      date)
+    
+    def analysis_table(self, catalog, rows, date=None) -> dict:
+        """
+        Devuelve el mismo análisis que analyze_rows() como una tabla de 
+        listas, lista para mostrarse en una plantilla. El análisis se 
+        guarda en la caché con las filas ordenadas, la versión del catálogo
+        y los precios vigentes como clave, de modo que una selección ya 
+        analizada, aunque esté en otro orden, no vuelve a usar pandas: solo
+        se reordenan las columnas de la tabla guardada.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo a la que 
+                pertenecen las filas.
+            rows (list): Números de fila de los vehículos en el catálogo.
+            date (datetime.date): Fecha de los precios del combustible. Por 
+                defecto es hoy.
+            
+        Returns:
+            dict: Un diccionario con los nombres de las columnas, uno por 
+            vehículo ('columns'), y una tupla por característica con su 
+            nombre y sus valores ('rows').
+        """
+        rows = self._selected_rows(catalog, rows)
+        canonical = np.sort(rows)
+        key = (catalog.version, self.prices.version(date), 
+               canonical.tobytes())
+        
+        # Analizar la selección ordenada si no está en la caché
+        table = self.cache.get(key)
+        if table is None:
+            table = ()
+            if len(canonical):
+                analysis = self._analyze_selected(catalog, canonical, date)
+                table = tuple(zip(analysis.index, 
+                                  map(tuple, analysis.to_numpy().tolist())))
+            self.cache.put(key, table)
+        
+        # Ordenar los valores de cada característica como la selección
+        order = np.searchsorted(canonical, rows).tolist()
+        return {'columns': list(range(len(order))),
+                'rows': [(label, [values[position] for position in order])
+                         for label, values in table]}
+    
+    def _selected_rows(self, catalog, rows) -> np.ndarray:
+        """
+        Descarta de una selección los vehículos con valores nulos y los 
+        repetidos, como _clean_data, conservando el orden de las filas.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo a la que 
+                pertenecen las filas.
+            rows (list): Números de fila de los vehículos en el catálogo.
             
-        analysis_df[
-            'costo_anual_combustible'] = analysis_df[
-                'costo_anual_combustible'].astype(int)
+        Returns:
+            np.ndarray: Los números de fila que se analizan.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        rows = rows[catalog.complete[rows]]
+        _, first = np.unique(rows, return_index=True)
+        return rows[np.sort(first)]
+    
+    def _analyze_selected(self, catalog, rows, date) -> pd.DataFrame:
+        """
+        Analiza las filas ya depuradas de una selección con las columnas 
+        precalculadas del catálogo.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo a la que 
+                pertenecen las filas.
+            rows (np.ndarray): Números de fila de _selected_rows.
+            date (datetime.date): Fecha de los precios del combustible.
+            
+        Returns:
+            pd.DataFrame: El análisis transpuesto de analyze_rows.
+        """
+        # Seleccionar las filas de las columnas del catálogo
+        informacion_vehicles = pd.DataFrame({
+            column: catalog.vehicles[column].to_numpy()[rows].tolist()
+            for column in self.CUALITATIVAS})
+        discretas_vehicles = pd.DataFrame({
+            column: catalog.metrics[column][rows]
+            for column in self.CUANTITATIVAS_DISCRETAS})
+        valores_vehicles = pd.DataFrame({
+            column: catalog.metrics[column][rows]
+            for column in self.CUANTITATIVAS})
+        estimaciones_df = pd.DataFrame({
+            column: values[rows] 
+            for column, values in catalog.estimates(self.prices, 
+                                                    date).items()})
+        
+        diferencias_df = self._relative_difference(informacion_vehicles,
+                                                   discretas_vehicles,
+                                                   valores_vehicles)
+        return self._format(pd.concat([diferencias_df, estimaciones_df], 
+                                      axis=1))
+    
+    def _format(self, analysis_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aproxima los valores numéricos del análisis a enteros, lo transpone
+        para obtener una fila por característica y una columna por vehículo
+        y asigna los nombres de las características.
+        
+        Args:
+            analysis_df (pd.DataFrame): Diferencias y estimaciones anuales 
+                de cada vehículo.
+            
+        Returns:
+            pd.DataFrame: El análisis transpuesto.
+        """
+        # Aproximar los valores de las columnas cuantitativas a enteros
+        analysis_df = analysis_df.fillna(0)
+        analysis_df = analysis_df.astype(
+            {column: int for column in self.CUANTITATIVAS
+             + self.CUANTITATIVAS_DISCRETAS + ['costo_anual_combustible']})
         
         # Transponer el DataFrame para obtener 20 filas y n columnas
         # donde n es el número de vehículos
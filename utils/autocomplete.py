@@ -0,0 +1,100 @@
+"""
+Módulo que contiene la clase PrefixCompleter, que sugiere valores de una
+columna del catálogo a partir de un prefijo usando un arreglo ordenado
+construido al cargar el catálogo.
+
+Clases:
+    PrefixCompleter: Autocompletado por prefijo con ranking por popularidad.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - numpy
+    - normalize_text from utils.text_utils
+"""
+import numpy as np
+
+from utils.text_utils import normalize_text
+
+
+
+class PrefixCompleter:
+    """
+    Autocompletado por prefijo con ranking por popularidad. Cada valor
+    distinto se indexa una vez por cada palabra que contiene (por ejemplo,
+    'XLE Automático' se encuentra con 'xle' y con 'auto'), y las claves se
+    guardan normalizadas en un arreglo ordenado. Un prefijo se resuelve con
+    dos búsquedas binarias y una selección parcial de los valores más
+    populares, sin recorrer el catálogo.
+
+    Atributos:
+        LIMIT (int): Número de sugerencias por defecto.
+        values (np.ndarray): Valores distintos de la columna.
+        counts (np.ndarray): Número de vehículos con cada valor.
+
+    Métodos:
+        complete(prefix, limit): Devuelve los valores más populares que
+            empiezan por el prefijo.
+    """
+    # Definir el número de sugerencias por defecto
+    LIMIT = 10
+
+
+    def __init__(self, values, counts):
+        """
+        Construye el arreglo ordenado de claves normalizadas.
+
+        Args:
+            values (np.ndarray | list): Valores distintos de la columna. La
+                posición de cada valor es su código.
+            counts (np.ndarray | list): Número de vehículos con cada valor.
+
+        Returns:
+            None
+        """
+        self.values = np.asarray(values, dtype=object)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+        # Generar una clave por cada palabra de cada valor
+        keys = []
+        for code, value in enumerate(self.values):
+            normalized = normalize_text(value)
+            starts = [0] + [i + 1 for i, char in enumerate(normalized)
+                            if char == ' ']
+            keys.extend((normalized[start:], code) for start in starts)
+        keys.sort()
+
+        self._keys = np.array([key for key, _ in keys], dtype=str)
+        self._codes = np.array([code for _, code in keys], dtype=np.int32)
+
+    def complete(self, prefix: str, limit: int = None) -> list:
+        """
+        Devuelve los valores más populares que empiezan por el prefijo o
+        que tienen una palabra que empieza por él.
+
+        Args:
+            prefix (str): Prefijo escrito por el usuario.
+            limit (int): Número máximo de sugerencias.
+
+        Returns:
+            list: Lista de tuplas (valor, número de vehículos) ordenada
+            de mayor a menor popularidad.
+        """
+        limit = limit or self.LIMIT
+        prefix = normalize_text(prefix).lstrip()
+
+        # Obtener el rango de claves que empiezan por el prefijo
+        start = np.searchsorted(self._keys, prefix, side='left')
+        end = np.searchsorted(self._keys, prefix + '\U0010ffff',
+                              side='left')
+        codes = np.unique(self._codes[start:end])
+
+        # Seleccionar los valores más populares sin ordenar todo el rango
+        counts = self.counts[codes]
+        if len(codes) > limit:
+            top = np.argpartition(-counts, limit - 1)[:limit]
+            codes, counts = codes[top], counts[top]
+        order = np.lexsort((self.values[codes].astype(str), -counts))
+        return [(self.values[code], int(self.counts[code]))
+                for code in codes[order]]
@@ -20,23 +20,42 @@ Dependencias:
     - numpy
     - geopandas
     - scipy
+    - FuelPriceTable from utils.fuel_prices
 """
+import logging
+
 import numpy as np
 import geopandas as gpd
 from scipy.spatial import distance
 
+from utils.fuel_prices import FuelPriceTable
+
+
+logger = logging.getLogger(__name__)
+
 
 class CostCalculator():
     """
-    Calcula el costo de viajar entre dos puntos.
+    Calcula el costo de viajar entre dos puntos. La clase no guarda estado
+    entre cálculos ni modifica la consulta, por lo que una misma instancia
+    puede usarse desde varios hilos a la vez.
     
     Atributos:
-    
+        prices (FuelPriceTable): Tabla de precios del combustible.
     """
-    # Definir el precio del combustible según el tipo [$/L] [1gal = 3.79 L]
-    # 15.000 y 10.000 pesos el galón de gasolina y diesel respectivamente
-    PRECIO_COMBUSTIBLE = {'gasolina': 3950, 'diesel': 2650}
     
+    def __init__(self, prices: FuelPriceTable = None):
+        """
+        Inicializa la instancia de CostCalculator.
+        
+        Args:
+            prices (FuelPriceTable): Tabla de precios del combustible. Si no 
+                se indica, se usa una con los precios por defecto.
+            
+        Returns:
+            None
+        """
+        self.prices = prices or FuelPriceTable()
     
     def _is_null_query(self, query: dict) -> bool:
         """
@@ -84,7 +103,7 @@ class CostCalculator():
                                             provider='nominatim')
             end_point = gpd.tools.geocode(direccion_destino,
                                             provider='nominatim')
-            print("ValueError", ValueError)
+            logger.debug('Geocodificación repetida con Nominatim.')
         finally:
             if start_point.empty or end_point.empty:
                 return 0.0
@@ -92,7 +111,6 @@ class CostCalculator():
         # Obtener las coordenadas en grados decimales
         start_coords = (start_point.geometry.iloc[0].x, 
                         start_point.geometry.iloc[0].y)
-        print("start_coords", start_coords)
         end_coords = (end_point.geometry.iloc[0].x, 
                       end_point.geometry.iloc[0].y)
 
@@ -117,7 +135,6 @@ class CostCalculator():
         """
         # Obtener los datos discriminados de la consulta
         if self._is_null_query(query):
-            print("Consulta nula")
             return {'distance': '', 
                     'fuel': '',
                     'cost': '',
@@ -131,8 +148,8 @@ class CostCalculator():
         # Calcular el combustible necesario para recorrer la distancia
         combustible = distancia / rendimiento
         
-        # Obtener el precio del combustible según el tipo
-        precio_combustible = self.PRECIO_COMBUSTIBLE[tipo_combustible]
+        # Obtener el precio vigente del combustible según el tipo
+        precio_combustible = self.prices.price(tipo_combustible)
         
         # Calcular el costo de combustible
         costo_combustible = precio_combustible * combustible
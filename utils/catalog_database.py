@@ -0,0 +1,433 @@
+"""
+Módulo que contiene la clase CatalogDatabase, que guarda el catálogo de
+vehículos en la base de datos (modelo CatalogVehicle) y resuelve en SQL los
+filtros, la puntuación y el orden de las búsquedas, de modo que los
+procesos no necesitan cargar el catálogo completo para buscar en él.
+
+Clases:
+    CatalogDatabase: Clase que sincroniza versiones del catálogo con la base
+        de datos y busca vehículos en ella.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - pandas
+    - numpy
+    - Django
+    - CatalogVehicle from consumo_gasolina.models
+    - CatalogIngest from utils.catalog_ingest
+"""
+import logging
+import re
+import time
+
+from django.db import connections, transaction
+from django.db.models import (Case, Count, F, FloatField, IntegerField,
+                              Value, When)
+from django.db.models.expressions import RawSQL
+import numpy as np
+import pandas as pd
+
+from consumo_gasolina.models import CatalogVehicle
+from utils.catalog_ingest import CatalogIngest
+from utils.text_utils import normalize_text
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogDatabase:
+    """
+    Clase que sincroniza versiones del catálogo de vehículos con la base de
+    datos y busca vehículos en ella con una sola consulta SQL. Los textos se
+    filtran por subcadena sobre sus columnas normalizadas, que tienen un
+    índice de texto completo: en SQLite se consultan a través de la tabla
+    FTS5 de trigramas y en PostgreSQL con LIKE, que usa el índice GIN de
+    trigramas.
+
+    La base de datos conserva la versión sincronizada y la anterior, para
+    que los workers que aún no recargan el catálogo sigan encontrando sus
+    vehículos.
+
+    Atributos:
+        COLUMNS (list): Columnas del catálogo, en su orden.
+        TEXT_COLUMNS (list): Columnas con texto normalizado.
+        RANGE_FIELDS (dict): Campo numérico de las columnas que no se
+            guardan como número.
+        FTS_TABLE (str): Tabla FTS5 de las columnas normalizadas en SQLite.
+        BATCH_SIZE (int): Número de filas por inserción al sincronizar.
+        CHECK_INTERVAL (int): Segundos durante los que se recuerda que una
+            versión aún no está sincronizada.
+        using (str): Alias de la base de datos.
+
+    Métodos:
+        contains(version): Indica si una versión está sincronizada.
+        sync(vehicles, version): Guarda una versión del catálogo.
+        search(version, texts, model_year, filters, ranges, limit, weights):
+            Busca vehículos en una versión del catálogo.
+        facets(version, texts, model_year, filters, ranges, weights,
+            columns): Cuenta los vehículos encontrados por cada valor de
+            las columnas indicadas.
+    """
+
+    # Definir las columnas del catálogo y las que tienen texto normalizado
+    COLUMNS = list(CatalogIngest.SCHEMA)
+    TEXT_COLUMNS = ['marca',
+                    'submarca',
+                    'version',
+                    'transmision',
+                    'combustible',
+                    'categoria']
+
+    # Definir el campo numérico de las columnas que se guardan como texto
+    RANGE_FIELDS = {'contaminacion_aire': 'contaminacion_aire_valor'}
+
+    # Definir la tabla FTS5 que crea la migración en SQLite
+    FTS_TABLE = 'consumo_gasolina_catalogvehicle_fts'
+
+    # Definir el número de filas por inserción
+    BATCH_SIZE = 2000
+
+    # Definir cada cuánto se vuelve a consultar una versión no sincronizada
+    CHECK_INTERVAL = 5
+
+
+    def __init__(self, using: str = 'default'):
+        """
+        Inicializa la instancia de CatalogDatabase.
+
+        Args:
+            using (str): Alias de la base de datos en DATABASES.
+
+        Returns:
+            None
+        """
+        self.using = using
+        self._versions = set()
+        self._missing = {}
+
+    @property
+    def _vehicles(self):
+        """Consulta de los vehículos en la base de datos."""
+        return CatalogVehicle.objects.using(self.using)
+
+    @property
+    def _vendor(self) -> str:
+        """Motor de la base de datos, por ejemplo 'sqlite'."""
+        return connections[self.using].vendor
+
+    def contains(self, version: int) -> bool:
+        """
+        Indica si una versión del catálogo está sincronizada con la base de
+        datos. Las respuestas afirmativas se recuerdan, porque una versión
+        solo se elimina después de sincronizar dos más recientes. Las
+        negativas se recuerdan CHECK_INTERVAL segundos, para que mientras
+        otro proceso sincroniza la versión las búsquedas no consulten la
+        base de datos cada vez.
+
+        Args:
+            version (int): Versión del catálogo.
+
+        Returns:
+            bool: True si la versión está en la base de datos.
+        """
+        if version in self._versions:
+            return True
+        now = time.monotonic()
+        if now - self._missing.get(version, -np.inf) < self.CHECK_INTERVAL:
+            return False
+        if self._vehicles.filter(catalog_version=version).exists():
+            self._versions.add(version)
+            self._missing.pop(version, None)
+            return True
+        self._missing[version] = now
+        return False
+
+    def sync(self, vehicles: pd.DataFrame, version: int) -> int:
+        """
+        Guarda una versión del catálogo en la base de datos, elimina las
+        versiones anteriores a la previa y reconstruye el índice de texto
+        completo, todo en una transacción. Si la versión ya está guardada
+        no se vuelve a escribir.
+
+        Args:
+            vehicles (pd.DataFrame): DataFrame con el catálogo de vehículos.
+            version (int): Versión del catálogo.
+
+        Returns:
+            int: Número de vehículos escritos.
+        """
+        if self.contains(version):
+            return 0
+
+        names, records = self._records(vehicles, version)
+        with transaction.atomic(using=self.using):
+            # Conservar solo la versión anterior más reciente
+            previous = (self._vehicles.filter(catalog_version__lt=version)
+                        .order_by('-catalog_version')
+                        .values_list('catalog_version', flat=True).first())
+            stale = self._vehicles.exclude(catalog_version=version)
+            if previous is not None:
+                stale = stale.exclude(catalog_version=previous)
+            stale.delete()
+
+            # Insertar por lotes con una sentencia preparada, sin construir
+            # una instancia del modelo por vehículo
+            table = CatalogVehicle._meta.db_table
+            statement = (f'INSERT INTO {table} ({", ".join(names)}) '
+                         f'VALUES ({", ".join(["%s"] * len(names))})')
+            with connections[self.using].cursor() as cursor:
+                for start in range(0, len(records), self.BATCH_SIZE):
+                    cursor.executemany(
+                        statement, records[start:start + self.BATCH_SIZE])
+
+                # Reindexar la tabla FTS5, cuyo contenido es la tabla del
+                # modelo
+                if self._vendor == 'sqlite':
+                    cursor.execute(f"INSERT INTO {self.FTS_TABLE}"
+                                   f"({self.FTS_TABLE}) VALUES('rebuild')")
+
+        self._versions.add(version)
+        logger.info('Catálogo versión %s sincronizado con la base de datos '
+                    '(%s vehículos).', version, len(records))
+        return len(records)
+
+    def _records(self, vehicles: pd.DataFrame, version: int) -> tuple:
+        """
+        Convierte el catálogo en las columnas del modelo CatalogVehicle. Los
+        valores float32 se guardan con el decimal más corto que los
+        representa, igual que se muestran en los resultados, y los valores
+        nulos como NULL.
+
+        Args:
+            vehicles (pd.DataFrame): DataFrame con el catálogo de vehículos.
+            version (int): Versión del catálogo.
+
+        Returns:
+            tuple: Lista con los nombres de las columnas y lista de tuplas
+            con sus valores, una por vehículo.
+        """
+        columns = {'catalog_version': np.full(len(vehicles), version),
+                   'row': np.arange(len(vehicles))}
+        for column in self.COLUMNS:
+            values = vehicles[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(object)
+            if values.dtype == np.float32:
+                values = pd.Series(values.to_numpy().astype(str).astype(
+                    np.float64), index=values.index)
+            present = values.notna().to_numpy()
+            values = values.to_numpy(dtype=object)
+            if column in ('marca', 'submarca', 'version'):
+                # Las columnas de texto de la búsqueda nunca son nulas
+                values = np.array([str(value) for value in values],
+                                  dtype=object)
+                present[:] = True
+            columns[column] = np.where(present, values, None)
+            if column in self.TEXT_COLUMNS:
+                columns[f'{column}_norm'] = np.array(
+                    [normalize_text(value) if value is not None else None
+                     for value in columns[column]], dtype=object)
+
+        # Guardar como número las columnas que se filtran por rango
+        for column, field in self.RANGE_FIELDS.items():
+            numbers = pd.to_numeric(vehicles[column].astype(object),
+                                    errors='coerce')
+            columns[field] = np.where(numbers.notna(),
+                                      numbers.to_numpy(dtype=object), None)
+
+        # Convertir los escalares de numpy en tipos de Python
+        return list(columns), list(zip(*(values.tolist()
+                                         for values in columns.values())))
+
+    def _contains(self, vehicles, column: str, text: str):
+        """
+        Filtra los vehículos cuya columna normalizada contiene el texto. En
+        SQLite se consulta la tabla FTS5 de trigramas con GLOB, que distingue
+        mayúsculas como las columnas normalizadas; en el resto de motores, y
+        para los textos de menos de tres caracteres, se usa LIKE, que en
+        PostgreSQL aprovecha el índice GIN de trigramas.
+
+        Args:
+            vehicles (QuerySet): Consulta de los vehículos.
+            column (str): Nombre de la columna del catálogo.
+            text (str): Texto normalizado a buscar.
+
+        Returns:
+            QuerySet: La consulta filtrada.
+        """
+        field = f'{column}_norm'
+
+        # Los textos más cortos que un trigrama no usan el índice
+        if self._vendor != 'sqlite' or len(text) < 3:
+            return vehicles.filter(**{f'{field}__contains': text})
+
+        pattern = '*' + re.sub(r'([*?\[])', r'[\1]', text) + '*'
+        return vehicles.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {self.FTS_TABLE} WHERE {field} GLOB %s',
+            (pattern,)))
+
+    def _query(self,
+               version: int,
+               texts: dict,
+               model_year: int = None,
+               filters: dict = None,
+               ranges: tuple = (),
+               weights: dict = None):
+        """
+        Construye la consulta de los vehículos de una versión del catálogo
+        que cumplen los criterios de una búsqueda. Con pesos, la consulta
+        tiene la puntuación de cada vehículo ('score') y solo incluye los
+        vehículos con puntuación positiva.
+
+        Args:
+            version (int): Versión del catálogo.
+            texts (dict): Textos normalizados no vacíos como {columna: texto}.
+            model_year (int): Año modelo o None.
+            filters (dict): Filtros exactos sobre valores normalizados como
+                {columna: valor}.
+            ranges (tuple): Filtros por rango como tuplas (columna, mínimo,
+                máximo), donde los límites pueden ser None.
+            weights (dict): Peso de cada columna de texto y de 'modelo', o
+                None si la búsqueda no se puntúa.
+
+        Returns:
+            QuerySet: La consulta de los vehículos encontrados.
+        """
+        vehicles = self._vehicles.filter(catalog_version=version)
+        for column, text in texts.items():
+            vehicles = self._contains(vehicles, column, text)
+        if model_year is not None:
+            vehicles = vehicles.filter(modelo=model_year)
+        for column, value in (filters or {}).items():
+            vehicles = vehicles.filter(**{f'{column}_norm': value})
+        for column, low, high in ranges:
+            field = self.RANGE_FIELDS.get(column, column)
+            if low is not None:
+                vehicles = vehicles.filter(**{f'{field}__gte': low})
+            if high is not None:
+                vehicles = vehicles.filter(**{f'{field}__lte': high})
+        if weights is None:
+            return vehicles
+
+        # Sumar el peso de cada criterio que coincide
+        score = Value(0.0, output_field=FloatField())
+        for column, weight in weights.items():
+            if column == 'modelo':
+                if model_year is not None:
+                    score += Case(When(modelo=model_year,
+                                       then=Value(float(weight))),
+                                  default=Value(0.0),
+                                  output_field=FloatField())
+            elif column in texts:
+                score += Case(When(**{f'{column}_norm__contains':
+                                      texts[column]},
+                                   then=Value(float(weight))),
+                              default=Value(0.0),
+                              output_field=FloatField())
+            else:
+                score += Value(float(weight))
+        return vehicles.annotate(score=score).filter(score__gt=0)
+
+    def search(self,
+               version: int,
+               texts: dict,
+               model_year: int = None,
+               filters: dict = None,
+               ranges: tuple = (),
+               limit: int = 20,
+               weights: dict = None) -> pd.DataFrame:
+        """
+        Busca vehículos en una versión del catálogo. Los filtros, la
+        puntuación, el orden y el límite se resuelven en SQL. Con pesos, la
+        puntuación suma el peso de cada columna de texto que contiene su
+        texto (o de las que no tienen texto) y el del año modelo si
+        coincide, y los resultados se ordenan por puntuación y rendimiento
+        en ciudad de mayor a menor; sin pesos, se ordenan por rendimiento en
+        ciudad de menor a mayor. Los rendimientos nulos van al final y los
+        empates se resuelven por número de fila.
+
+        Args:
+            version (int): Versión del catálogo.
+            texts (dict): Textos normalizados no vacíos como {columna: texto}.
+            model_year (int): Año modelo o None.
+            filters (dict): Filtros exactos sobre valores normalizados como
+                {columna: valor}.
+            ranges (tuple): Filtros por rango como tuplas (columna, mínimo,
+                máximo), donde los límites pueden ser None.
+            limit (int): Número máximo de vehículos.
+            weights (dict): Peso de cada columna de texto y de 'modelo', o
+                None si la búsqueda no se puntúa.
+
+        Returns:
+            pd.DataFrame: Un DataFrame con el número de fila ('row'), las
+            columnas del catálogo y, si hay pesos, la puntuación ('score').
+        """
+        vehicles = self._query(version, texts, model_year, filters, ranges,
+                               weights)
+        fields = ['row'] + self.COLUMNS
+        if weights is None:
+            vehicles = vehicles.order_by(
+                F('rendimiento_ciudad').asc(nulls_last=True), 'row')
+        else:
+            vehicles = vehicles.order_by('-score',
+                                         F('rendimiento_ciudad').desc(
+                                             nulls_last=True),
+                                         'row')
+            fields.append('score')
+
+        found = pd.DataFrame(list(vehicles.values_list(*fields)[:limit]),
+                             columns=fields)
+
+        # Devolver como reales las columnas reales y las enteras con nulos
+        for column in self.COLUMNS:
+            field = CatalogVehicle._meta.get_field(column)
+            if isinstance(field, IntegerField) and found[column].notna().all():
+                found[column] = found[column].astype(np.int64)
+            elif isinstance(field, (FloatField, IntegerField)):
+                found[column] = pd.to_numeric(found[column]).astype(np.float64)
+        return found
+
+    def facets(self,
+               version: int,
+               texts: dict,
+               model_year: int = None,
+               filters: dict = None,
+               ranges: tuple = (),
+               weights: dict = None,
+               columns: list = ()) -> dict:
+        """
+        Cuenta en SQL los vehículos encontrados por una búsqueda por cada
+        valor de las columnas indicadas, con los mismos criterios que
+        search().
+
+        Args:
+            version (int): Versión del catálogo.
+            texts (dict): Textos normalizados no vacíos como {columna: texto}.
+            model_year (int): Año modelo o None.
+            filters (dict): Filtros exactos sobre valores normalizados como
+                {columna: valor}.
+            ranges (tuple): Filtros por rango como tuplas (columna, mínimo,
+                máximo), donde los límites pueden ser None.
+            weights (dict): Peso de cada columna de texto y de 'modelo', o
+                None si la búsqueda no se puntúa.
+            columns (list): Columnas del catálogo que se cuentan.
+
+        Returns:
+            dict: Un diccionario que asocia cada columna con una lista de
+            diccionarios con cada valor no nulo y su número de vehículos,
+            de mayor a menor y, en caso de empate, por valor.
+        """
+        vehicles = self._query(version, texts, model_year, filters, ranges,
+                               weights)
+        facets = {}
+        for column in columns:
+            counts = (vehicles.filter(**{f'{column}__isnull': False})
+                      .order_by().values_list(column)
+                      .annotate(count=Count('id')))
+            facets[column] = [{'value': value, 'count': count}
+                              for value, count in sorted(
+                                  counts, key=lambda item: (-item[1],
+                                                            item[0]))]
+        return facets
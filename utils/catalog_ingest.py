@@ -0,0 +1,304 @@
+"""
+Módulo que contiene la clase CatalogIngest, la etapa de ingesta de una
+nueva revisión del catálogo de vehículos: valida el CSV contra un esquema
+explícito y calcula las diferencias con la revisión anterior por una clave
+estable de cada vehículo.
+
+Clases:
+    CatalogIngest: Clase que interpreta y valida el CSV del catálogo y
+        calcula las inserciones, actualizaciones y eliminaciones respecto
+        a la revisión anterior.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - pandas
+    - numpy
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+
+
+class CatalogIngest:
+    """
+    Clase que interpreta y valida el CSV del catálogo y calcula las
+    inserciones, actualizaciones y eliminaciones respecto a la revisión
+    anterior.
+
+    El CSV se lee como texto y cada columna se convierte según SCHEMA, de
+    modo que un valor mal escrito no cambia el tipo de toda la columna: la
+    fila se rechaza y se anota en el informe de validación. Los vehículos
+    se identifican por KEY_COLUMNS y, si varios comparten la clave, por su
+    orden de aparición entre ellos. Antes se emparejan las filas idénticas,
+    para que un cambio en el orden del CSV no se confunda con cambios en
+    los vehículos que comparten clave.
+
+    Las columnas numéricas se guardan con los tipos de COMPACT_SCHEMA
+    (enteros de 8 o 16 bits y float32), que bastan para la precisión del
+    catálogo y ocupan entre la mitad y la octava parte de memoria.
+
+    Atributos:
+        SCHEMA (dict): Tipos de datos esperados para cada columna.
+        COMPACT_SCHEMA (dict): Tipos de datos compactos con los que se
+            guardan las columnas numéricas.
+        KEY_COLUMNS (list): Columnas que identifican a cada vehículo.
+        schema (dict): Tipos de datos usados en la ingesta.
+
+    Métodos:
+        parse(content): Interpreta y valida el contenido del CSV.
+        compact(vehicles): Convierte las columnas numéricas a sus tipos
+            compactos.
+        diff(old, new): Calcula las diferencias entre dos revisiones.
+    """
+
+    # Definir el tipo de dato de cada columna del catálogo
+    SCHEMA = {
+        'marca': 'object',
+        'submarca': 'object',
+        'version': 'object',
+        'modelo': 'int64',
+        'transmision': 'object',
+        'combustible': 'object',
+        'categoria': 'object',
+        'cilindros': 'int64',
+        'potencia': 'int64',
+        'tamano': 'float64',
+        'rendimiento_ciudad': 'float64',
+        'rendimiento_carretera': 'float64',
+        'rendimiento_combinado': 'float64',
+        'co2': 'float64',
+        'nox': 'float64',
+        'efecto_invernadero': 'int64',
+        'contaminacion_aire': 'object'
+    }
+
+    # Definir el tipo de dato compacto de cada columna numérica
+    COMPACT_SCHEMA = {
+        'modelo': 'int16',
+        'cilindros': 'int8',
+        'potencia': 'int16',
+        'tamano': 'float32',
+        'rendimiento_ciudad': 'float32',
+        'rendimiento_carretera': 'float32',
+        'rendimiento_combinado': 'float32',
+        'co2': 'float32',
+        'nox': 'float32',
+        'efecto_invernadero': 'int8'
+    }
+
+    # Definir las columnas que identifican a cada vehículo
+    KEY_COLUMNS = ['marca',
+                   'submarca',
+                   'modelo',
+                   'version',
+                   'transmision']
+
+
+    def __init__(self, schema: dict = None, compact_schema: dict = None):
+        """
+        Inicializa la instancia de CatalogIngest.
+
+        Args:
+            schema (dict): Tipos de datos esperados para cada columna. Por
+                defecto es SCHEMA.
+            compact_schema (dict): Tipos de datos compactos de las columnas
+                numéricas. Por defecto es COMPACT_SCHEMA.
+
+        Returns:
+            None
+        """
+        self.schema = schema or self.SCHEMA
+        self.compact_schema = (self.COMPACT_SCHEMA if compact_schema is None
+                               else compact_schema)
+
+    def parse(self, content: bytes) -> tuple:
+        """
+        Interpreta y valida el contenido del CSV. Los números usan la coma
+        como separador decimal. Se rechazan las filas sin alguna de las
+        columnas de KEY_COLUMNS y las filas con valores que no se pueden
+        convertir al tipo de su columna.
+
+        Args:
+            content (bytes): Contenido del archivo CSV.
+
+        Returns:
+            tuple: El DataFrame con las filas válidas, con los tipos de
+            compact_schema, y la lista de filas rechazadas, cada una con su
+            número de línea en el CSV, sus valores y los motivos del
+            rechazo.
+
+        Raises:
+            ValueError: Si al CSV le falta alguna columna del esquema.
+        """
+        raw = pd.read_csv(io.BytesIO(content), dtype=str)
+        missing = [column for column in self.schema
+                   if column not in raw.columns]
+        if missing:
+            raise ValueError('Faltan columnas en el CSV: '
+                             + ', '.join(missing))
+
+        vehicles = {}
+        reasons = [[] for _ in range(len(raw))]
+        for column, dtype in self.schema.items():
+            text = raw[column]
+            if dtype == 'object':
+                vehicles[column] = text.to_numpy(dtype=object)
+                invalid = np.zeros(len(raw), dtype=bool)
+            else:
+                # Convertir los números con coma decimal
+                numbers = pd.to_numeric(
+                    text.str.replace(',', '.', regex=False),
+                    errors='coerce').to_numpy(dtype=np.float64)
+                invalid = text.notna().to_numpy() & np.isnan(numbers)
+                if dtype.startswith('int'):
+                    invalid |= ~np.isnan(numbers) & (numbers % 1 != 0)
+                vehicles[column] = numbers
+            for row in np.flatnonzero(invalid):
+                reasons[row].append(f'{column}: valor no válido')
+
+            # Las columnas de la clave son obligatorias
+            if column in self.KEY_COLUMNS:
+                for row in np.flatnonzero(text.isna().to_numpy()):
+                    reasons[row].append(f'{column}: valor requerido')
+
+        rejected = np.array([bool(row_reasons) for row_reasons in reasons],
+                            dtype=bool)
+        vehicles = pd.DataFrame(vehicles)[~rejected].reset_index(drop=True)
+
+        # Usar enteros en las columnas enteras que no tienen valores nulos
+        for column, dtype in self.schema.items():
+            if dtype.startswith('int') and not vehicles[column].isna().any():
+                vehicles[column] = vehicles[column].astype(dtype)
+        vehicles = self.compact(vehicles)
+
+        report = [{'line': int(row) + 2,
+                   'values': {column: (None if pd.isna(value) else value)
+                              for column, value in raw.iloc[row].items()},
+                   'reasons': reasons[row]}
+                  for row in np.flatnonzero(rejected)]
+        return vehicles, report
+
+    def compact(self, vehicles: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convierte las columnas numéricas a sus tipos de compact_schema. Una
+        columna entera con valores nulos se guarda como float32, que
+        representa exactamente los enteros del catálogo, y una columna con
+        valores fuera del rango del tipo compacto conserva su tipo.
+
+        Args:
+            vehicles (pd.DataFrame): DataFrame del catálogo de vehículos.
+
+        Returns:
+            pd.DataFrame: DataFrame con las columnas convertidas.
+        """
+        for column, dtype in self.compact_schema.items():
+            if column not in vehicles:
+                continue
+            values = vehicles[column]
+            dtype = np.dtype(dtype)
+            if dtype.kind == 'i':
+                if values.isna().any():
+                    dtype = np.dtype(np.float32)
+                elif len(values) and (values.min() < np.iinfo(dtype).min
+                                      or values.max() > np.iinfo(dtype).max):
+                    continue
+            vehicles[column] = values.astype(dtype)
+        return vehicles
+
+    def diff(self, old: pd.DataFrame, new: pd.DataFrame) -> dict:
+        """
+        Calcula las diferencias entre dos revisiones del catálogo. Primero
+        se emparejan las filas idénticas y después, entre las restantes,
+        las filas con la misma clave de vehículo.
+
+        Args:
+            old (pd.DataFrame): Revisión anterior del catálogo.
+            new (pd.DataFrame): Nueva revisión del catálogo.
+
+        Returns:
+            dict: Un diccionario con la posición en la nueva revisión de
+            cada fila anterior o -1 si se eliminó ('matches'), las filas
+            nuevas que no estaban en la revisión anterior ('inserted'), y
+            para cada columna un arreglo booleano que indica qué filas
+            emparejadas cambiaron de valor ('changed').
+        """
+        old_values = {column: self._values(old[column]).astype(str)
+                      for column in new.columns}
+        new_values = {column: self._values(new[column]).astype(str)
+                      for column in new.columns}
+
+        # Emparejar las filas idénticas y después las de la misma clave
+        matches = np.full(len(old), -1, dtype=np.int64)
+        for columns in (list(new.columns), self.KEY_COLUMNS):
+            old_rows = np.flatnonzero(matches < 0)
+            taken = np.zeros(len(new), dtype=bool)
+            taken[matches[matches >= 0]] = True
+            new_rows = np.flatnonzero(~taken)
+            positions = self._keys(new_values, columns, new_rows).get_indexer(
+                self._keys(old_values, columns, old_rows))
+            found = positions >= 0
+            matches[old_rows[found]] = new_rows[positions[found]]
+
+        # Las filas nuevas que no emparejan con ninguna anterior
+        matched = np.zeros(len(new), dtype=bool)
+        matched[matches[matches >= 0]] = True
+        inserted = np.flatnonzero(~matched)
+
+        # Comparar los valores de las filas emparejadas columna a columna
+        old_rows = np.flatnonzero(matches >= 0)
+        new_rows = matches[old_rows]
+        changed = {}
+        for column in new.columns:
+            before = self._values(old[column])[old_rows]
+            after = self._values(new[column])[new_rows]
+            if (before.dtype != after.dtype and before.dtype.kind in 'iuf'
+                    and after.dtype.kind in 'iuf'):
+                # Comparar con el tipo de la nueva revisión, por ejemplo
+                # si la versión anterior se guardó con otro tipo
+                before = before.astype(after.dtype)
+            equal = (before == after) | (pd.isna(before) & pd.isna(after))
+            changed[column] = ~np.asarray(equal, dtype=bool)
+        return {'matches': matches,
+                'inserted': inserted,
+                'changed': changed}
+
+    def _keys(self,
+              values: dict,
+              columns: list,
+              rows: np.ndarray) -> pd.MultiIndex:
+        """
+        Obtiene la clave de cada una de las filas dadas: sus valores en las
+        columnas indicadas y su orden de aparición entre las filas con
+        esos valores.
+
+        Args:
+            values (dict): Valores como texto de cada columna del catálogo.
+            columns (list): Columnas que forman la clave.
+            rows (np.ndarray): Números de fila.
+
+        Returns:
+            pd.MultiIndex: Índice con la clave única de cada fila.
+        """
+        keys = pd.DataFrame({column: values[column][rows]
+                             for column in columns})
+        keys['occurrence'] = keys.groupby(columns, sort=False).cumcount()
+        return pd.MultiIndex.from_frame(keys)
+
+    def _values(self, column: pd.Series) -> np.ndarray:
+        """
+        Obtiene los valores de una columna como arreglo de numpy, con las
+        columnas categóricas convertidas a sus valores.
+
+        Args:
+            column (pd.Series): Columna del catálogo.
+
+        Returns:
+            np.ndarray: Valores de la columna.
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.to_numpy(dtype=object)
+        return column.to_numpy()
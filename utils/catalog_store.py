@@ -0,0 +1,745 @@
+"""
+Módulo que contiene la clase CatalogStore, que mantiene en el disco local
+una copia columnar y tipada del catálogo de vehículos. Los workers mapean
+la copia local en memoria en milisegundos, comparten sus páginas a través
+de la caché del sistema operativo y la fuente remota (CSV) solo se
+consulta en segundo plano para revalidarla.
+
+Clases:
+    CatalogStore: Clase que persiste y carga la copia local (snapshot) del
+        catálogo de vehículos y la revalida contra la fuente remota.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - pandas
+    - numpy
+    - CatalogIngest from utils.catalog_ingest
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.catalog_ingest import CatalogIngest
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogStore:
+    """
+    Clase que persiste y carga la copia local (snapshot) del catálogo de
+    vehículos y la revalida contra la fuente remota.
+
+    Cada revisión del CSV pasa por CatalogIngest, que la valida contra un
+    esquema explícito y la compara con la versión anterior por la clave de
+    cada vehículo: las filas sin cambios conservan su posición y su lugar
+    en los arreglos ordenados, y solo se insertan en ellos las filas
+    nuevas o modificadas. Las filas rechazadas se guardan en un informe
+    de validación junto a la versión.
+
+    Cada versión del snapshot es un directorio 'v<versión>' con un archivo
+    .npy por columna, que se carga con np.load(mmap_mode='r'): las páginas
+    se leen bajo demanda y todos los workers del servidor comparten una
+    sola copia de solo lectura en la caché de páginas del sistema
+    operativo. Las columnas de texto se guardan codificadas como categorías
+    (códigos enteros y diccionario de valores), y junto a cada columna se
+    guarda su permutación ordenada para que los índices de búsqueda también
+    se mapeen en lugar de construirse en cada worker.
+
+    El archivo JSON de metadatos (versión, ETag, fechas de descarga y
+    revalidación) apunta al directorio de la versión vigente. Una
+    actualización escribe el directorio completo de la nueva versión y
+    después reemplaza los metadatos de forma atómica, de modo que los
+    workers pasan a la nueva versión al detectar el cambio con changed().
+
+    Atributos:
+        CSV_URL (str): URL del archivo CSV con el dataset de vehículos.
+        COLUMNS_NAME (str): Nombre del archivo con el esquema de las columnas
+            dentro del directorio de cada versión.
+        REPORT_NAME (str): Nombre del archivo con el informe de validación
+            dentro del directorio de cada versión.
+        META_NAME (str): Nombre del archivo con los metadatos del snapshot.
+        MAX_AGE (int): Segundos tras los cuales se revalida el snapshot.
+        CHECK_INTERVAL (int): Segundos mínimos entre dos comprobaciones de
+            si hay una nueva versión del snapshot.
+        KEEP_VERSIONS (int): Número de versiones que se conservan en disco.
+        TIMEOUT (int): Segundos de espera máximos para la descarga.
+        SCHEMA (dict): Tipos de datos esperados para cada columna. Se usa
+            para crear un catálogo vacío en modo sin conexión.
+        directory (Path): Directorio donde se guarda el snapshot.
+        offline (bool): Si es True, nunca se accede a la red.
+        ingest (CatalogIngest): Etapa de validación y comparación de las
+            revisiones del CSV.
+        meta (dict): Metadatos del último snapshot cargado.
+
+    Métodos:
+        load(): Carga el catálogo desde el snapshot local.
+        changed(): Indica si hay una versión del snapshot más reciente que
+            la cargada.
+        index_array(column, kind): Devuelve un arreglo de índice guardado
+            junto a una columna del snapshot cargado.
+        report(): Devuelve el informe de validación del snapshot cargado.
+        revalidate(): Consulta la fuente remota y actualiza el snapshot si
+            el contenido cambió.
+        revalidate_async(): Ejecuta revalidate() en un hilo en segundo plano.
+    """
+
+    # Definir la URL del archivo CSV con el dataset de vehículos
+    CSV_URL = 'https://raw.githubusercontent.com/spalominor/programacionparaingenieria/main/Consumo%20Gasolina%20Automoviles.csv'
+
+    # Definir los nombres de los archivos del snapshot
+    COLUMNS_NAME = 'columns.json'
+    REPORT_NAME = 'report.json'
+    META_NAME = 'vehicles.json'
+
+    # Revalidar el snapshot una vez al día como máximo
+    MAX_AGE = 24 * 60 * 60
+
+    # Comprobar si hay una nueva versión cada pocos segundos como máximo
+    CHECK_INTERVAL = 5
+
+    # Conservar la versión anterior para los workers que aún la usan
+    KEEP_VERSIONS = 2
+
+    # Tiempo de espera máximo para la descarga del CSV
+    TIMEOUT = 30
+
+    # Definir el tipo de dato de cada columna del catálogo
+    SCHEMA = CatalogIngest.SCHEMA
+
+
+    def __init__(self,
+                 directory=None,
+                 csv_url: str = None,
+                 offline: bool = False,
+                 max_age: int = None):
+        """
+        Inicializa la instancia de CatalogStore.
+
+        Args:
+            directory (str | Path): Directorio donde se guarda el snapshot.
+                Por defecto es la carpeta 'catalog' en la raíz del proyecto.
+            csv_url (str): URL del archivo CSV con el dataset de vehículos.
+            offline (bool): Si es True, nunca se accede a la red.
+            max_age (int): Segundos tras los cuales se revalida el snapshot.
+
+        Returns:
+            None
+        """
+        if directory is None:
+            directory = Path(__file__).resolve().parent.parent / 'catalog'
+        self.directory = Path(directory)
+        self.csv_url = csv_url or self.CSV_URL
+        self.offline = offline
+        self.max_age = self.MAX_AGE if max_age is None else max_age
+        self.ingest = CatalogIngest()
+        self.meta = {}
+        self._checked_at = 0
+        self._meta_mtime = None
+
+        # Evitar que se ejecuten dos revalidaciones a la vez en el proceso
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def snapshot_path(self) -> Path:
+        """Ruta del directorio de la versión cargada del catálogo."""
+        return self._version_path(self.meta)
+
+    @property
+    def meta_path(self) -> Path:
+        """Ruta del archivo con los metadatos del snapshot."""
+        return self.directory / self.META_NAME
+
+    @property
+    def version(self) -> int:
+        """Versión del snapshot cargado. Es 0 si el catálogo está vacío."""
+        return self.meta.get('version', 0)
+
+    def load(self) -> pd.DataFrame:
+        """
+        Carga el catálogo mapeando en memoria la versión vigente del
+        snapshot local. Si el snapshot no existe se descarga de la fuente
+        remota antes de cargarlo, y si está desactualizado se revalida en
+        segundo plano. En modo sin conexión se devuelve un catálogo vacío
+        cuando no hay snapshot.
+
+        Args:
+            Self
+
+        Returns:
+            pd.DataFrame: DataFrame de Pandas con el catálogo de vehículos.
+        """
+        meta = self._read_meta()
+        if not self._version_path(meta).is_dir():
+            if self.offline:
+                logger.warning('No hay snapshot del catálogo en %s y el '
+                               'modo sin conexión está activo.',
+                               self.directory)
+                self.meta = {}
+                return self._empty_frame()
+
+            # Primer arranque: descargar el catálogo de forma síncrona
+            self.revalidate()
+            meta = self._read_meta()
+
+        vehicles = self._read_snapshot(meta)
+        self.meta = meta
+        self._checked_at = time.monotonic()
+
+        # Revalidar en segundo plano si el snapshot está desactualizado
+        if not self.offline and self._is_stale():
+            self.revalidate_async()
+
+        return vehicles
+
+    def changed(self) -> bool:
+        """
+        Indica si hay una versión del snapshot más reciente que la cargada,
+        por ejemplo porque otro worker la descargó. Para que pueda llamarse
+        en cada petición, solo consulta el disco una vez cada CHECK_INTERVAL
+        segundos y solo lee los metadatos si el archivo fue reemplazado.
+
+        Args:
+            Self
+
+        Returns:
+            bool: True si los metadatos apuntan a otra versión.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+
+        try:
+            mtime = self.meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._meta_mtime:
+            return False
+        self._meta_mtime = mtime
+
+        meta = self._read_meta()
+        return (meta.get('snapshot') != self.meta.get('snapshot')
+                and self._version_path(meta).is_dir())
+
+    def index_array(self, column: str, kind: str) -> np.ndarray:
+        """
+        Devuelve un arreglo de índice guardado junto a una columna del
+        snapshot cargado, mapeado en memoria.
+
+        Args:
+            column (str): Nombre de la columna.
+            kind (str): Tipo de arreglo: 'order' para la permutación que
+                ordena la columna o 'sorted' para sus valores ordenados.
+
+        Returns:
+            np.ndarray: Arreglo de solo lectura o None si no existe.
+        """
+        path = self.snapshot_path / f'{column}.{kind}.npy'
+        if not self.meta or not path.exists():
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def report(self) -> dict:
+        """
+        Devuelve el informe de validación del snapshot cargado.
+
+        Args:
+            Self
+
+        Returns:
+            dict: Un diccionario con el número de filas insertadas,
+            actualizadas, eliminadas, sin cambios y rechazadas respecto a
+            la versión anterior ('summary') y la lista de filas rechazadas
+            con sus motivos ('rejected').
+        """
+        try:
+            with open(self.snapshot_path / self.REPORT_NAME,
+                      encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'summary': self.meta.get('ingest', {}), 'rejected': []}
+
+    def revalidate(self) -> bool:
+        """
+        Consulta la fuente remota con una petición condicional (ETag y
+        Last-Modified) y actualiza el snapshot si el contenido cambió.
+
+        Args:
+            Self
+
+        Returns:
+            bool: True si se escribió un nuevo snapshot, False en caso
+            contrario.
+        """
+        if self.offline:
+            return False
+
+        with self._lock:
+            meta = self._read_meta()
+            content, headers = self._fetch(meta)
+            now = time.time()
+
+            # El servidor indica que el contenido no ha cambiado
+            if content is None:
+                meta['checked_at'] = now
+                self._write_meta(meta)
+                return False
+
+            # Comparar el contenido descargado con el del snapshot actual
+            sha256 = hashlib.sha256(content).hexdigest()
+            if (sha256 == meta.get('sha256')
+                    and self._version_path(meta).is_dir()):
+                meta.update(etag=headers.get('ETag'),
+                            last_modified=headers.get('Last-Modified'),
+                            checked_at=now)
+                self._write_meta(meta)
+                return False
+
+            # Validar la nueva revisión y compararla con la anterior
+            vehicles, rejected = self.ingest.parse(content)
+            previous = None
+            if self._version_path(meta).is_dir():
+                vehicles, previous = self._apply_delta(meta, vehicles)
+            summary = self._summary(vehicles, previous, rejected)
+
+            version = meta.get('version', 0) + 1
+            meta = {
+                'version': version,
+                'snapshot': f'v{version}',
+                'source': self.csv_url,
+                'sha256': sha256,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': now,
+                'checked_at': now,
+                'rows': len(vehicles),
+                'columns': list(vehicles.columns),
+                'ingest': summary
+            }
+            self._write_snapshot(vehicles, meta['snapshot'], previous,
+                                 {'summary': summary, 'rejected': rejected})
+            self._write_meta(meta)
+            self._remove_old_versions(meta['snapshot'])
+            logger.info('Catálogo actualizado a la versión %s (%s filas): '
+                        '%s insertadas, %s actualizadas, %s eliminadas.',
+                        meta['version'], meta['rows'], summary['inserted'],
+                        summary['updated'], summary['deleted'])
+            if rejected:
+                logger.warning('Se rechazaron %s filas del catálogo. Ver %s.',
+                               len(rejected),
+                               self._version_path(meta) / self.REPORT_NAME)
+            return True
+
+    def revalidate_async(self) -> threading.Thread:
+        """
+        Ejecuta revalidate() en un hilo en segundo plano. Si ya hay una
+        revalidación en curso no se inicia otra.
+
+        Args:
+            Self
+
+        Returns:
+            threading.Thread: Hilo que ejecuta la revalidación o None si
+            no se inició ninguno.
+        """
+        if self.offline:
+            return None
+        if self._thread is not None and self._thread.is_alive():
+            return None
+
+        self._thread = threading.Thread(target=self._revalidate_quietly,
+                                        name='catalog-revalidate',
+                                        daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _revalidate_quietly(self):
+        """
+        Ejecuta revalidate() registrando los errores en lugar de
+        propagarlos, ya que se ejecuta fuera del ciclo de las peticiones.
+
+        Args:
+            Self
+
+        Returns:
+            None
+        """
+        try:
+            self.revalidate()
+        except (OSError, ValueError) as error:
+            logger.warning('No fue posible revalidar el catálogo: %s', error)
+
+    def _is_stale(self) -> bool:
+        """
+        Comprueba si el snapshot cargado debe revalidarse.
+
+        Returns:
+            bool: True si la última revalidación es más antigua que max_age.
+        """
+        checked_at = self.meta.get('checked_at', 0)
+        return time.time() - checked_at > self.max_age
+
+    def _fetch(self, meta: dict) -> tuple:
+        """
+        Descarga el CSV de la fuente remota. Envía los encabezados de
+        validación del snapshot actual para evitar descargar el archivo
+        si no ha cambiado.
+
+        Args:
+            meta (dict): Metadatos del snapshot actual.
+
+        Returns:
+            tuple: El contenido descargado (o None si el servidor responde
+            304 Not Modified) y los encabezados de la respuesta.
+        """
+        request = urllib.request.Request(self.csv_url)
+        if self._version_path(meta).is_dir():
+            if meta.get('etag'):
+                request.add_header('If-None-Match', meta['etag'])
+            if meta.get('last_modified'):
+                request.add_header('If-Modified-Since', meta['last_modified'])
+
+        try:
+            with urllib.request.urlopen(request,
+                                        timeout=self.TIMEOUT) as response:
+                return response.read(), response.headers
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                return None, error.headers
+            raise
+
+    def _read_meta(self) -> dict:
+        """
+        Lee los metadatos del snapshot.
+
+        Returns:
+            dict: Metadatos del snapshot o un diccionario vacío si no existe.
+        """
+        try:
+            with open(self.meta_path, encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_meta(self, meta: dict):
+        """
+        Escribe los metadatos del snapshot de forma atómica.
+
+        Args:
+            meta (dict): Metadatos del snapshot.
+
+        Returns:
+            None
+        """
+        data = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        self._atomic_write(self.meta_path, lambda file: file.write(data))
+
+    def _version_path(self, meta: dict) -> Path:
+        """
+        Obtiene la ruta del directorio de la versión a la que apuntan unos
+        metadatos.
+
+        Args:
+            meta (dict): Metadatos del snapshot.
+
+        Returns:
+            Path: Ruta del directorio de la versión.
+        """
+        return self.directory / meta.get('snapshot', 'v0')
+
+    def _read_snapshot(self, meta: dict) -> pd.DataFrame:
+        """
+        Mapea en memoria las columnas de una versión del snapshot y
+        reconstruye el DataFrame sin copiarlas.
+
+        Args:
+            meta (dict): Metadatos de la versión a cargar.
+
+        Returns:
+            pd.DataFrame: DataFrame del catálogo de vehículos.
+        """
+        path = self._version_path(meta)
+        with open(path / self.COLUMNS_NAME, encoding='utf-8') as file:
+            schema = json.load(file)
+
+        columns = {}
+        for column in schema:
+            values = np.load(path / f'{column["name"]}.npy', mmap_mode='r')
+            if 'categories' in column:
+                # Reconstruir la columna de texto a partir de sus códigos
+                values = pd.Categorical.from_codes(
+                    values, categories=column['categories'])
+            columns[column['name']] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def _apply_delta(self, meta: dict, vehicles: pd.DataFrame) -> tuple:
+        """
+        Ordena las filas de la nueva revisión para aplicarla como cambios
+        sobre la versión actual: las filas que siguen en el catálogo
+        conservan su orden y las filas insertadas van al final.
+
+        Args:
+            meta (dict): Metadatos de la versión actual.
+            vehicles (pd.DataFrame): Filas válidas de la nueva revisión.
+
+        Returns:
+            tuple: El DataFrame de la nueva versión y un diccionario con el
+            directorio de la versión actual ('path'), la nueva posición de
+            cada fila actual o -1 si se eliminó ('row_map') y, para cada
+            columna, las filas de la nueva versión cuyo valor es nuevo
+            ('changed').
+        """
+        old = self._read_snapshot(meta)
+        delta = self.ingest.diff(old, vehicles)
+        matches = delta['matches']
+
+        # Conservar las filas que siguen en el catálogo y añadir las nuevas
+        kept = np.flatnonzero(matches >= 0)
+        vehicles = vehicles.iloc[np.concatenate(
+            [matches[kept], delta['inserted']])].reset_index(drop=True)
+        row_map = np.full(len(old), -1, dtype=np.int64)
+        row_map[kept] = np.arange(len(kept))
+
+        changed = {}
+        for column in vehicles.columns:
+            mask = np.ones(len(vehicles), dtype=bool)
+            mask[:len(kept)] = delta['changed'][column]
+            changed[column] = mask
+        return vehicles, {'path': self._version_path(meta),
+                          'row_map': row_map,
+                          'changed': changed}
+
+    def _summary(self,
+                 vehicles: pd.DataFrame,
+                 previous: dict,
+                 rejected: list) -> dict:
+        """
+        Resume los cambios de la nueva versión respecto a la anterior.
+
+        Args:
+            vehicles (pd.DataFrame): DataFrame de la nueva versión.
+            previous (dict): Cambios respecto a la versión anterior o None
+                si no hay versión anterior.
+            rejected (list): Filas rechazadas de la nueva revisión.
+
+        Returns:
+            dict: Un diccionario con el número de filas insertadas,
+            actualizadas, eliminadas, sin cambios y rechazadas.
+        """
+        if previous is None:
+            return {'inserted': len(vehicles),
+                    'updated': 0,
+                    'deleted': 0,
+                    'unchanged': 0,
+                    'rejected': len(rejected)}
+
+        kept = int((previous['row_map'] >= 0).sum())
+        changed = np.logical_or.reduce(list(previous['changed'].values()))
+        updated = int(changed[:kept].sum())
+        return {'inserted': len(vehicles) - kept,
+                'updated': updated,
+                'deleted': len(previous['row_map']) - kept,
+                'unchanged': kept - updated,
+                'rejected': len(rejected)}
+
+    def _write_snapshot(self,
+                        vehicles: pd.DataFrame,
+                        name: str,
+                        previous: dict = None,
+                        report: dict = None):
+        """
+        Escribe las columnas del catálogo en el directorio de una nueva
+        versión. El directorio se escribe completo con un nombre temporal
+        y se renombra al final, de modo que los lectores nunca vean una
+        versión a medio escribir.
+
+        Las columnas de texto se guardan como códigos enteros y su
+        diccionario de valores (el código -1 marca los valores nulos).
+        Junto a cada columna se guarda la permutación estable que la
+        ordena ('order') y, en las numéricas, sus valores no nulos
+        ordenados ('sorted').
+
+        Args:
+            vehicles (pd.DataFrame): DataFrame del catálogo de vehículos.
+            name (str): Nombre del directorio de la versión.
+            previous (dict): Cambios respecto a la versión anterior, como
+                los devuelve _apply_delta(), para actualizar sus
+                permutaciones en lugar de ordenar de nuevo las columnas.
+            report (dict): Informe de validación de la nueva revisión.
+
+        Returns:
+            None
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = Path(tempfile.mkdtemp(dir=self.directory,
+                                          prefix='.tmp-'))
+        try:
+            # Permitir la lectura a los workers de otros usuarios
+            os.chmod(temporary, 0o755)
+            schema = []
+            for column_name in vehicles.columns:
+                column = vehicles[column_name]
+                arrays = {}
+                if column.dtype == object or isinstance(
+                        column.dtype, pd.CategoricalDtype):
+                    categorical = pd.Categorical(column)
+                    codes = categorical.codes
+                    arrays[''] = codes
+                    arrays['order'] = self._sort_order(
+                        column_name, codes, previous, nulls=True)
+                    schema.append({'name': column_name,
+                                   'categories': [
+                                       str(value) for value
+                                       in categorical.categories]})
+                else:
+                    values = column.to_numpy()
+                    order = self._sort_order(column_name, values, previous)
+                    arrays[''] = values
+                    arrays['order'] = order
+                    arrays['sorted'] = values[order]
+                    schema.append({'name': column_name,
+                                   'dtype': str(values.dtype)})
+
+                for kind, values in arrays.items():
+                    suffix = f'.{kind}' if kind else ''
+                    np.save(temporary / f'{column_name}{suffix}.npy',
+                            values, allow_pickle=False)
+
+            with open(temporary / self.COLUMNS_NAME, 'w',
+                      encoding='utf-8') as file:
+                json.dump(schema, file, ensure_ascii=False)
+            if report is not None:
+                with open(temporary / self.REPORT_NAME, 'w',
+                          encoding='utf-8') as file:
+                    json.dump(report, file, ensure_ascii=False)
+
+            target = self.directory / name
+            if target.exists():
+                # Otro proceso ya escribió esta versión
+                shutil.rmtree(temporary)
+            else:
+                os.replace(temporary, target)
+        except BaseException:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+
+    def _sort_order(self,
+                    column: str,
+                    values: np.ndarray,
+                    previous: dict = None,
+                    nulls: bool = False) -> np.ndarray:
+        """
+        Obtiene la permutación que ordena los valores de una columna. Si
+        hay una versión anterior, su permutación se conserva
+        para las filas sin cambios y solo se insertan en ella, mediante
+        búsqueda binaria, las filas nuevas o modificadas.
+
+        Args:
+            column (str): Nombre de la columna.
+            values (np.ndarray): Valores o códigos de la columna.
+            previous (dict): Cambios respecto a la versión anterior o None.
+            nulls (bool): Si es True, se incluyen las filas nulas, como en
+                los códigos de las columnas de texto (código -1). Si es
+                False, se descartan los valores NaN.
+
+        Returns:
+            np.ndarray: Números de fila ordenados por valor.
+        """
+        present = np.ones(len(values), dtype=bool) if nulls \
+            else ~pd.isna(values)
+
+        path = None if previous is None else \
+            previous['path'] / f'{column}.order.npy'
+        if path is None or not path.exists():
+            rows = np.flatnonzero(present)
+            return rows[np.argsort(values[rows],
+                                   kind='stable')].astype(np.int32)
+
+        # Conservar el orden de las filas sin cambios
+        changed = previous['changed'][column]
+        base = previous['row_map'][np.load(path)]
+        base = base[base >= 0]
+        base = base[~changed[base]]
+        base_values = values[base]
+        if np.any(base_values[1:] < base_values[:-1]):
+            # La codificación de la columna cambió: ordenar de nuevo
+            return self._sort_order(column, values, nulls=nulls)
+
+        # Insertar las filas nuevas o modificadas en su posición
+        added = np.flatnonzero(changed & present)
+        added = added[np.argsort(values[added], kind='stable')]
+        positions = np.searchsorted(base_values, values[added], side='right')
+        return np.insert(base, positions, added).astype(np.int32)
+
+    def _remove_old_versions(self, current: str):
+        """
+        Elimina los directorios de las versiones antiguas, conservando las
+        KEEP_VERSIONS más recientes. Los workers que aún tengan mapeada una
+        versión eliminada la siguen leyendo sin problema hasta que cambian
+        de versión, porque el sistema operativo mantiene los archivos
+        mientras estén mapeados.
+
+        Args:
+            current (str): Nombre del directorio de la versión vigente.
+
+        Returns:
+            None
+        """
+        versions = sorted(
+            (int(path.name[1:]), path) for path in self.directory.iterdir()
+            if path.is_dir() and path.name[:1] == 'v'
+            and path.name[1:].isdigit() and path.name != current)
+        for _, path in versions[:len(versions) - self.KEEP_VERSIONS + 1]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _atomic_write(self, path: Path, write):
+        """
+        Escribe un archivo en un temporal del mismo directorio y lo
+        renombra al destino, de modo que los lectores nunca vean un
+        archivo a medio escribir.
+
+        Args:
+            path (Path): Ruta del archivo de destino.
+            write (callable): Función que recibe el archivo abierto y
+                escribe su contenido.
+
+        Returns:
+            None
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory,
+                                                 prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                write(file)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def _empty_frame(self) -> pd.DataFrame:
+        """
+        Crea un catálogo vacío con las columnas y tipos de SCHEMA, con las
+        columnas numéricas en sus tipos compactos.
+
+        Returns:
+            pd.DataFrame: DataFrame vacío del catálogo de vehículos.
+        """
+        return self.ingest.compact(pd.DataFrame(
+            {name: pd.Series(dtype=dtype)
+             for name, dtype in self.SCHEMA.items()}))
@@ -0,0 +1,348 @@
+"""
+Módulo que contiene la clase FleetAnalyzer, que analiza flotas de miles de
+vehículos por lotes y resume sus características y estimaciones anuales.
+
+Clases:
+    FleetAnalyzer: Análisis por lotes de flotas de vehículos en formato
+        largo, con un resumen de totales, percentiles y mejores y peores
+        vehículos.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - concurrent.futures
+    - numpy
+    - pandas
+    - VehicleAnalyzer from utils.analyze_vehicles
+    - FuelPriceTable from utils.fuel_prices
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.analyze_vehicles import VehicleAnalyzer
+from utils.fuel_prices import FuelPriceTable
+
+
+
+class FleetAnalyzer:
+    """
+    Análisis de flotas de vehículos. A diferencia de VehicleAnalyzer, que
+    devuelve una tabla ancha con una columna por vehículo para los pocos
+    vehículos de la página de comparación, los vehículos se procesan por
+    lotes de CHUNK_SIZE y el resultado se devuelve en formato largo, con
+    una fila por vehículo y característica. Cada lote se convierte a
+    números y se estima con los mismos métodos de VehicleAnalyzer.
+
+    La memoria está acotada por el tamaño del lote: solo se conservan los
+    valores numéricos de cada vehículo para calcular el resumen (8 bytes
+    por característica y vehículo) y las filas en formato largo, si no se
+    entregan a una función de escritura. Los vehículos repetidos no se
+    descartan, porque una flota puede tener varias unidades del mismo
+    modelo. Cuando la flota tiene al menos PARALLEL_CHUNKS lotes, los
+    lotes se analizan en varios procesos, con un máximo de PARALLEL_CHUNKS
+    lotes pendientes.
+
+    Atributos:
+        CHUNK_SIZE (int): Número de vehículos por lote.
+        PARALLEL_CHUNKS (int): Número de lotes a partir del cual se analizan
+            en paralelo.
+        PERCENTILES (tuple): Percentiles del resumen.
+        METRICS (list): Características numéricas del análisis.
+        HIGHER_IS_BETTER (set): Características en las que el mejor
+            vehículo tiene el valor más alto.
+        LOWER_IS_BETTER (set): Características en las que el mejor vehículo
+            tiene el valor más bajo.
+        prices (FuelPriceTable): Tabla de precios del combustible.
+        chunk_size (int): Número de vehículos por lote.
+        workers (int): Número de procesos del análisis en paralelo.
+
+    Métodos:
+        analyze(vehicles, date, write): Analiza una flota de vehículos.
+        summarize(values): Resume los valores numéricos de la flota.
+    """
+    # Definir el tamaño de los lotes y cuándo se analizan en paralelo
+    CHUNK_SIZE = 5000
+    PARALLEL_CHUNKS = 8
+
+    # Definir los percentiles del resumen
+    PERCENTILES = (10, 50, 90)
+
+    # Definir las características numéricas y el sentido de cada una
+    METRICS = (VehicleAnalyzer.CUANTITATIVAS_DISCRETAS
+               + VehicleAnalyzer.CUANTITATIVAS
+               + ['co2_anual_kg', 'nox_anual_kg', 'costo_anual_combustible'])
+    HIGHER_IS_BETTER = {'potencia',
+                        'efecto_invernadero',
+                        'contaminacion_aire',
+                        'rendimiento_ciudad',
+                        'rendimiento_carretera',
+                        'rendimiento_combinado'}
+    LOWER_IS_BETTER = {'co2',
+                       'nox',
+                       'co2_anual_kg',
+                       'nox_anual_kg',
+                       'costo_anual_combustible'}
+
+
+    def __init__(self,
+                 prices: FuelPriceTable = None,
+                 chunk_size: int = None,
+                 workers: int = None):
+        """
+        Inicializa la instancia de FleetAnalyzer.
+
+        Args:
+            prices (FuelPriceTable): Tabla de precios del combustible. Si no
+                se indica, se usa una con los precios por defecto. Se copia
+                a cada proceso del análisis en paralelo.
+            chunk_size (int): Número de vehículos por lote. Por defecto es
+                CHUNK_SIZE.
+            workers (int): Número de procesos del análisis en paralelo. Por
+                defecto es el número de núcleos; con 1 no se usan procesos.
+
+        Returns:
+            None
+        """
+        self.prices = prices or FuelPriceTable()
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.workers = workers or os.cpu_count() or 1
+
+    def analyze(self, vehicles, date=None, write=None) -> dict:
+        """
+        Analiza una flota de vehículos por lotes.
+
+        Args:
+            vehicles (pd.DataFrame | iterable): Vehículos de la flota, como
+                un DataFrame, un iterable de registros o un iterable de
+                DataFrames, por ejemplo el de pd.read_csv con chunksize.
+                Deben tener las columnas 'combustible' y METRICS, salvo las
+                estimaciones anuales.
+            date (datetime.date): Fecha de los precios del combustible. Por
+                defecto es hoy.
+            write (callable): Función que recibe cada lote del análisis en
+                formato largo, por ejemplo para escribirlo en un archivo. Si
+                se indica, los lotes no se guardan en memoria.
+
+        Returns:
+            dict: Un diccionario con el análisis en formato largo
+            ('vehicles'), con las columnas 'vehiculo' (posición en la
+            flota), 'caracteristica' y 'valor', o None si se indicó write, y
+            el resumen de summarize ('summary').
+
+        Raises:
+            ValueError: Si a los vehículos les falta alguna columna.
+        """
+        parts = []
+        values = []
+        for long_df, chunk_values in self._results(self._chunks(vehicles),
+                                                   date):
+            values.append(chunk_values)
+            if write is None:
+                parts.append(long_df)
+            else:
+                write(long_df)
+
+        if not values:
+            values.append(np.empty((0, len(self.METRICS))))
+        long_df = None
+        if write is None:
+            long_df = (pd.concat(parts, ignore_index=True) if parts
+                       else self._long(np.empty((0, len(self.METRICS))), 0))
+        return {'vehicles': long_df,
+                'summary': self.summarize(np.vstack(values))}
+
+    def summarize(self, values: np.ndarray) -> pd.DataFrame:
+        """
+        Resume los valores numéricos de la flota. Los valores faltantes no
+        se tienen en cuenta.
+
+        Args:
+            values (np.ndarray): Matriz con una fila por vehículo y una
+                columna por característica de METRICS.
+
+        Returns:
+            pd.DataFrame: Un DataFrame con una fila por característica y las
+            columnas 'vehiculos' (número de valores), 'total', 'promedio',
+            'minimo', los percentiles ('p10', ...), 'maximo' y las
+            posiciones del mejor ('mejor') y del peor ('peor') vehículo, o
+            -1 si la característica no tiene sentido o no tiene valores.
+        """
+        present = ~np.isnan(values)
+        counts = present.sum(axis=0)
+        summary = pd.DataFrame({'vehiculos': counts,
+                                'total': np.where(present, values, 0).sum(
+                                    axis=0)},
+                               index=pd.Index(self.METRICS,
+                                              name='caracteristica'))
+
+        # Calcular las estadísticas de las características con valores
+        statistics = np.full((len(self.PERCENTILES) + 3, len(self.METRICS)),
+                             np.nan)
+        lowest = np.full(len(self.METRICS), -1)
+        highest = np.full(len(self.METRICS), -1)
+        with_values = counts > 0
+        if with_values.any():
+            columns = values[:, with_values]
+            statistics[0, with_values] = np.nanmean(columns, axis=0)
+            statistics[1, with_values] = np.nanmin(columns, axis=0)
+            statistics[2:-1, with_values] = np.nanpercentile(
+                columns, self.PERCENTILES, axis=0)
+            statistics[-1, with_values] = np.nanmax(columns, axis=0)
+            lowest[with_values] = np.nanargmin(columns, axis=0)
+            highest[with_values] = np.nanargmax(columns, axis=0)
+
+        summary['promedio'] = statistics[0]
+        summary['minimo'] = statistics[1]
+        for position, percentile in enumerate(self.PERCENTILES):
+            summary[f'p{percentile}'] = statistics[2 + position]
+        summary['maximo'] = statistics[-1]
+
+        # Elegir el mejor y el peor vehículo según el sentido de cada una
+        higher = np.array([metric in self.HIGHER_IS_BETTER
+                           for metric in self.METRICS])
+        lower = np.array([metric in self.LOWER_IS_BETTER
+                          for metric in self.METRICS])
+        summary['mejor'] = np.where(higher, highest,
+                                    np.where(lower, lowest, -1))
+        summary['peor'] = np.where(higher, lowest,
+                                   np.where(lower, highest, -1))
+        return summary.reset_index()
+
+    def _chunks(self, vehicles):
+        """
+        Divide los vehículos en lotes de chunk_size con la posición de su
+        primer vehículo en la flota.
+
+        Args:
+            vehicles (pd.DataFrame | iterable): Vehículos de la flota.
+
+        Returns:
+            generator: Tuplas con la posición del primer vehículo y el lote
+            como DataFrame.
+        """
+        if isinstance(vehicles, pd.DataFrame):
+            frame = vehicles
+            vehicles = (frame.iloc[start:start + self.chunk_size]
+                        for start in range(0, len(frame), self.chunk_size))
+
+        start = 0
+        records = []
+        for item in vehicles:
+            if isinstance(item, pd.DataFrame):
+                # Entregar los registros acumulados antes del DataFrame
+                if records:
+                    yield start, pd.DataFrame(records)
+                    start += len(records)
+                    records = []
+                if len(item):
+                    yield start, item
+                    start += len(item)
+                continue
+            records.append(item)
+            if len(records) >= self.chunk_size:
+                yield start, pd.DataFrame(records)
+                start += len(records)
+                records = []
+        if records:
+            yield start, pd.DataFrame(records)
+
+    def _results(self, chunks, date):
+        """
+        Analiza los lotes en orden, en varios procesos si la flota tiene al
+        menos PARALLEL_CHUNKS lotes.
+
+        Args:
+            chunks (generator): Lotes de _chunks.
+            date (datetime.date): Fecha de los precios del combustible.
+
+        Returns:
+            generator: El resultado de _analyze_chunk de cada lote.
+        """
+        pending = list(itertools.islice(chunks, self.PARALLEL_CHUNKS))
+        if self.workers < 2 or len(pending) < self.PARALLEL_CHUNKS:
+            for start, chunk in itertools.chain(pending, chunks):
+                yield self._analyze_chunk(chunk, start, date)
+            return
+
+        # Mantener como máximo PARALLEL_CHUNKS lotes pendientes
+        with ProcessPoolExecutor(self.workers) as executor:
+            futures = deque(
+                executor.submit(self._analyze_chunk, chunk, start, date)
+                for start, chunk in pending)
+            for start, chunk in chunks:
+                yield futures.popleft().result()
+                futures.append(executor.submit(self._analyze_chunk, chunk,
+                                               start, date))
+            while futures:
+                yield futures.popleft().result()
+
+    def _analyze_chunk(self, chunk: pd.DataFrame, start: int, date) -> tuple:
+        """
+        Convierte un lote a números y calcula sus estimaciones anuales.
+
+        Args:
+            chunk (pd.DataFrame): Lote de vehículos.
+            start (int): Posición del primer vehículo del lote en la flota.
+            date (datetime.date): Fecha de los precios del combustible.
+
+        Returns:
+            tuple: El lote en formato largo y la matriz de sus valores
+            numéricos, con una columna por característica de METRICS.
+
+        Raises:
+            ValueError: Si al lote le falta alguna columna.
+        """
+        numeric = (VehicleAnalyzer.CUANTITATIVAS_DISCRETAS
+                   + VehicleAnalyzer.CUANTITATIVAS)
+        missing = [column for column in ['combustible'] + numeric
+                   if column not in chunk.columns]
+        if missing:
+            raise ValueError('Faltan las columnas de la flota: '
+                             + ', '.join(missing))
+
+        # Convertir las columnas a tipo numérico, como en _differenciate
+        values = chunk[numeric].apply(pd.to_numeric, errors='coerce')
+        values = values.to_numpy(dtype=np.float64)
+        position = {column: index for index, column in enumerate(numeric)}
+
+        # Calcular las estimaciones anuales. A diferencia de la página de
+        # comparación, los combustibles sin precio y los vehículos sin
+        # rendimiento no tienen costo, para no sumar 0 a los totales
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimates = VehicleAnalyzer.estimate(
+                values[:, position['co2']], values[:, position['nox']],
+                values[:, position['rendimiento_ciudad']],
+                self.prices.prices(chunk['combustible'], date,
+                                   missing=np.nan))
+        estimates = np.column_stack(list(estimates.values()))
+        estimates[np.isinf(estimates)] = np.nan
+
+        values = np.hstack((values, estimates))
+        return self._long(values, start), values
+
+    def _long(self, values: np.ndarray, start: int) -> pd.DataFrame:
+        """
+        Convierte la matriz de valores de un lote al formato largo, sin los
+        valores faltantes.
+
+        Args:
+            values (np.ndarray): Matriz de valores del lote.
+            start (int): Posición del primer vehículo del lote en la flota.
+
+        Returns:
+            pd.DataFrame: Un DataFrame con las columnas 'vehiculo',
+            'caracteristica' y 'valor', ordenado por vehículo.
+        """
+        present = ~np.isnan(values)
+        vehicles, metrics = np.nonzero(present)
+        return pd.DataFrame({
+            'vehiculo': vehicles + start,
+            'caracteristica': pd.Categorical.from_codes(metrics,
+                                                        self.METRICS),
+            'valor': values[present]})
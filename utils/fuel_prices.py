@@ -0,0 +1,169 @@
+"""
+Módulo que contiene la clase FuelPriceTable, la tabla de precios del
+combustible por tipo y fecha de vigencia que comparten el análisis de
+vehículos y el cálculo del costo de las rutas.
+
+Clases:
+    FuelPriceTable: Tabla de precios del combustible con búsqueda
+        vectorizada del precio de cada vehículo.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - numpy
+    - pandas
+    - normalize_text from utils.text_utils
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.text_utils import normalize_text
+
+
+
+class FuelPriceTable:
+    """
+    Tabla de precios del combustible por tipo y fecha de vigencia. Cada
+    precio rige desde su fecha hasta la fecha del siguiente precio del mismo
+    combustible. Los tipos de combustible se comparan normalizados, de modo
+    que 'Gasolina' y 'gasolina' tienen el mismo precio.
+
+    Para un grupo de vehículos, los tipos de combustible se convierten en
+    códigos enteros (los de la columna categórica si ya lo es) y el precio
+    de cada vehículo se obtiene con una sola selección en el arreglo de
+    precios vigentes, en lugar de consultar la tabla vehículo por vehículo.
+
+    Atributos:
+        PRICES (list): Precios por defecto como tuplas (combustible, fecha
+            de vigencia, precio en $/L).
+        fuels (list): Tipos de combustible normalizados de la tabla.
+
+    Métodos:
+        price(fuel, date): Devuelve el precio de un combustible.
+        prices(fuels, date, missing): Devuelve el precio de cada vehículo.
+        current(date): Devuelve el precio vigente de cada combustible.
+        version(date): Identifica los precios vigentes en una fecha.
+    """
+    # Definir el precio del combustible según el tipo [$/L] [1gal = 3.79 L]
+    # 15.000 y 10.000 pesos el galón de gasolina y diesel respectivamente
+    PRICES = [('gasolina', datetime.date(2024, 1, 1), 3950),
+              ('diesel', datetime.date(2024, 1, 1), 2650)]
+
+
+    def __init__(self, prices: list = None):
+        """
+        Ordena los precios de cada combustible por fecha de vigencia.
+
+        Args:
+            prices (list): Precios como tuplas (combustible, fecha de
+                vigencia, precio). Por defecto es PRICES.
+
+        Returns:
+            None
+        """
+        entries = sorted((normalize_text(fuel).strip(), date, float(price))
+                         for fuel, date, price in (prices or self.PRICES))
+        self.fuels = sorted({fuel for fuel, _, _ in entries})
+        self._codes = {fuel: code for code, fuel in enumerate(self.fuels)}
+
+        # Guardar las fechas y los precios de cada combustible en arreglos
+        self._dates = {fuel: np.array([date for entry_fuel, date, _ in entries
+                                       if entry_fuel == fuel],
+                                      dtype='datetime64[D]')
+                       for fuel in self.fuels}
+        self._prices = {fuel: np.array([price for entry_fuel, _, price
+                                        in entries if entry_fuel == fuel])
+                        for fuel in self.fuels}
+
+    def current(self, date: datetime.date = None) -> np.ndarray:
+        """
+        Devuelve el precio vigente de cada combustible en una fecha.
+
+        Args:
+            date (datetime.date): Fecha de consulta. Por defecto es hoy.
+
+        Returns:
+            np.ndarray: Precio de cada combustible de fuels, en el mismo
+            orden, o NaN si aún no tiene precio en esa fecha.
+        """
+        day = np.datetime64(date or datetime.date.today(), 'D')
+        current = np.full(len(self.fuels), np.nan)
+        for code, fuel in enumerate(self.fuels):
+            position = np.searchsorted(self._dates[fuel], day,
+                                       side='right') - 1
+            if position >= 0:
+                current[code] = self._prices[fuel][position]
+        return current
+
+    def version(self, date: datetime.date = None) -> tuple:
+        """
+        Identifica los precios vigentes en una fecha, para guardar los
+        resultados calculados con ellos hasta que entre en vigencia un
+        precio nuevo.
+
+        Args:
+            date (datetime.date): Fecha de consulta. Por defecto es hoy.
+
+        Returns:
+            tuple: Los combustibles y los bytes de sus precios vigentes.
+        """
+        return tuple(self.fuels), self.current(date).tobytes()
+
+    def price(self, fuel: str, date: datetime.date = None) -> float:
+        """
+        Devuelve el precio de un combustible en una fecha.
+
+        Args:
+            fuel (str): Tipo de combustible.
+            date (datetime.date): Fecha de consulta. Por defecto es hoy.
+
+        Returns:
+            float: Precio del combustible [$/L].
+
+        Raises:
+            KeyError: Si el combustible no tiene precio en esa fecha.
+        """
+        code = self._codes.get(normalize_text(fuel).strip())
+        price = np.nan if code is None else self.current(date)[code]
+        if np.isnan(price):
+            raise KeyError(fuel)
+        return float(price)
+
+    def prices(self,
+               fuels,
+               date: datetime.date = None,
+               missing: float = 0) -> np.ndarray:
+        """
+        Devuelve el precio del combustible de cada vehículo en una fecha.
+        Los tipos de combustible distintos se buscan una vez en la tabla y
+        el precio de cada vehículo se obtiene seleccionando con sus códigos
+        en el arreglo de precios vigentes.
+
+        Args:
+            fuels (pd.Series | np.ndarray | list): Tipo de combustible de
+                cada vehículo.
+            date (datetime.date): Fecha de consulta. Por defecto es hoy.
+            missing (float): Precio de los combustibles sin precio.
+
+        Returns:
+            np.ndarray: Precio del combustible de cada vehículo [$/L].
+        """
+        # Obtener los códigos de cada vehículo y los combustibles distintos
+        if isinstance(getattr(fuels, 'dtype', None), pd.CategoricalDtype):
+            categorical = pd.Series(fuels, copy=False).cat
+            codes = categorical.codes.to_numpy()
+            values = categorical.categories
+        else:
+            codes, values = pd.factorize(np.asarray(fuels, dtype=object))
+
+        # Obtener el precio vigente de cada combustible distinto
+        current = np.append(self.current(date), np.nan)
+        lookup = current[np.array(
+            [self._codes.get(normalize_text(value).strip(), -1)
+             for value in values], dtype=np.intp)]
+        lookup = np.append(np.where(np.isnan(lookup), missing, lookup),
+                           missing)
+        return lookup[codes]
@@ -0,0 +1,171 @@
+"""
+Módulo que contiene la clase FuzzyIndex, un índice de similitud por
+trigramas sobre el vocabulario de una columna categórica que permite
+encontrar valores aunque la consulta tenga errores de escritura.
+
+Clases:
+    FuzzyIndex: Índice de trigramas con relleno sobre las palabras de los
+        valores distintos de una columna.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - numpy
+    - normalize_text from utils.text_utils
+"""
+import numpy as np
+
+from utils.text_utils import normalize_text
+
+
+
+class FuzzyIndex:
+    """
+    Índice de trigramas con relleno sobre las palabras de los valores
+    distintos de una columna. La similitud entre dos palabras es el índice
+    de Jaccard de sus conjuntos de trigramas, de modo que 'toyta' y 'toyota'
+    comparten la mayoría de ellos. Para cada palabra de la consulta solo se
+    recorren las posting lists de sus trigramas y se conservan como máximo
+    MAX_CANDIDATES palabras, por lo que el costo de una búsqueda no crece
+    con el tamaño del vocabulario.
+
+    Atributos:
+        THRESHOLD (float): Similitud mínima por defecto entre dos palabras.
+        MAX_CANDIDATES (int): Número máximo de palabras similares que se
+            conservan por cada palabra de la consulta.
+        words (np.ndarray): Vocabulario de palabras de la columna.
+        postings (dict): Diccionario que asocia cada trigrama con un arreglo
+            ordenado de identificadores de palabra.
+        size (int): Número de valores distintos indexados.
+
+    Métodos:
+        similar_words(word): Devuelve las palabras similares a una palabra.
+        match(text): Devuelve los valores similares al texto y su similitud.
+    """
+    # Definir la similitud mínima y el número máximo de candidatos
+    THRESHOLD = 0.3
+    MAX_CANDIDATES = 50
+
+
+    def __init__(self, values, threshold: float = None,
+                 max_candidates: int = None):
+        """
+        Construye el índice a partir de los valores distintos de la columna.
+
+        Args:
+            values (np.ndarray | list): Valores distintos de la columna ya
+                normalizados. La posición de cada valor es su código.
+            threshold (float): Similitud mínima entre dos palabras.
+            max_candidates (int): Número máximo de palabras similares que se
+                conservan por cada palabra de la consulta.
+
+        Returns:
+            None
+        """
+        self.threshold = threshold or self.THRESHOLD
+        self.max_candidates = max_candidates or self.MAX_CANDIDATES
+        self.size = len(values)
+
+        # Asociar cada palabra del vocabulario con los valores que la tienen
+        word_ids = {}
+        word_values = []
+        for code, value in enumerate(values):
+            for word in set(str(value).split()):
+                if word not in word_ids:
+                    word_ids[word] = len(word_ids)
+                    word_values.append([])
+                word_values[word_ids[word]].append(code)
+        self.words = np.array(list(word_ids), dtype=object)
+        self._word_values = [np.array(codes, dtype=np.int32)
+                             for codes in word_values]
+
+        # Asociar cada trigrama con las palabras que lo contienen
+        postings = {}
+        gram_counts = []
+        for word_id, word in enumerate(self.words):
+            grams = self._grams(word)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(word_id)
+        self._gram_counts = np.array(gram_counts, dtype=np.int32)
+        self.postings = {gram: np.array(ids, dtype=np.int32)
+                         for gram, ids in postings.items()}
+
+    def _grams(self, word: str) -> set:
+        """
+        Obtiene el conjunto de trigramas de una palabra con relleno de dos
+        espacios al inicio y uno al final, para dar más peso al comienzo
+        de la palabra.
+
+        Args:
+            word (str): Palabra normalizada.
+
+        Returns:
+            set: Conjunto de trigramas de la palabra.
+        """
+        padded = f'  {word} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def similar_words(self, word: str) -> tuple:
+        """
+        Devuelve las palabras del vocabulario similares a una palabra.
+
+        Args:
+            word (str): Palabra normalizada.
+
+        Returns:
+            tuple: Arreglo con los identificadores de las palabras y
+            arreglo con su similitud.
+        """
+        grams = self._grams(word)
+        lists = [self.postings[gram] for gram in grams
+                 if gram in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        # Contar los trigramas compartidos con cada palabra candidata
+        ids, shared = np.unique(np.concatenate(lists), return_counts=True)
+        similarity = shared / (len(grams) + self._gram_counts[ids] - shared)
+
+        keep = similarity >= self.threshold
+        ids, similarity = ids[keep], similarity[keep]
+
+        # Conservar solo las palabras más similares
+        if len(ids) > self.max_candidates:
+            top = np.argpartition(-similarity,
+                                  self.max_candidates)[:self.max_candidates]
+            ids, similarity = ids[top], similarity[top]
+        return ids, similarity
+
+    def match(self, text: str) -> tuple:
+        """
+        Devuelve los valores similares al texto. La similitud de un valor
+        es el promedio, sobre las palabras de la consulta, de la mejor
+        similitud entre esa palabra y las palabras del valor.
+
+        Args:
+            text (str): Texto a buscar.
+
+        Returns:
+            tuple: Arreglo ordenado con los códigos de los valores y
+            arreglo con su similitud entre 0 y 1.
+        """
+        words = normalize_text(text).split()
+        if not words:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        totals = {}
+        for word in words:
+            # Obtener la mejor similitud de la palabra con cada valor
+            best = {}
+            for word_id, similarity in zip(*self.similar_words(word)):
+                for code in self._word_values[word_id]:
+                    if similarity > best.get(code, 0):
+                        best[code] = similarity
+            for code, similarity in best.items():
+                totals[code] = totals.get(code, 0) + similarity
+
+        codes = np.array(sorted(totals), dtype=np.int32)
+        similarity = np.array([totals[code] for code in codes]) / len(words)
+        return codes, similarity
@@ -0,0 +1,226 @@
+"""
+Módulo que contiene la clase NGramIndex, un índice invertido de n-gramas
+para buscar subcadenas en una columna categórica sin recorrer todas sus
+filas.
+
+Clases:
+    NGramIndex: Índice invertido que asocia cada n-grama con los valores
+        distintos de la columna que lo contienen.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - numpy
+    - pandas
+    - normalize_text from utils.text_utils
+"""
+import numpy as np
+import pandas as pd
+
+from utils.text_utils import normalize_text
+
+
+
+class NGramIndex:
+    """
+    Índice invertido que asocia cada n-grama con los valores distintos
+    (categorías) de una columna que lo contienen. Una búsqueda de subcadena
+    se resuelve intersectando las posting lists de los n-gramas de la
+    consulta y verificando solo los valores candidatos, una vez por valor
+    distinto. El resultado se propaga a las filas a través de los códigos
+    enteros de la columna, por lo que su costo depende del número de
+    coincidencias y no del tamaño del catálogo.
+
+    Atributos:
+        N (int): Longitud por defecto de los n-gramas.
+        n (int): Longitud de los n-gramas del índice.
+        codes (np.ndarray): Código de la categoría de cada fila (-1 si el
+            valor es nulo).
+        values (np.ndarray): Tabla de búsqueda con cada categoría en
+            minúsculas y sin tildes.
+        postings (dict): Diccionario que asocia cada n-grama con un arreglo
+            ordenado de códigos de categoría.
+        size (int): Número de filas indexadas.
+
+    Métodos:
+        match(text): Devuelve los códigos de las categorías que contienen
+            la subcadena.
+        search(text): Devuelve las filas cuyo valor contiene la subcadena.
+        contains(rows, text): Indica cuáles de las filas dadas contienen
+            la subcadena.
+    """
+    # Usar trigramas por defecto
+    N = 3
+
+
+    def __init__(self, column, n: int = None, order: np.ndarray = None):
+        """
+        Construye el índice a partir de una columna. Si la columna no es
+        categórica se codifica como tal antes de indexarla. Los códigos de
+        una columna categórica se usan sin copiarlos.
+
+        Args:
+            column (pd.Series | pd.Categorical): Valores de la columna.
+            n (int): Longitud de los n-gramas.
+            order (np.ndarray): Permutación estable que ordena las filas por
+                código, si ya está calculada (por ejemplo, mapeada desde el
+                snapshot del catálogo).
+
+        Returns:
+            None
+        """
+        self.n = n or self.N
+
+        # Obtener los códigos enteros y el diccionario de la columna
+        if isinstance(getattr(column, 'dtype', None), pd.CategoricalDtype):
+            column = pd.Series(column, copy=False)
+            self.codes = column.cat.codes.to_numpy()
+            categories = column.cat.categories
+        else:
+            categorical = pd.Categorical(column)
+            self.codes = categorical.codes
+            categories = categorical.categories
+        self.size = len(self.codes)
+        self.values = np.array(
+            [normalize_text(value) for value in categories], dtype=object)
+
+        # Ordenar las filas por código para obtener cada grupo como un rango.
+        # Los nulos (código -1) quedan al principio, antes del primer rango
+        if order is None:
+            order = np.argsort(self.codes, kind='stable').astype(np.int32)
+        self._order = order
+        self._bounds = np.cumsum(np.bincount(self.codes + 1,
+                                             minlength=len(self.values) + 1))
+
+        # Asociar cada n-grama con las categorías que lo contienen
+        postings = {}
+        for code, value in enumerate(self.values):
+            for gram in self._grams(value):
+                postings.setdefault(gram, []).append(code)
+        self.postings = {gram: np.array(codes, dtype=np.int32)
+                         for gram, codes in postings.items()}
+
+    def _grams(self, text: str) -> set:
+        """
+        Obtiene el conjunto de n-gramas de un texto.
+
+        Args:
+            text (str): Texto normalizado.
+
+        Returns:
+            set: Conjunto de n-gramas del texto.
+        """
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def match(self, text: str) -> np.ndarray:
+        """
+        Devuelve los códigos de las categorías que contienen la subcadena
+        sin distinguir mayúsculas, minúsculas ni tildes.
+
+        Args:
+            text (str): Subcadena a buscar.
+
+        Returns:
+            np.ndarray: Arreglo ordenado con los códigos de las categorías.
+        """
+        text = normalize_text(text)
+        every_code = np.arange(len(self.values), dtype=np.int32)
+
+        # Una subcadena vacía está contenida en todas las categorías
+        if text == '':
+            return every_code
+
+        # Las consultas más cortas que un n-grama se verifican una a una
+        if len(text) < self.n:
+            return self._verify(every_code, text)
+
+        # Intersectar las posting lists empezando por la más corta
+        postings = []
+        for gram in self._grams(text):
+            if gram not in self.postings:
+                return np.empty(0, dtype=np.int32)
+            postings.append(self.postings[gram])
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting,
+                                        assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+
+        # Con un solo n-grama la coincidencia es exacta
+        if len(text) == self.n:
+            return candidates
+
+        # Descartar los candidatos que tienen los n-gramas pero no en orden
+        return self._verify(candidates, text)
+
+    def search(self, text: str) -> np.ndarray:
+        """
+        Devuelve las filas cuyo valor contiene la subcadena.
+
+        Args:
+            text (str): Subcadena a buscar.
+
+        Returns:
+            np.ndarray: Arreglo ordenado con los números de fila.
+        """
+        # Una subcadena vacía está contenida en todas las filas
+        if normalize_text(text) == '':
+            return np.arange(self.size, dtype=np.int32)
+        return self.rows(self.match(text))
+
+    def rows(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Expande códigos de categoría a los números de fila que los tienen.
+
+        Args:
+            codes (np.ndarray): Códigos de categoría.
+
+        Returns:
+            np.ndarray: Arreglo ordenado con los números de fila.
+        """
+        if len(codes) == 0:
+            return np.empty(0, dtype=np.int32)
+        rows = np.concatenate([
+            self._order[self._bounds[code]:self._bounds[code + 1]]
+            for code in codes])
+        rows.sort()
+        return rows
+
+    def contains(self, rows: np.ndarray, text: str) -> np.ndarray:
+        """
+        Indica cuáles de las filas dadas contienen la subcadena. La
+        comparación se hace una vez por categoría y se propaga a las filas
+        a través de sus códigos.
+
+        Args:
+            rows (np.ndarray): Números de fila a comprobar.
+            text (str): Subcadena a buscar.
+
+        Returns:
+            np.ndarray: Arreglo booleano con una posición por fila.
+        """
+        # La última posición corresponde a los valores nulos (código -1)
+        hits = np.zeros(len(self.values) + 1, dtype=bool)
+        hits[self.match(text)] = True
+        if normalize_text(text) == '':
+            hits[-1] = True
+        return hits[self.codes[rows]]
+
+    def _verify(self, codes: np.ndarray, text: str) -> np.ndarray:
+        """
+        Filtra las categorías que contienen la subcadena.
+
+        Args:
+            codes (np.ndarray): Códigos de las categorías candidatas.
+            text (str): Subcadena normalizada.
+
+        Returns:
+            np.ndarray: Arreglo ordenado con los códigos que la contienen.
+        """
+        mask = np.fromiter((text in value for value in self.values[codes]),
+                           dtype=bool, count=len(codes))
+        return codes[mask]
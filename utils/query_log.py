@@ -0,0 +1,304 @@
+"""
+Módulo que contiene la clase QueryLog, un registro acotado de las búsquedas
+recientes y su frecuencia, que se guarda en el disco local para precargar
+las búsquedas más populares en la caché de resultados al arrancar cada
+worker.
+
+Clases:
+    QueryLog: Registro en anillo de las búsquedas normalizadas con su
+        número de apariciones.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - collections
+    - threading
+    - fcntl (opcional, solo en sistemas POSIX)
+"""
+import atexit
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+# Bloquear el archivo entre procesos solo donde fcntl está disponible
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """
+    Registro en anillo de las búsquedas normalizadas con su número de
+    apariciones. Solo se conservan las SIZE búsquedas más recientes, de
+    modo que la popularidad refleja el uso actual y la memoria está
+    acotada. Las búsquedas nuevas se acumulan en memoria y se añaden al
+    archivo por lotes; como cada lote se escribe con una sola llamada en
+    modo 'append', los workers que comparten el archivo no mezclan sus
+    líneas. Cuando el archivo supera el doble de SIZE líneas se reescribe
+    con las SIZE más recientes. Las escrituras y la reescritura toman un
+    bloqueo exclusivo (fcntl.flock) sobre un archivo '.lock' junto al
+    registro, de modo que ningún worker añade líneas al archivo que otro
+    está reemplazando.
+
+    Atributos:
+        SIZE (int): Número de búsquedas que se conservan.
+        TOP (int): Número de búsquedas populares por defecto.
+        FLUSH_SIZE (int): Número de búsquedas pendientes que provocan una
+            escritura en el archivo.
+        FLUSH_INTERVAL (int): Segundos máximos entre dos escrituras.
+        path (Path): Ruta del archivo del registro o None si el registro
+            solo se guarda en memoria.
+        lock_path (Path): Ruta del archivo que se bloquea para escribir en
+            el registro o None.
+        size (int): Número de búsquedas que se conservan.
+
+    Métodos:
+        record(kind, query): Registra una búsqueda.
+        top(n): Devuelve las búsquedas más frecuentes.
+        flush(): Escribe en el archivo las búsquedas pendientes.
+    """
+    # Definir el tamaño del registro y de la precarga
+    SIZE = 5000
+    TOP = 100
+
+    # Definir cuándo se escriben las búsquedas pendientes
+    FLUSH_SIZE = 50
+    FLUSH_INTERVAL = 30
+
+
+    def __init__(self, path=None, size: int = None):
+        """
+        Carga las búsquedas guardadas en el archivo del registro.
+
+        Args:
+            path (str | Path): Ruta del archivo del registro o None para
+                no guardarlo en disco.
+            size (int): Número de búsquedas que se conservan.
+
+        Returns:
+            None
+        """
+        self.path = None if path is None else Path(path)
+        self.lock_path = (None if path is None
+                          else self.path.with_name(self.path.name + '.lock'))
+        self.size = size or self.SIZE
+        self._entries = deque()
+        self._counts = Counter()
+        self._pending = []
+        self._file_lines = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._load()
+
+        # Escribir las búsquedas pendientes al terminar el proceso
+        if self.path is not None:
+            atexit.register(self.flush)
+
+    def __len__(self) -> int:
+        """Número de búsquedas registradas."""
+        return len(self._entries)
+
+    def record(self, kind: str, query: dict):
+        """
+        Registra una búsqueda. Las búsquedas iguales deben tener la misma
+        representación, por lo que la consulta debe estar normalizada.
+
+        Args:
+            kind (str): Formato de la respuesta de la búsqueda, por ejemplo
+                'records' o 'json'.
+            query (dict): Criterios normalizados de la búsqueda,
+                serializables en JSON.
+
+        Returns:
+            None
+        """
+        entry = json.dumps([kind, query], sort_keys=True,
+                           separators=(',', ':'), ensure_ascii=False)
+        with self._lock:
+            self._append(entry)
+            self._pending.append(entry)
+            flush = (len(self._pending) >= self.FLUSH_SIZE
+                     or time.monotonic() - self._flushed_at
+                     >= self.FLUSH_INTERVAL)
+        if flush:
+            self.flush()
+
+    def top(self, n: int = None) -> list:
+        """
+        Devuelve las búsquedas más frecuentes del registro.
+
+        Args:
+            n (int): Número máximo de búsquedas. Por defecto es TOP.
+
+        Returns:
+            list: Una lista de tuplas con el formato de la respuesta, los
+            criterios de la búsqueda y su número de apariciones, de mayor
+            a menor frecuencia.
+        """
+        with self._lock:
+            popular = self._counts.most_common(n or self.TOP)
+        result = []
+        for entry, count in popular:
+            kind, query = json.loads(entry)
+            result.append((kind, query, count))
+        return result
+
+    def flush(self):
+        """
+        Añade al archivo del registro las búsquedas pendientes y, si el
+        archivo es demasiado grande, lo reescribe con las más recientes.
+        Los errores de escritura se registran sin propagarse.
+
+        Args:
+            Self
+
+        Returns:
+            None
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._flushed_at = time.monotonic()
+        if self.path is None or not pending:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                with open(self.path, 'a', encoding='utf-8') as file:
+                    file.write(''.join(entry + '\n' for entry in pending))
+                self._file_lines += len(pending)
+                if self._file_lines > 2 * self.size:
+                    self._compact()
+        except OSError as error:
+            logger.warning('No fue posible guardar el registro de '
+                           'búsquedas: %s', error)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """
+        Bloquea el archivo del registro frente a los demás procesos mientras
+        se escribe en él. Se bloquea un archivo aparte porque la reescritura
+        reemplaza el archivo del registro. Sin fcntl no se bloquea.
+
+        Args:
+            Self
+
+        Returns:
+            Iterator: Contexto durante el que se tiene el bloqueo.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a', encoding='utf-8') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append(self, entry: str):
+        """
+        Añade una búsqueda al anillo y descarta la más antigua si está
+        lleno. Se debe llamar con el candado adquirido.
+
+        Args:
+            entry (str): Búsqueda serializada.
+
+        Returns:
+            None
+        """
+        if len(self._entries) >= self.size:
+            oldest = self._entries.popleft()
+            self._counts[oldest] -= 1
+            if self._counts[oldest] <= 0:
+                del self._counts[oldest]
+        self._entries.append(entry)
+        self._counts[entry] += 1
+
+    def _read_lines(self) -> list:
+        """
+        Lee las búsquedas válidas del archivo del registro.
+
+        Args:
+            Self
+
+        Returns:
+            list: Las búsquedas serializadas, de la más antigua a la más
+            reciente.
+        """
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        for line in lines:
+            # Descartar las líneas incompletas o no válidas
+            try:
+                kind, query = json.loads(line)
+            except (ValueError, TypeError):
+                continue
+            if not isinstance(kind, str) or not isinstance(query, dict):
+                continue
+            entries.append(json.dumps([kind, query], sort_keys=True,
+                                      separators=(',', ':'),
+                                      ensure_ascii=False))
+        return entries
+
+    def _load(self):
+        """
+        Carga las búsquedas más recientes del archivo del registro.
+
+        Args:
+            Self
+
+        Returns:
+            None
+        """
+        if self.path is None:
+            return
+        try:
+            entries = self._read_lines()
+        except OSError as error:
+            logger.warning('No fue posible leer el registro de búsquedas: '
+                           '%s', error)
+            return
+        self._file_lines = len(entries)
+        for entry in entries[-self.size:]:
+            self._append(entry)
+
+    def _compact(self):
+        """
+        Reescribe el archivo del registro con sus SIZE búsquedas más
+        recientes, mediante un archivo temporal que se renombra al final.
+        Se debe llamar con el bloqueo del archivo adquirido.
+
+        Args:
+            Self
+
+        Returns:
+            None
+        """
+        entries = self._read_lines()[-self.size:]
+        descriptor, temporary = tempfile.mkstemp(dir=self.path.parent,
+                                                 prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                file.write(''.join(entry + '\n' for entry in entries))
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._file_lines = len(entries)
@@ -0,0 +1,202 @@
+"""
+Módulo que contiene la clase QueryParser, que interpreta una búsqueda de
+texto libre (por ejemplo, 'mazda 3 2020 automático') y asigna cada
+palabra al criterio de búsqueda que le corresponde usando el vocabulario
+del catálogo.
+
+Clases:
+    QueryParser: Intérprete de búsquedas de texto libre basado en
+        diccionarios con el vocabulario de cada columna del catálogo.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - normalize_text from utils.text_utils
+"""
+from utils.text_utils import normalize_text
+
+
+
+class QueryParser:
+    """
+    Intérprete de búsquedas de texto libre basado en diccionarios con el
+    vocabulario de cada columna del catálogo. La búsqueda se divide en
+    palabras y cada una se resuelve con búsquedas en diccionarios, sin
+    recorrer el catálogo:
+
+    1. Un número de cuatro cifras dentro del rango de años del catálogo es
+       el año modelo.
+    2. La frase más larga que coincide con un valor completo de una columna
+       se asigna a esa columna (por ejemplo, 'mazda 3' a la submarca).
+    3. Una palabra que aparece en los valores de una columna de texto se
+       asigna a esa columna (por ejemplo, 'automatico' a la versión).
+    4. Las palabras desconocidas se asignan a la columna de texto con la
+       palabra más parecida, o a la versión si no hay ninguna.
+
+    Si una palabra aparece en varias columnas se elige la primera según el
+    orden de COLUMNS. Las columnas de FILTER_COLUMNS solo se asignan con
+    valores completos, y se usan como filtros exactos.
+
+    Atributos:
+        CRITERIA (dict): Un diccionario que asocia cada columna de texto con
+            su criterio de búsqueda.
+        FILTER_COLUMNS (list): Lista de columnas que se usan como filtros.
+        COLUMNS (list): Orden de prioridad de las columnas.
+        MAX_PHRASE (int): Número máximo de palabras de una frase.
+        phrases (dict): Diccionario que asocia cada valor completo
+            normalizado con su columna.
+        words (dict): Diccionario que asocia cada palabra de las columnas de
+            texto con su columna.
+
+    Métodos:
+        tokenize(text): Divide un texto en palabras normalizadas.
+        parse(text): Interpreta una búsqueda de texto libre.
+    """
+    # Definir el criterio de búsqueda de cada columna de texto
+    CRITERIA = {
+        'marca': 'brand',
+        'submarca': 'sub_brand',
+        'version': 'version'
+    }
+
+    # Definir las columnas que se usan como filtros exactos
+    FILTER_COLUMNS = ['combustible',
+                      'categoria',
+                      'transmision']
+
+    # Definir el orden de prioridad de las columnas
+    COLUMNS = list(CRITERIA) + FILTER_COLUMNS
+
+    # Definir el número máximo de palabras de una frase
+    MAX_PHRASE = 4
+
+
+    def __init__(self,
+                 vocabularies: dict,
+                 years: tuple = None,
+                 fuzzy_indexes: dict = None):
+        """
+        Construye los diccionarios de frases y palabras.
+
+        Args:
+            vocabularies (dict): Un diccionario con los valores distintos
+                normalizados de cada columna de COLUMNS.
+            years (tuple): Años modelo mínimo y máximo del catálogo.
+            fuzzy_indexes (dict): Un diccionario con el índice de similitud
+                de cada columna de texto, para asignar las palabras
+                desconocidas.
+
+        Returns:
+            None
+        """
+        self.years = years
+        self.fuzzy_indexes = fuzzy_indexes or {}
+        self.phrases = {}
+        self.words = {}
+        for column in self.COLUMNS:
+            for value in vocabularies.get(column, []):
+                value = ' '.join(str(value).split())
+                self.phrases.setdefault(value, column)
+                if column in self.CRITERIA:
+                    for word in value.split():
+                        self.words.setdefault(word, column)
+
+    def tokenize(self, text: str) -> list:
+        """
+        Divide un texto en palabras normalizadas (minúsculas y sin tildes).
+
+        Args:
+            text (str): Texto de la búsqueda.
+
+        Returns:
+            list: Lista de palabras.
+        """
+        return normalize_text(text or '').split()
+
+    def parse(self, text: str) -> dict:
+        """
+        Interpreta una búsqueda de texto libre.
+
+        Args:
+            text (str): Texto de la búsqueda.
+
+        Returns:
+            dict: Un diccionario con los criterios de búsqueda ('brand',
+            'sub_brand', 'version' y 'model_year') y los filtros exactos
+            ('filters'), que asocia cada columna de FILTER_COLUMNS con su
+            valor.
+        """
+        tokens = self.tokenize(text)
+        assigned = {column: [] for column in self.COLUMNS}
+        model_year = None
+
+        position = 0
+        while position < len(tokens):
+            token = tokens[position]
+
+            # Interpretar los números de cuatro cifras como año modelo
+            if model_year is None and self._is_year(token):
+                model_year = int(token)
+                position += 1
+                continue
+
+            # Buscar la frase más larga que es un valor completo
+            longest = min(self.MAX_PHRASE, len(tokens) - position)
+            for size in range(longest, 0, -1):
+                phrase = ' '.join(tokens[position:position + size])
+                column = self.phrases.get(phrase)
+                if column is not None:
+                    assigned[column].append(phrase)
+                    position += size
+                    break
+            else:
+                # Asignar la palabra a la columna de texto que la contiene
+                column = self.words.get(token) or self._similar_column(token)
+                assigned[column].append(token)
+                position += 1
+
+        result = {criterion: ' '.join(assigned[column])
+                  for column, criterion in self.CRITERIA.items()}
+        result['model_year'] = model_year
+        result['filters'] = {column: assigned[column][0]
+                             for column in self.FILTER_COLUMNS
+                             if assigned[column]}
+        return result
+
+    def _is_year(self, token: str) -> bool:
+        """
+        Comprueba si una palabra es un año modelo del catálogo.
+
+        Args:
+            token (str): Palabra normalizada.
+
+        Returns:
+            bool: True si la palabra es un año dentro del rango del catálogo.
+        """
+        if len(token) != 4 or not token.isdigit():
+            return False
+        if self.years is None:
+            return True
+        return self.years[0] <= int(token) <= self.years[1]
+
+    def _similar_column(self, token: str) -> str:
+        """
+        Obtiene la columna de texto con la palabra más parecida a una
+        palabra desconocida, por ejemplo por un error de escritura.
+
+        Args:
+            token (str): Palabra normalizada.
+
+        Returns:
+            str: Nombre de la columna, o 'version' si ninguna columna tiene
+            palabras parecidas.
+        """
+        best, best_similarity = 'version', 0
+        for column in self.CRITERIA:
+            if column not in self.fuzzy_indexes:
+                continue
+            _, similarity = self.fuzzy_indexes[column].similar_words(token)
+            if len(similarity) and similarity.max() > best_similarity:
+                best, best_similarity = column, similarity.max()
+        return best
@@ -0,0 +1,95 @@
+"""
+Módulo que contiene la clase NumericRangeIndex, un índice ordenado sobre
+una columna numérica para resolver filtros por rango con búsqueda binaria.
+
+Clases:
+    NumericRangeIndex: Índice con las filas de una columna numérica
+        ordenadas por su valor.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - numpy
+    - pandas
+"""
+import numpy as np
+import pandas as pd
+
+
+
+class NumericRangeIndex:
+    """
+    Índice con las filas de una columna numérica ordenadas por su valor.
+    Un filtro por rango se resuelve con dos búsquedas binarias sobre los
+    valores ordenados, que delimitan el tramo de filas que lo cumplen, en
+    lugar de comparar todas las filas del catálogo. Los valores nulos o no
+    numéricos no cumplen ningún rango.
+
+    Atributos:
+        values (np.ndarray): Valores no nulos de la columna ordenados.
+        order (np.ndarray): Número de fila de cada valor ordenado.
+
+    Métodos:
+        search(low, high): Devuelve las filas con valores dentro del rango.
+    """
+
+
+    def __init__(self,
+                 column,
+                 order: np.ndarray = None,
+                 values: np.ndarray = None):
+        """
+        Construye el índice a partir de los valores de la columna. Si se
+        indican la permutación y los valores ordenados (por ejemplo,
+        mapeados desde el snapshot del catálogo) se usan sin copiarlos.
+
+        Args:
+            column (pd.Series | np.ndarray): Valores de la columna. Los
+                valores no numéricos se consideran nulos.
+            order (np.ndarray): Filas con valor no nulo ordenadas por valor.
+            values (np.ndarray): Valores no nulos de la columna ordenados.
+
+        Returns:
+            None
+        """
+        if order is not None and values is not None:
+            self.order = order
+            self.values = values
+            return
+
+        # Conservar el tipo de la columna, para que los límites se comparen
+        # con los mismos valores que se guardan en el catálogo
+        values = pd.to_numeric(pd.Series(column), errors='coerce')
+        present = np.flatnonzero(values.notna().to_numpy())
+        values = values.to_numpy()
+        order = np.argsort(values[present], kind='stable')
+        self.order = present[order].astype(np.int32)
+        self.values = values[self.order]
+
+    def search(self, low: float = None, high: float = None) -> np.ndarray:
+        """
+        Devuelve las filas cuyo valor está dentro del rango cerrado
+        [low, high].
+
+        Args:
+            low (float): Límite inferior o None si no hay límite.
+            high (float): Límite superior o None si no hay límite.
+
+        Returns:
+            np.ndarray: Arreglo ordenado con los números de fila.
+        """
+        # Convertir los límites al tipo de los valores guardados, de modo
+        # que 24.73 coincida con el valor float32 más cercano a 24.73. Los
+        # límites fuera del rango del tipo se recortan antes de convertirlos
+        if self.values.dtype.kind == 'f':
+            limits = np.finfo(self.values.dtype)
+            low = None if low is None else self.values.dtype.type(
+                np.clip(low, limits.min, limits.max))
+            high = None if high is None else self.values.dtype.type(
+                np.clip(high, limits.min, limits.max))
+        start = 0 if low is None else np.searchsorted(
+            self.values, low, side='left')
+        end = len(self.values) if high is None else np.searchsorted(
+            self.values, high, side='right')
+        return np.sort(self.order[start:end])
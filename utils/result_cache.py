@@ -0,0 +1,160 @@
+"""
+Módulo que contiene la clase ResultCache, una caché en memoria de tamaño
+acotado con política LRU (menos usado recientemente) y tiempo de vida (TTL)
+para guardar resultados ya serializados.
+
+Clases:
+    ResultCache: Caché LRU/TTL segura para hilos con contadores de aciertos,
+        fallos y desalojos.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - collections
+    - threading
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+
+class ResultCache:
+    """
+    Caché LRU/TTL segura para hilos con contadores de aciertos, fallos y
+    desalojos. Cuando la caché está llena se desaloja la entrada usada
+    hace más tiempo, y las entradas más antiguas que el TTL se descartan
+    al consultarlas.
+
+    Atributos:
+        MAX_SIZE (int): Número máximo de entradas por defecto.
+        TTL (int): Segundos de vida por defecto de cada entrada.
+        max_size (int): Número máximo de entradas.
+        ttl (int): Segundos de vida de cada entrada. None si no caducan.
+        hits (int): Número de consultas que encontraron la entrada.
+        misses (int): Número de consultas que no encontraron la entrada.
+        evictions (int): Número de entradas desalojadas por falta de espacio.
+        expirations (int): Número de entradas descartadas por caducidad.
+
+    Métodos:
+        get(key): Devuelve el valor guardado para la clave o None.
+        put(key, value): Guarda un valor para la clave.
+        clear(): Elimina todas las entradas.
+        stats(): Devuelve los contadores de la caché.
+    """
+    # Definir el tamaño y el tiempo de vida por defecto
+    MAX_SIZE = 512
+    TTL = 10 * 60
+
+
+    def __init__(self, max_size: int = None, ttl: int = TTL):
+        """
+        Inicializa la caché vacía.
+
+        Args:
+            max_size (int): Número máximo de entradas.
+            ttl (int): Segundos de vida de cada entrada. None si no caducan.
+
+        Returns:
+            None
+        """
+        self.max_size = max_size or self.MAX_SIZE
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Número de entradas guardadas."""
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        """Indica si hay una entrada vigente para la clave."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, key):
+        """
+        Devuelve el valor guardado para la clave y lo marca como usado
+        recientemente.
+
+        Args:
+            key (Hashable): Clave de la entrada.
+
+        Returns:
+            object: Valor guardado o None si no existe o ha caducado.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """
+        Guarda un valor para la clave. Si la caché está llena se desaloja
+        la entrada usada hace más tiempo.
+
+        Args:
+            key (Hashable): Clave de la entrada.
+            value (object): Valor a guardar.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Elimina todas las entradas sin reiniciar los contadores.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Devuelve los contadores de la caché.
+
+        Returns:
+            dict: Diccionario con el tamaño, los aciertos, los fallos, los
+            desalojos y las entradas caducadas de la caché.
+        """
+        with self._lock:
+            return {'size': len(self._entries),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'expirations': self.expirations}
+
+    def _expired(self, entry: tuple) -> bool:
+        """
+        Comprueba si una entrada ha superado su tiempo de vida.
+
+        Args:
+            entry (tuple): Momento de creación y valor de la entrada.
+
+        Returns:
+            bool: True si la entrada ha caducado.
+        """
+        return self.ttl is not None and time.monotonic() - entry[0] > self.ttl
@@ -12,12 +12,34 @@ Funciones:
 Dependencias:
     - pandas
     - numpy
+    - orjson
     - QueryDict from Django
+    - VehicleAnalyzer from utils.analyze_vehicles
+    - CatalogStore from utils.catalog_store
+    - ResultCache from utils.result_cache
+    - VehicleCatalog from utils.vehicle_catalog
 """
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
 from django.http import QueryDict
 import numpy as np
+import orjson
 import pandas as pd
 
+from utils.analyze_vehicles import VehicleAnalyzer
+from utils.catalog_store import CatalogStore
+from utils.result_cache import ResultCache
+from utils.text_utils import normalize_text
+from utils.vehicle_catalog import VehicleCatalog
+
+
+logger = logging.getLogger(__name__)
 
 
 class VehicleSearcher:
@@ -25,21 +47,88 @@ class VehicleSearcher:
     Clase para buscar vehículos en el dataset utilizando criterios de búsqueda 
     especificados en un diccionario.
     
+    Las búsquedas no modifican el estado compartido: cada una obtiene la 
+    versión publicada del catálogo, que es inmutable, y construye sus 
+    resultados en objetos nuevos. El único estado mutable es la referencia 
+    a la versión publicada, que se reemplaza con una sola asignación, y la 
+    caché de resultados, que usa su propio candado. Por eso una misma 
+    instancia puede atender peticiones desde varios hilos a la vez.
+    
     Atributos:
         WEIGHTS (dict): Un diccionario que contiene los pesos para cada 
             criterio de búsqueda.
+        TEXT_COLUMNS (dict): Un diccionario que asocia cada criterio de
+            texto con su columna en el dataset.
+        CATEGORICAL_COLUMNS (list): Lista de columnas que se codifican
+            como categorías.
+        PAGE_SIZE (int): Número de vehículos por página de resultados.
+        SIMILAR_SIZE (int): Número de vehículos similares por defecto.
+        BATCH_SIZE (int): Número máximo de búsquedas por lote.
+        SELECTION_SIZE (int): Número máximo de vehículos seleccionados para
+            comparar.
+        MEMORY_BUDGET (int): Memoria disponible de la máquina en bytes.
+        RANGE_COLUMNS (list): Lista de columnas numéricas que admiten 
+            filtros por rango.
+        FACET_COLUMNS (list): Lista de columnas para las que se cuentan los
+            resultados de cada búsqueda.
+        PAYLOAD_COLUMNS (list): Lista de columnas que se envían en las 
+            páginas de resultados en formato columnar.
+        store (CatalogStore): Almacén local del catálogo de vehículos.
+        cache (ResultCache): Caché de resultados serializados de la búsqueda.
+        database (CatalogDatabase): Catálogo en la base de datos en el que
+            se resuelven las búsquedas de search() y la primera página de 
+            search_page() y search_page_json(), o None si se busca en 
+            memoria.
+        prices (FuelPriceTable): Tabla de precios del combustible con la 
+            que cada versión del catálogo precalcula las estimaciones 
+            anuales de sus vehículos, o None.
+        catalog (VehicleCatalog): Versión publicada del catálogo, con el 
+            dataset de vehículos y sus índices.
         vehicles (pd.DataFrame): Un DataFrame de Pandas que contiene 
-            el dataset de vehículos.
+            el dataset de vehículos de la versión publicada.
+        version (int): Versión publicada del catálogo.
         
     Métodos:
-        __init__(csv_url): Inicializa la instancia de VehicleSearcher cargando 
-            el dataset de vehículos.
-        _prepare_data(): Convierte las columnas del DataFrame a los tipos de 
-            datos correctos.
-        _calculate_score(row, query): Calcula la puntuación de una fila en 
-            función de los criterios de búsqueda.
-        search(query): Busca vehículos en el dataset utilizando los criterios 
-            de búsqueda especificados en el diccionario de consulta.
+        __init__(store, cache, database, prices): Inicializa la instancia de 
+            VehicleSearcher cargando el dataset de vehículos desde el 
+            almacén local.
+        _build_catalog(): Construye una nueva versión del catálogo desde el 
+            almacén local.
+        reload(): Construye una nueva versión del catálogo y la publica.
+        reload_async(): Ejecuta reload() en un hilo en segundo plano.
+        _current_catalog(): Devuelve la versión publicada del catálogo y 
+            la recarga en segundo plano si hay una más reciente.
+        _calculate_score_vectorized(catalog, rows, query, matches): Calcula 
+            la puntuación de las filas en función de los criterios de 
+            búsqueda.
+        search(query, fuzzy): Busca vehículos en el dataset utilizando los 
+            criterios de búsqueda especificados en el diccionario de consulta.
+        _database_criteria(query): Convierte los criterios normalizados en 
+            los argumentos de búsqueda de la base de datos.
+        _search_database(catalog, query): Busca vehículos en el catálogo de
+            la base de datos.
+        _find_database_page(catalog, query, state, page_size): Obtiene la 
+            primera página de resultados en la base de datos.
+        search_page(query, cursor, page_size): Devuelve una página de 
+            resultados y el cursor de la siguiente, usando la caché de 
+            resultados.
+        search_page_json(query, cursor, page_size): Devuelve una página de 
+            resultados serializada en JSON con formato columnar.
+        search_batch(queries, k): Resuelve varias búsquedas en una pasada 
+            y devuelve los k mejores vehículos de cada una en JSON.
+        search_records(query): Devuelve la primera página de resultados 
+            como una lista de diccionarios.
+        autocomplete(criterion, prefix, limit): Sugiere los valores más 
+            populares de un criterio de texto que empiezan por un prefijo.
+        similar(row, k, better_efficiency, version): Devuelve los vehículos 
+            más parecidos a un vehículo del catálogo.
+        selection(rows, version): Devuelve los vehículos seleccionados por 
+            su número de fila y la versión del catálogo que los contiene.
+        memory_report(budget): Devuelve la memoria del catálogo por columna 
+            y la que queda disponible en la máquina.
+        replayable_query(query): Normaliza una búsqueda en un diccionario 
+            serializable en JSON.
+        warm_up(queries): Precarga búsquedas en la caché de resultados.
     """
     
     # Definir los pesos para cada criterio de búsqueda
@@ -50,43 +139,189 @@ class VehicleSearcher:
         'model_year': 3
     }
     
-    # Definir la URL del archivo CSV con el dataset de vehículos
-    CSV_URL = 'https://raw.githubusercontent.com/spalominor/programacionparaingenieria/main/Consumo%20Gasolina%20Automoviles.csv'
+    # Definir la columna del dataset asociada a cada criterio de texto
+    TEXT_COLUMNS = {
+        'brand': 'marca',
+        'sub_brand': 'submarca',
+        'version': 'version'
+    }
+    
+    # Definir el número de vehículos por página de resultados
+    PAGE_SIZE = 20
+    
+    # Definir el número de vehículos similares por defecto
+    SIMILAR_SIZE = 10
+    
+    # Definir el número máximo de búsquedas por lote
+    BATCH_SIZE = 500
+    
+    # Definir el número máximo de vehículos seleccionados para comparar
+    SELECTION_SIZE = 20
+    
+    # Definir la memoria disponible de la máquina [bytes]
+    MEMORY_BUDGET = 1024 ** 3
+    
+    # Definir las columnas numéricas que admiten filtros por rango
+    RANGE_COLUMNS = VehicleCatalog.RANGE_COLUMNS
+    
+    # Definir las columnas para las que se cuentan los resultados
+    FACET_COLUMNS = VehicleCatalog.FACET_COLUMNS
+    
+    # Definir las columnas que se codifican como categorías
+    CATEGORICAL_COLUMNS = VehicleCatalog.CATEGORICAL_COLUMNS
+    
+    # Definir las columnas que se envían en las páginas en formato columnar,
+    # que son las que muestra la página de comparación y las que usa el 
+    # análisis de los vehículos seleccionados
+    PAYLOAD_COLUMNS = (VehicleAnalyzer.CUALITATIVAS 
+                       + VehicleAnalyzer.CUANTITATIVAS_DISCRETAS
+                       + VehicleAnalyzer.CUANTITATIVAS)
 
 
-    def __init__(self):
+    def __init__(self, 
+                 store: CatalogStore = None, 
+                 cache: ResultCache = None,
+                 database=None,
+                 prices=None):
         """
         Inicializa la instancia de VehicleSearcher cargando el dataset de 
-        vehículos.
+        vehículos desde el snapshot local del catálogo.
         
         Args:
-            csv_url (str): URL del archivo CSV con el dataset de vehículos.
+            store (CatalogStore): Almacén local del catálogo de vehículos.
+                Si no se indica, se usa uno con la configuración por defecto.
+            cache (ResultCache): Caché de resultados serializados de la
+                búsqueda. Si no se indica, se usa una con la configuración
+                por defecto.
+            database (CatalogDatabase): Catálogo en la base de datos en el
+                que se resuelven las búsquedas de search(). Si no se indica,
+                se busca en el catálogo en memoria.
+            prices (FuelPriceTable): Tabla de precios del combustible con 
+                la que se precalculan las estimaciones anuales de cada 
+                versión del catálogo. Si no se indica, se calculan en el 
+                primer análisis.
             
         Returns:
             None
         """
-        self.vehicles = pd.read_csv(self.CSV_URL, decimal=',')
-        self._prepare_data()
+        self.store = store or CatalogStore()
+        self.cache = ResultCache() if cache is None else cache
+        self.database = database
+        self.prices = prices
+        
+        # Evitar que se construyan dos versiones del catálogo a la vez y que
+        # dos hilos inicien a la vez una recarga en segundo plano
+        self._reload_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._reload_thread = None
+        self.catalog = self._build_catalog()
+
+    @property
+    def vehicles(self) -> pd.DataFrame:
+        """DataFrame de la versión publicada del catálogo."""
+        return self.catalog.vehicles
 
-    def _prepare_data(self):
-        """Convierte las columnas del DataFrame a los tipos de datos 
-        correctos.
+    @property
+    def version(self) -> int:
+        """Versión publicada del catálogo."""
+        return self.catalog.version
+
+    def _build_catalog(self) -> VehicleCatalog:
+        """
+        Carga el catálogo desde el almacén local y construye una nueva 
+        versión con sus índices. Las columnas y los índices guardados en el 
+        snapshot se mapean en memoria, por lo que los workers del servidor 
+        comparten una sola copia.
         
         Args:
             Self
             
         Returns:
-            None
+            VehicleCatalog: La nueva versión del catálogo.
+        """
+        vehicles = self.store.load()
+        return VehicleCatalog(vehicles, self.store.version,
+                              self.store.index_array, self.prices)
+
+    def reload(self) -> int:
         """
-        # Cambiar el punto decimal por punto en todas las columnas
-        #self.vehicles = self.vehicles.replace(',', '.', regex=True)
+        Construye una nueva versión del catálogo a partir del almacén local 
+        y la publica con una sola asignación. Las búsquedas en curso 
+        terminan con la versión anterior, que ya obtuvieron, y las 
+        siguientes usan la nueva.
         
-        # Convertir las columnas a los tipos de datos correctos
-        self.vehicles['modelo'] = self.vehicles['modelo'].astype(int)
-        self.vehicles['marca'] = self.vehicles['marca'].astype(str)
-        self.vehicles['submarca'] = self.vehicles['submarca'].astype(str)
-        self.vehicles['version'] = self.vehicles['version'].astype(str)
+        Args:
+            Self
+            
+        Returns:
+            int: La versión publicada del catálogo.
+        """
+        with self._reload_lock:
+            catalog = self._build_catalog()
+            self.catalog = catalog
+        
+        # Liberar las páginas guardadas de versiones anteriores
+        self.cache.clear()
+        logger.info('Catálogo de búsqueda recargado en la versión %s.',
+                    catalog.version)
+        return catalog.version
+
+    def reload_async(self) -> threading.Thread:
+        """
+        Ejecuta reload() en un hilo en segundo plano, fuera del ciclo de 
+        las peticiones. Si ya hay una recarga en curso no se inicia otra.
+        
+        Args:
+            Self
+            
+        Returns:
+            threading.Thread: Hilo que ejecuta la recarga o None si no se 
+            inició ninguno.
+        """
+        with self._thread_lock:
+            if (self._reload_thread is not None 
+                    and self._reload_thread.is_alive()):
+                return None
+            
+            self._reload_thread = threading.Thread(
+                target=self._reload_quietly, name='catalog-reload', 
+                daemon=True)
+            self._reload_thread.start()
+            return self._reload_thread
+
+    def _reload_quietly(self):
+        """
+        Ejecuta reload() registrando los errores en lugar de propagarlos. 
+        Si la nueva versión no se puede cargar se sigue usando la actual.
         
+        Args:
+            Self
+            
+        Returns:
+            None
+        """
+        try:
+            self.reload()
+        except (OSError, ValueError, KeyError) as error:
+            logger.warning('No fue posible recargar el catálogo: %s', error)
+
+    def _current_catalog(self) -> VehicleCatalog:
+        """
+        Devuelve la versión publicada del catálogo e inicia su recarga en 
+        segundo plano si el almacén local tiene una versión más reciente, 
+        por ejemplo porque otro worker la descargó.
+        
+        Args:
+            Self
+            
+        Returns:
+            VehicleCatalog: La versión publicada del catálogo.
+        """
+        catalog = self.catalog
+        if self.store.changed():
+            self.reload_async()
+        return catalog
+
     def _null_query(self, query: dict) -> bool:
         """
         Comprueba si la consulta es nula o tiene valores nulos o vacíos.
@@ -103,6 +338,8 @@ class VehicleSearcher:
             return True
         elif query == {}:
             return True
+        elif query.get('ranges') or query.get('filters'):
+            return False
         elif query['brand'] == '':
             if query['sub_brand'] == '':
                 if query['version'] == '':
@@ -133,114 +370,1213 @@ class VehicleSearcher:
         # Extraer los valores de las listas
         for key in result.keys():
             if key == 'model_year':
-                result[key] = query.get(f'form-{key}', [None]) or None
+                result[key] = query.get(f'form-{key}') or None
             else:
-                result[key] = query.get(f'form-{key}', ['']) or ''
+                result[key] = query.get(f'form-{key}') or ''
+        
+        # Extraer los límites de los filtros por rango
+        for column in self.RANGE_COLUMNS:
+            for bound in ('min', 'max'):
+                key = f'{column}_{bound}'
+                if query.get(f'form-{key}'):
+                    result[key] = query.get(f'form-{key}')
+        
+        # Extraer la búsqueda de texto libre
+        if query.get('form-q'):
+            result['q'] = query.get('form-q')
         
         return result
 
+    def _normalize_query(self, catalog: VehicleCatalog, query) -> dict:
+        """
+        Normaliza los criterios de búsqueda: convierte el QueryDict en un
+        diccionario, interpreta la búsqueda de texto libre ('q'), completa 
+        los criterios ausentes, normaliza los textos (minúsculas y sin 
+        tildes), convierte el año modelo en entero y reúne los filtros 
+        exactos y los límites de los filtros por rango en tuplas ordenadas.
+        Dos consultas con el mismo resultado producen el mismo diccionario.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict | QueryDict): Los criterios de búsqueda.
+            
+        Returns:
+            dict: Un diccionario con los criterios de búsqueda normalizados.
+        """
+        # Convertir el QueryDict a un diccionario si es necesario
+        if isinstance(query, QueryDict):
+            query = self._querydict_to_dict(query)
+        query = dict(query or {})
+        
+        # Completar los criterios vacíos con los de la búsqueda de texto 
+        # libre, que se asignan con el vocabulario del catálogo
+        filters = dict(query.get('filters') or {})
+        if query.get('q'):
+            parsed = catalog.parser.parse(query['q'])
+            for criterion in list(self.TEXT_COLUMNS) + ['model_year']:
+                if query.get(criterion) in (None, ''):
+                    query[criterion] = parsed[criterion]
+            filters = {**parsed['filters'], **filters}
+        
+        result = {}
+        for criterion in self.TEXT_COLUMNS:
+            result[criterion] = normalize_text(
+                query.get(criterion) or '').strip()
+        
+        # Los años modelo que no son enteros no coinciden con ningún vehículo
+        try:
+            result['model_year'] = int(query.get('model_year'))
+        except (TypeError, ValueError):
+            result['model_year'] = None
+        
+        # Obtener los filtros exactos sobre las columnas categóricas, como
+        # {columna: valor}
+        result['filters'] = tuple(sorted(
+            (column, normalize_text(str(value)).strip())
+            for column, value in filters.items()
+            if column in self.CATEGORICAL_COLUMNS and value))
+        
+        # Obtener los límites de los filtros por rango, que pueden indicarse
+        # en 'ranges' como {columna: (mínimo, máximo)} o como 
+        # '<columna>_min' y '<columna>_max'
+        ranges = dict(query.get('ranges') or {})
+        ranges = {column: ranges.get(column, (None, None)) 
+                  for column in self.RANGE_COLUMNS}
+        result['ranges'] = []
+        for column, (low, high) in ranges.items():
+            low = self._to_float(query.get(f'{column}_min', low))
+            high = self._to_float(query.get(f'{column}_max', high))
+            if low is not None or high is not None:
+                result['ranges'].append((column, low, high))
+        result['ranges'] = tuple(result['ranges'])
+        return result
+    
+    def replayable_query(self, query) -> dict:
+        """
+        Normaliza los criterios de búsqueda en la versión publicada del 
+        catálogo y los devuelve en un diccionario serializable en JSON, que 
+        produce la misma clave de caché si se vuelve a buscar. Se usa para 
+        registrar las búsquedas y precargarlas después con warm_up().
+        
+        Args:
+            query (dict | QueryDict): Los criterios de búsqueda.
+            
+        Returns:
+            dict: Un diccionario con los criterios de texto, el año modelo, 
+            los filtros exactos como {columna: valor} y los filtros por 
+            rango como {columna: [mínimo, máximo]}.
+        """
+        query = self._normalize_query(self.catalog, query)
+        return {'brand': query['brand'],
+                'sub_brand': query['sub_brand'],
+                'version': query['version'],
+                'model_year': query['model_year'],
+                'filters': dict(query['filters']),
+                'ranges': {column: [low, high] 
+                           for column, low, high in query['ranges']}}
+    
+    def _to_float(self, value) -> float:
+        """
+        Convierte un límite de un filtro por rango en número real.
+        
+        Args:
+            value (str | float | None): Límite del filtro.
+            
+        Returns:
+            float: El límite como número real o None si no es válido.
+        """
+        try:
+            value = float(str(value).replace(',', '.'))
+        except (TypeError, ValueError):
+            return None
+        return None if np.isnan(value) else value
+    
+    def _cache_key(self, catalog: VehicleCatalog, query: dict) -> tuple:
+        """
+        Obtiene la clave de la caché para una consulta normalizada. La clave
+        incluye la versión del catálogo, de modo que los resultados de una
+        versión anterior nunca se reutilizan.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            
+        Returns:
+            tuple: La clave de la consulta en la caché.
+        """
+        return (catalog.version,
+                query['brand'],
+                query['sub_brand'],
+                query['version'],
+                query['model_year'],
+                query['filters'],
+                query['ranges'])
+
+    def _match_codes(self, 
+                     catalog: VehicleCatalog,
+                     column: str, 
+                     text: str, 
+                     fuzzy: bool = False,
+                     memo: dict = None) -> tuple:
+        """
+        Obtiene los valores distintos de una columna que coinciden con el
+        texto y su similitud. Las subcadenas exactas tienen similitud 1 y,
+        en el modo difuso, se añaden los valores similares encontrados por
+        el índice de trigramas.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            column (str): Nombre de la columna categórica.
+            text (str): Texto a buscar.
+            fuzzy (bool): Si es True, se incluyen los valores similares.
+            memo (dict): Diccionario en el que se guardan las coincidencias
+                ya calculadas, para compartirlas entre varias búsquedas, o 
+                None.
+            
+        Returns:
+            tuple: Arreglo ordenado con los códigos de los valores y arreglo
+            con su similitud entre 0 y 1.
+        """
+        if memo is not None:
+            key = ('codes', column, text, fuzzy)
+            if key not in memo:
+                memo[key] = self._match_codes(catalog, column, text, fuzzy)
+            return memo[key]
+        
+        codes = catalog.indexes[column].match(text)
+        similarity = np.ones(len(codes))
+        if not fuzzy:
+            return codes, similarity
+        
+        # Unir las coincidencias exactas con las similares
+        fuzzy_codes, fuzzy_similarity = catalog.fuzzy_indexes[column].match(text)
+        codes = np.concatenate([codes, fuzzy_codes])
+        similarity = np.concatenate([similarity, fuzzy_similarity])
+        
+        # Conservar la mayor similitud de cada código
+        order = np.lexsort((-similarity, codes))
+        codes, similarity = codes[order], similarity[order]
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        return codes[first], similarity[first]
+    
+    def _match_query(self, 
+                     catalog: VehicleCatalog, 
+                     query: dict, 
+                     fuzzy: bool = False,
+                     memo: dict = None) -> dict:
+        """
+        Obtiene las coincidencias de cada criterio de texto no vacío de la
+        consulta.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            fuzzy (bool): Si es True, se incluyen los valores similares.
+            memo (dict): Coincidencias compartidas entre búsquedas o None.
+            
+        Returns:
+            dict: Un diccionario que asocia cada criterio con los códigos de
+            los valores que coinciden y su similitud.
+        """
+        return {criterion: self._match_codes(catalog, column, 
+                                             query[criterion], fuzzy, memo)
+                for criterion, column in self.TEXT_COLUMNS.items()
+                if query[criterion]}
+
     def _calculate_score_vectorized(self, 
-                                    vehicles: pd.DataFrame, 
-                                    query: dict) -> np.ndarray:
+                                    catalog: VehicleCatalog,
+                                    rows: np.ndarray, 
+                                    query: dict,
+                                    matches: dict) -> np.ndarray:
         """
         Calcula la puntuación de cada fila en función de los criterios de 
-        búsqueda utilizando un enfoque vectorizado.
+        búsqueda utilizando un enfoque vectorizado. Cada criterio de texto
+        aporta su peso multiplicado por la similitud del valor de la fila,
+        que se obtiene a través de los códigos de la columna.
         
         Args:
-            vehicles (pd.DataFrame): DataFrame de vehículos.
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            rows (np.ndarray): Números de fila de los vehículos a puntuar.
             query (dict): Un diccionario que contiene los criterios de 
             búsqueda.
+            matches (dict): Las coincidencias de cada criterio de texto.
             
         Returns:
             np.ndarray: Un array numpy que contiene la puntuación de 
             cada fila.
         """
         # Inicializar el vector de puntuaciones
-        scores = np.zeros(len(vehicles))
+        scores = np.zeros(len(rows))
         
         # Calcular la puntuación para cada criterio de búsqueda
-        if 'brand' in query:
-            scores += np.where(
-                vehicles['marca'].str.contains(
-                    query['brand'], case=False), 
-                self.WEIGHTS.get('brand', 0), 0)
-        if 'sub_brand' in query:
-            scores += np.where(
-                vehicles['submarca'].str.contains(
-                    query['sub_brand'], case=False), 
-                self.WEIGHTS.get('sub_brand', 0), 0)
-        if 'version' in query:
-            scores += np.where(
-                vehicles['version'].str.contains(
-                    query['version'], case=False), 
-                self.WEIGHTS.get('version', 0), 0)
-        if 'model_year' in query:
+        for criterion, column in self.TEXT_COLUMNS.items():
+            weight = self.WEIGHTS.get(criterion, 0)
+            if criterion not in matches:
+                # Un texto vacío está contenido en todos los valores
+                scores += weight
+                continue
+            codes, similarity = matches[criterion]
+            if len(codes) == 0:
+                continue
+            row_codes = catalog.indexes[column].codes[rows]
+            positions = np.searchsorted(codes, row_codes)
+            positions[positions == len(codes)] = 0
+            scores += np.where(codes[positions] == row_codes,
+                               weight * similarity[positions], 0)
+        if query['model_year'] is not None:
             scores += np.where(
-                vehicles['modelo'] == query['model_year'],
+                catalog.model_years[rows] == query['model_year'],
                 self.WEIGHTS.get('model_year', 0), 0)
         return scores
     
-    def search(self, query: dict) -> pd.DataFrame:
+    def _filter_rows(self, 
+                     catalog: VehicleCatalog, 
+                     query: dict, 
+                     matches: dict,
+                     fuzzy: bool = False,
+                     memo: dict = None) -> np.ndarray:
         """
-        Busca vehículos en el dataset utilizando los criterios de búsqueda 
-        especificados en el diccionario de consulta.
+        Obtiene las filas que cumplen todos los criterios de búsqueda
+        intersectando los resultados de los índices de texto, de los 
+        filtros exactos y de los índices ordenados de los filtros por rango.
         
         Args:
-            query (dict): Un diccionario que contiene los criterios de búsqueda.
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario que contiene los criterios de 
+            búsqueda.
+            matches (dict): Las coincidencias de cada criterio de texto.
+            fuzzy (bool): Si es True, las coincidencias incluyen los valores
+                similares.
+            memo (dict): Diccionario en el que se guardan las filas de cada
+                criterio ya calculadas, para compartirlas entre varias 
+                búsquedas, o None.
             
         Returns:
-            pd.DataFrame: Un DataFrame de Pandas que contiene los resultados de 
-            la búsqueda.
+            np.ndarray: Un array numpy ordenado con los números de fila.
         """
-        # Convertir el QueryDict a un diccionario si es necesario
-        if isinstance(query, QueryDict):
-            query = self._querydict_to_dict(query)
+        if memo is None:
+            memo = {}
+        
+        # Obtener las filas de cada criterio de texto, de cada rango y de 
+        # cada filtro exacto
+        candidates = []
+        for criterion, (codes, _) in matches.items():
+            column = self.TEXT_COLUMNS[criterion]
+            key = ('text', column, query[criterion], fuzzy)
+            if key not in memo:
+                memo[key] = catalog.indexes[column].rows(codes)
+            candidates.append(memo[key])
+        for column, low, high in query['ranges']:
+            key = ('range', column, low, high)
+            if key not in memo:
+                memo[key] = catalog.range_indexes[column].search(low, high)
+            candidates.append(memo[key])
+        for column, value in query['filters']:
+            key = ('filter', column, value)
+            if key not in memo:
+                index = catalog.indexes[column]
+                memo[key] = index.rows(np.flatnonzero(index.values == value))
+            candidates.append(memo[key])
+        
+        # Intersectar los conjuntos empezando por el más pequeño
+        candidates.sort(key=len)
+        rows = None
+        for criterion_rows in candidates:
+            if rows is None:
+                rows = criterion_rows
+            else:
+                rows = np.intersect1d(rows, criterion_rows, 
+                                      assume_unique=True)
+        
+        if rows is None:
+            rows = np.arange(len(catalog), dtype=np.int32)
+        
+        if query['model_year'] is not None:
+            rows = rows[catalog.model_years[rows] == query['model_year']]
+        return rows
+    
+    def _match_rows(self, 
+                    catalog: VehicleCatalog, 
+                    query: dict, 
+                    fuzzy: bool = False,
+                    memo: dict = None) -> tuple:
+        """
+        Obtiene las filas que cumplen los criterios de búsqueda y su 
+        puntuación, descartando las filas con puntuación cero.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            fuzzy (bool): Si es True, se incluyen los valores similares.
+            memo (dict): Coincidencias y filas de cada criterio compartidas
+                entre varias búsquedas o None.
             
-        print(query)
-        # Copiar el DataFrame de vehículos
-        vehicles = self.vehicles
-
-        # Verificar si la consulta es nula o tiene valores nulos o vacíos
+        Returns:
+            tuple: Un array numpy con los números de fila y otro con su 
+            puntuación. La puntuación es None si la consulta es nula.
+        """
+        # Una consulta nula devuelve todos los vehículos sin puntuación
         if self._null_query(query):
-            # Ordenar los vehículos por su rendimiento en ciudad
-            result = vehicles.sort_values(
-                by='rendimiento_ciudad', ascending=True).iloc[:20]
-            
-            # Asignar un ID único a cada vehículo
-            result['id'] = range(len(result))
-            return result
+            return np.arange(len(catalog), dtype=np.int32), None
         
         # Filtrar los vehículos según los criterios de búsqueda
-        if query['brand'] is not None:
-            vehicles = vehicles[
-                vehicles['marca'].str.contains(query['brand'], 
-                                               case=False)]
-        if query['sub_brand'] is not None:
-            vehicles = vehicles[
-                vehicles['submarca'].str.contains(query['sub_brand'], 
-                                                  case=False)]
-        if query['version'] is not None:
-            vehicles = vehicles[
-                vehicles['version'].str.contains(query['version'], 
-                                                 case=False)]
-        if query['model_year'] is not None:
-            print("model year actived")
-            vehicles = vehicles[vehicles['modelo'] == query['model_year']]
+        matches = self._match_query(catalog, query, fuzzy, memo)
+        rows = self._filter_rows(catalog, query, matches, fuzzy, memo)
         
         # Calcular la puntuación de los vehículos seleccionados
-        scores = self._calculate_score_vectorized(vehicles, query)
+        scores = self._calculate_score_vectorized(catalog, rows, query, 
+                                                  matches)
         
-        # Asignar la puntuación a los vehículos
-        vehicles['score'] = scores
-
         # Eliminar vehículos con puntuación cero
-        vehicles = vehicles[scores > 0]
+        return rows[scores > 0], scores[scores > 0]
+    
+    def _rank_keys(self, 
+                   catalog: VehicleCatalog, 
+                   rows: np.ndarray, 
+                   scores: np.ndarray) -> list:
+        """
+        Obtiene las claves de ordenamiento de las filas, de mayor a menor 
+        prioridad y donde un valor mayor va primero. Los resultados se 
+        ordenan por puntuación y rendimiento en ciudad de mayor a menor o, 
+        si la consulta es nula, por rendimiento en ciudad de menor a mayor. 
+        Los rendimientos nulos van al final y los empates se resuelven por 
+        número de fila.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            rows (np.ndarray): Números de fila de los vehículos.
+            scores (np.ndarray): Puntuación de cada fila o None.
+            
+        Returns:
+            list: Una lista de arrays numpy con las claves de cada fila.
+        """
+        efficiency = catalog.efficiency[rows]
+        missing = np.isnan(efficiency)
+        tiebreak = -rows.astype(np.float64)
+        if scores is None:
+            return [np.where(missing, -np.inf, -efficiency), tiebreak]
+        return [scores, np.where(missing, -np.inf, efficiency), tiebreak]
+    
+    def _top_k(self, keys: list, k: int) -> np.ndarray:
+        """
+        Selecciona las k mejores posiciones según las claves usando 
+        selección parcial (np.partition) clave por clave en lugar de 
+        ordenar todas las filas. Solo se ordenan las k posiciones elegidas, 
+        por lo que el costo es O(n + k log k).
+        
+        Args:
+            keys (list): Claves de ordenamiento, de mayor a menor prioridad.
+                La última clave debe ser única para cada fila.
+            k (int): Número de posiciones a seleccionar.
+            
+        Returns:
+            np.ndarray: Las k mejores posiciones ordenadas.
+        """
+        candidates = np.arange(len(keys[0]))
+        if len(candidates) > k:
+            selected = []
+            needed = k
+            for key in keys:
+                values = key[candidates]
+                if len(values) <= needed:
+                    break
+                
+                # Obtener el k-ésimo mayor valor de la clave actual
+                kth = np.partition(values, len(values) - needed)[
+                    len(values) - needed]
+                better = values > kth
+                selected.append(candidates[better])
+                needed -= int(better.sum())
+                
+                # Desempatar los valores iguales con la siguiente clave
+                candidates = candidates[values == kth]
+            candidates = np.concatenate(selected + [candidates[:needed]])
+        
+        # Ordenar solo las posiciones seleccionadas
+        order = np.lexsort([key[candidates] for key in reversed(keys)])
+        return candidates[order[::-1]]
+    
+    def _build_result(self, 
+                      catalog: VehicleCatalog,
+                      rows: np.ndarray, 
+                      scores: np.ndarray, 
+                      offset: int = 0) -> pd.DataFrame:
+        """
+        Construye el DataFrame de resultados con las filas seleccionadas.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            rows (np.ndarray): Números de fila ordenados.
+            scores (np.ndarray): Puntuación de cada fila o None.
+            offset (int): Posición del primer resultado en la búsqueda.
+            
+        Returns:
+            pd.DataFrame: Un DataFrame de Pandas con los vehículos.
+        """
+        # Copiar solo las filas seleccionadas desde los arreglos de cada
+        # columna. Las columnas float32 se muestran con el decimal más corto
+        # que las representa (24.73 y no 24.729999542236328)
+        columns = {}
+        for name, column in catalog.vehicles.items():
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                columns[name] = pd.Categorical.from_codes(
+                    column.cat.codes.to_numpy()[rows], dtype=column.dtype)
+                continue
+            values = column.to_numpy()[rows]
+            if values.dtype == np.float32:
+                values = values.astype(str).astype(np.float64)
+            columns[name] = values
+        result = pd.DataFrame(columns, index=catalog.vehicles.index[rows])
+        
+        # Asignar la puntuación de cada fila
+        if scores is not None:
+            result['score'] = scores
+        
+        # Asignar un ID único a cada vehículo y guardar su número de fila en
+        # el catálogo, que identifica al vehículo dentro de esta versión
+        result['id'] = range(offset, offset + len(result))
+        result['row'] = rows
+        return result
+    
+    def search(self, query: dict, fuzzy: bool = False) -> pd.DataFrame:
+        """
+        Busca vehículos en el dataset utilizando los criterios de búsqueda 
+        especificados en el diccionario de consulta. A diferencia de 
+        search_page(), no se buscan vehículos similares cuando no hay 
+        coincidencias exactas: {'brand': 'toyta', 'sub_brand': 'corola'} 
+        no devuelve ningún vehículo salvo que se indique fuzzy=True.
+        
+        Args:
+            query (dict): Un diccionario que contiene los criterios de búsqueda.
+            fuzzy (bool): Si es True, también se encuentran los vehículos
+                cuyos textos se parecen a los de la consulta, por ejemplo 
+                'Toyota Corolla' para 'Toyta Corola'.
+            
+        Returns:
+            pd.DataFrame: Un DataFrame de Pandas que contiene los resultados de 
+            la búsqueda.
+        """
+        # Usar la misma versión del catálogo durante toda la búsqueda
+        catalog = self._current_catalog()
+        
+        # Normalizar los criterios de búsqueda
+        query = self._normalize_query(catalog, query)
+        
+        # Resolver la búsqueda en la base de datos si tiene esta versión del
+        # catálogo. La búsqueda difusa solo está disponible en memoria
+        if (self.database is not None and not fuzzy
+                and self.database.contains(catalog.version)):
+            return self._search_database(catalog, query)
+        
+        # Obtener los vehículos que cumplen los criterios y su puntuación
+        rows, scores = self._match_rows(catalog, query, fuzzy)
+        
+        # Seleccionar los mejores vehículos sin ordenar todos los candidatos
+        top = self._top_k(self._rank_keys(catalog, rows, scores), 
+                          self.PAGE_SIZE)
+        
+        return self._build_result(
+            catalog, rows[top], None if scores is None else scores[top])
+    
+    def _database_criteria(self, query: dict) -> dict:
+        """
+        Convierte los criterios normalizados en los argumentos de búsqueda 
+        de CatalogDatabase, con el peso de cada columna para puntuar los 
+        vehículos como en memoria.
         
-        # Ordenar los vehículos por puntuación en orden de mayor a menor
-        result = vehicles.sort_values(
-            by=['score', 'rendimiento_ciudad'], ascending=False).iloc[:20]
+        Args:
+            query (dict): Un diccionario con los criterios normalizados.
+            
+        Returns:
+            dict: Un diccionario con los textos ('texts'), el año modelo 
+            ('model_year'), los filtros exactos ('filters'), los filtros por
+            rango ('ranges') y los pesos ('weights'), que son None si la 
+            consulta es nula.
+        """
+        # Una consulta nula no se puntúa
+        weights = None
+        if not self._null_query(query):
+            weights = {column: self.WEIGHTS.get(criterion, 0)
+                       for criterion, column in self.TEXT_COLUMNS.items()}
+            weights['modelo'] = self.WEIGHTS.get('model_year', 0)
+        return {'texts': {column: query[criterion] 
+                          for criterion, column in self.TEXT_COLUMNS.items() 
+                          if query[criterion]},
+                'model_year': query['model_year'],
+                'filters': dict(query['filters']),
+                'ranges': query['ranges'],
+                'weights': weights}
+    
+    def _search_database(self, 
+                         catalog: VehicleCatalog, 
+                         query: dict) -> pd.DataFrame:
+        """
+        Busca vehículos en el catálogo de la base de datos, que resuelve en 
+        SQL los filtros, la puntuación, el orden y el límite de la búsqueda 
+        con los mismos criterios que la búsqueda en memoria. El resultado 
+        tiene las mismas columnas que el de search().
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            
+        Returns:
+            pd.DataFrame: Un DataFrame de Pandas con los vehículos.
+        """
+        criteria = self._database_criteria(query)
+        found = self.database.search(catalog.version, limit=self.PAGE_SIZE, 
+                                     **criteria)
         
-        # Asignar un ID único a cada vehículo
+        # Ordenar las columnas como en el catálogo y numerar los resultados
+        result = found[list(catalog.vehicles.columns)].set_axis(
+            found['row'].to_numpy())
+        if criteria['weights'] is not None:
+            result['score'] = found['score'].to_numpy()
         result['id'] = range(len(result))
+        result['row'] = found['row'].to_numpy()
+        return result
+    
+    def _facets(self, catalog: VehicleCatalog, rows: np.ndarray) -> dict:
+        """
+        Cuenta los vehículos encontrados por cada valor de las columnas de 
+        FACET_COLUMNS. Los conteos se obtienen con np.bincount sobre los 
+        códigos enteros calculados al cargar el catálogo, sin agrupar el 
+        DataFrame.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            rows (np.ndarray): Números de fila de los vehículos encontrados.
+            
+        Returns:
+            dict: Un diccionario que asocia cada columna con una lista de 
+            diccionarios con cada valor y su número de vehículos, de mayor 
+            a menor.
+        """
+        facets = {}
+        for column, (codes, values) in catalog.facet_codes.items():
+            row_codes = codes[rows]
+            counts = np.bincount(row_codes[row_codes >= 0], 
+                                 minlength=len(values))
+            present = np.flatnonzero(counts)
+            order = present[np.argsort(-counts[present], kind='stable')]
+            facets[column] = [{'value': values[code], 
+                               'count': int(counts[code])}
+                              for code in order]
+        return facets
+    
+    def _query_hash(self, catalog: VehicleCatalog, query: dict) -> str:
+        """
+        Obtiene un resumen corto de los criterios normalizados para 
+        comprobar que un cursor se usa con la misma consulta.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            
+        Returns:
+            str: El resumen de la consulta.
+        """
+        data = repr(self._cache_key(catalog, query)[1:]).encode('utf-8')
+        return hashlib.sha1(data).hexdigest()[:16]
+    
+    def _encode_cursor(self, state: dict) -> str:
+        """
+        Codifica el estado de la paginación en un cursor opaco.
+        
+        Args:
+            state (dict): Estado de la paginación.
+            
+        Returns:
+            str: El cursor codificado en base64.
+        """
+        data = json.dumps(state, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+    
+    def _decode_cursor(self, 
+                       catalog: VehicleCatalog, 
+                       cursor: str, 
+                       query: dict) -> dict:
+        """
+        Decodifica un cursor y comprueba que corresponda a la misma consulta
+        y a la misma versión del catálogo.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            cursor (str): El cursor codificado en base64.
+            query (dict): Un diccionario con los criterios normalizados.
+            
+        Returns:
+            dict: Estado de la paginación.
+            
+        Raises:
+            ValueError: Si el cursor no es válido o ha caducado.
+        """
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, UnicodeError) as error:
+            raise ValueError('Cursor no válido') from error
+        if not isinstance(state, dict) or not {'v', 'q', 'f', 'k', 'o'} <= set(state):
+            raise ValueError('Cursor no válido')
+        if (state['v'] != catalog.version 
+                or state['q'] != self._query_hash(catalog, query)):
+            raise ValueError('El cursor no corresponde a esta búsqueda')
+        return state
+    
+    def _find_page(self, 
+                   catalog: VehicleCatalog, 
+                   query: dict, 
+                   cursor: str = None, 
+                   page_size: int = None) -> dict:
+        """
+        Obtiene las filas de una página de resultados y el cursor de la 
+        siguiente. Cada página se obtiene descartando los vehículos 
+        anteriores al cursor y seleccionando los siguientes con selección 
+        parcial, sin ordenar todos los candidatos. Si no hay coincidencias 
+        exactas se buscan vehículos similares con el modo difuso.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            cursor (str): Cursor devuelto por la página anterior o None para 
+                la primera página.
+            page_size (int): Número de vehículos por página.
+            
+        Returns:
+            dict: Un diccionario con los números de fila ordenados ('rows'), 
+            su puntuación ('scores'), la posición del primer resultado 
+            ('offset'), el cursor de la siguiente página ('next_cursor') y 
+            las facetas ('facets').
+            
+        Raises:
+            ValueError: Si el cursor no es válido o ha caducado.
+        """
+        if cursor is None:
+            state = {'v': catalog.version,
+                     'q': self._query_hash(catalog, query),
+                     'f': False,
+                     'k': None,
+                     'o': 0}
+            
+            # Resolver la primera página en la base de datos si tiene esta 
+            # versión del catálogo. La búsqueda difusa solo está disponible 
+            # en memoria
+            if (self.database is not None 
+                    and self.database.contains(catalog.version)):
+                found = self._find_database_page(catalog, query, state, 
+                                                 page_size)
+                if found is not None:
+                    return found
+            rows, scores = self._match_rows(catalog, query)
+            
+            # Buscar vehículos similares si no hay coincidencias exactas
+            if len(rows) == 0:
+                state['f'] = True
+                rows, scores = self._match_rows(catalog, query, fuzzy=True)
+        else:
+            state = self._decode_cursor(catalog, cursor, query)
+            rows, scores = self._match_rows(catalog, query, 
+                                            fuzzy=state['f'])
+        keys = self._rank_keys(catalog, rows, scores)
+        facets = self._facets(catalog, rows)
+        
+        # Descartar los vehículos que ya se devolvieron en páginas anteriores
+        if state['k'] is not None:
+            after = np.zeros(len(rows), dtype=bool)
+            equal = np.ones(len(rows), dtype=bool)
+            for values, last in zip(keys, state['k']):
+                after |= equal & (values < last)
+                equal &= values == last
+            rows = rows[after]
+            scores = None if scores is None else scores[after]
+            keys = [values[after] for values in keys]
+        
+        # Seleccionar un vehículo más para saber si hay otra página
+        top = self._top_k(keys, page_size + 1)
+        next_cursor = None
+        if len(top) > page_size:
+            top = top[:page_size]
+            state['k'] = [float(values[top[-1]]) for values in keys]
+            state['o'] += page_size
+            next_cursor = self._encode_cursor(state)
+        
+        return {'rows': rows[top],
+                'scores': None if scores is None else scores[top],
+                'offset': state['o'] - page_size if next_cursor else state['o'],
+                'next_cursor': next_cursor,
+                'facets': facets}
+    
+    def _find_database_page(self, 
+                            catalog: VehicleCatalog, 
+                            query: dict, 
+                            state: dict, 
+                            page_size: int) -> dict:
+        """
+        Obtiene la primera página de resultados y sus facetas en la base de 
+        datos, con el mismo orden que en memoria. El cursor de la siguiente 
+        página se calcula con las claves de ordenamiento del último 
+        vehículo, por lo que las páginas siguientes se pueden pedir en 
+        memoria.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            query (dict): Un diccionario con los criterios normalizados.
+            state (dict): Estado de la paginación de la primera página.
+            page_size (int): Número de vehículos por página.
+            
+        Returns:
+            dict: Un diccionario con el mismo formato que _find_page() o 
+            None si no hay coincidencias exactas.
+        """
+        criteria = self._database_criteria(query)
+        found = self.database.search(catalog.version, limit=page_size + 1, 
+                                     **criteria)
+        if found.empty:
+            return None
+        rows = found['row'].to_numpy(dtype=np.intp)
+        scores = None
+        if criteria['weights'] is not None:
+            scores = found['score'].to_numpy(dtype=np.float64)
+        
+        # Seleccionar un vehículo más para saber si hay otra página
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            scores = None if scores is None else scores[:page_size]
+            keys = self._rank_keys(catalog, rows[-1:], 
+                                   None if scores is None else scores[-1:])
+            state['k'] = [float(values[0]) for values in keys]
+            state['o'] = page_size
+            next_cursor = self._encode_cursor(state)
+        
+        facets = self.database.facets(catalog.version, 
+                                      columns=self.FACET_COLUMNS, **criteria)
+        return {'rows': rows,
+                'scores': scores,
+                'offset': 0,
+                'next_cursor': next_cursor,
+                'facets': facets}
+    
+    def search_page(self, 
+                    query: dict, 
+                    cursor: str = None, 
+                    page_size: int = None) -> dict:
+        """
+        Busca vehículos en el dataset y devuelve una página de resultados 
+        junto con un cursor opaco para pedir la siguiente. Las páginas se 
+        guardan en la caché con la consulta normalizada, el cursor y la 
+        versión del catálogo como clave. Si hay base de datos y tiene esta 
+        versión del catálogo, la primera página se resuelve en ella, salvo 
+        que no haya coincidencias exactas y se busquen vehículos similares; 
+        las páginas siguientes se resuelven en memoria.
+        
+        Args:
+            query (dict): Un diccionario que contiene los criterios de búsqueda.
+            cursor (str): Cursor devuelto por la página anterior o None para 
+                la primera página.
+            page_size (int): Número de vehículos por página.
+            
+        Returns:
+            dict: Un diccionario con la lista de vehículos ('vehicles'), el 
+            cursor de la siguiente página ('next_cursor'), que es None si 
+            no hay más resultados, el número de vehículos encontrados por 
+            cada valor de las columnas de FACET_COLUMNS ('facets') y la 
+            versión del catálogo a la que se refieren las filas de los 
+            vehículos ('version').
+            
+        Raises:
+            ValueError: Si el cursor no es válido o ha caducado.
+        """
+        catalog = self._current_catalog()
+        query = self._normalize_query(catalog, query)
+        page_size = page_size or self.PAGE_SIZE
+        key = self._cache_key(catalog, query) + (cursor, page_size)
+        
+        # Devolver la página guardada si la consulta ya se ha hecho
+        page = self.cache.get(key)
+        if page is not None:
+            return page
+        
+        found = self._find_page(catalog, query, cursor, page_size)
+        result = self._build_result(catalog, found['rows'], found['scores'],
+                                    offset=found['offset'])
+        page = {'vehicles': result.to_dict(orient='records'),
+                'next_cursor': found['next_cursor'],
+                'facets': found['facets'],
+                'version': catalog.version}
+        self.cache.put(key, page)
+        return page
+    
+    def _columns(self, catalog: VehicleCatalog, rows: np.ndarray) -> list:
+        """
+        Obtiene los valores de las columnas de PAYLOAD_COLUMNS para las 
+        filas indicadas, directamente desde los arreglos del catálogo. Las 
+        columnas numéricas se devuelven como arreglos de numpy y las de 
+        texto como listas, con None en lugar de los valores nulos.
+        
+        Args:
+            catalog (VehicleCatalog): Versión del catálogo en la que se busca.
+            rows (np.ndarray): Números de fila ordenados.
+            
+        Returns:
+            list: Una lista con los valores de cada columna.
+        """
+        values = []
+        for name in self.PAYLOAD_COLUMNS:
+            column = catalog.vehicles[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                codes = column.cat.codes.to_numpy()[rows]
+                texts = column.cat.categories.to_numpy(dtype=object)[codes]
+                texts[codes < 0] = None
+                values.append(texts.tolist())
+            elif column.dtype == object:
+                texts = column.to_numpy()[rows]
+                values.append(np.where(pd.isna(texts), None, texts).tolist())
+            else:
+                values.append(np.asarray(column.to_numpy()[rows]))
+        values.append(np.asarray(rows))
+        return values
+    
+    def search_page_json(self, 
+                         query: dict, 
+                         cursor: str = None, 
+                         page_size: int = None) -> bytes:
+        """
+        Busca vehículos en el dataset y devuelve una página de resultados 
+        serializada en JSON con formato columnar: los nombres de las 
+        columnas se escriben una sola vez ('columns') y los valores de cada 
+        columna en un arreglo ('values'), en el mismo orden. Solo se 
+        incluyen las columnas de PAYLOAD_COLUMNS y el número de fila de 
+        cada vehículo ('row'). La página se serializa con orjson desde los 
+        arreglos de numpy y se guarda ya serializada en la caché.
+        
+        Args:
+            query (dict): Un diccionario que contiene los criterios de búsqueda.
+            cursor (str): Cursor devuelto por la página anterior o None para 
+                la primera página.
+            page_size (int): Número de vehículos por página.
+            
+        Returns:
+            bytes: La página en JSON, con las columnas ('columns'), sus 
+            valores ('values'), el cursor de la siguiente página 
+            ('next_cursor'), las facetas ('facets') y la versión del 
+            catálogo ('version').
+            
+        Raises:
+            ValueError: Si el cursor no es válido o ha caducado.
+        """
+        catalog = self._current_catalog()
+        query = self._normalize_query(catalog, query)
+        page_size = page_size or self.PAGE_SIZE
+        key = self._cache_key(catalog, query) + (cursor, page_size, 'json')
+        
+        # Devolver la página guardada si la consulta ya se ha hecho
+        payload = self.cache.get(key)
+        if payload is not None:
+            return payload
+        
+        found = self._find_page(catalog, query, cursor, page_size)
+        start = time.perf_counter()
+        payload = orjson.dumps(
+            {'columns': self.PAYLOAD_COLUMNS + ['row'],
+             'values': self._columns(catalog, found['rows']),
+             'next_cursor': found['next_cursor'],
+             'facets': found['facets'],
+             'version': catalog.version},
+            option=orjson.OPT_SERIALIZE_NUMPY)
+        logger.debug('Página de %s vehículos serializada en %.2f ms (%s bytes).',
+                     len(found['rows']), 
+                     (time.perf_counter() - start) * 1000, len(payload))
+        self.cache.put(key, payload)
+        return payload
+    
+    def search_batch(self, queries: list, k: int = None) -> bytes:
+        """
+        Resuelve varias búsquedas en una sola pasada sobre la misma versión 
+        del catálogo y devuelve los k mejores vehículos de cada una. Las 
+        búsquedas iguales después de normalizarlas se resuelven una vez, las
+        coincidencias y las filas de cada criterio (texto, rango o filtro 
+        exacto) se calculan una vez para todo el lote y los valores de los 
+        vehículos de todas las búsquedas se copian del catálogo en una sola 
+        selección. Como en search_page(), si una búsqueda no tiene 
+        coincidencias exactas se buscan vehículos similares. Los k mejores 
+        vehículos de cada búsqueda se guardan en la caché de resultados. 
+        Los lotes siempre se resuelven en memoria, porque comparten las 
+        coincidencias de cada criterio entre las búsquedas.
+        
+        Args:
+            queries (list): Lista de diccionarios con los criterios de cada
+                búsqueda.
+            k (int): Número de vehículos por búsqueda. Por defecto es 
+                PAGE_SIZE.
+            
+        Returns:
+            bytes: Las búsquedas en JSON, con las columnas ('columns'), los 
+            resultados de cada búsqueda en el orden recibido ('results') y 
+            la versión del catálogo ('version'). Cada resultado tiene los 
+            valores de cada columna ('values'), la puntuación de cada 
+            vehículo ('scores'), que es None si la búsqueda es nula, el 
+            número de vehículos encontrados ('total') y si se usó la 
+            búsqueda difusa ('fuzzy').
+            
+        Raises:
+            ValueError: Si hay más de BATCH_SIZE búsquedas o alguna no es 
+                un diccionario.
+        """
+        if len(queries) > self.BATCH_SIZE:
+            raise ValueError(f'Se admiten como máximo {self.BATCH_SIZE} '
+                             'búsquedas por lote')
+        if not all(isinstance(query, (dict, QueryDict)) for query in queries):
+            raise ValueError('Cada búsqueda debe ser un objeto')
+        
+        catalog = self._current_catalog()
+        k = k or self.PAGE_SIZE
+        memo = {}
+        found = {}
+        keys = []
+        for query in queries:
+            query = self._normalize_query(catalog, query)
+            key = self._cache_key(catalog, query) + ('top', k)
+            keys.append(key)
+            if key in found:
+                continue
+            
+            # Usar los resultados guardados si la búsqueda ya se ha hecho
+            found[key] = self.cache.get(key)
+            if found[key] is not None:
+                continue
+            
+            fuzzy = False
+            rows, scores = self._match_rows(catalog, query, memo=memo)
+            if len(rows) == 0:
+                fuzzy = True
+                rows, scores = self._match_rows(catalog, query, fuzzy=True, 
+                                                memo=memo)
+            top = self._top_k(self._rank_keys(catalog, rows, scores), k)
+            found[key] = (rows[top], None if scores is None else scores[top],
+                          len(rows), fuzzy)
+            self.cache.put(key, found[key])
+        
+        # Copiar los valores de todas las búsquedas en una sola selección
+        unique = list(found)
+        bounds = np.cumsum([0] + [len(found[key][0]) for key in unique])
+        values = self._columns(catalog, np.concatenate(
+            [found[key][0] for key in unique] + [np.empty(0, dtype=np.int32)]))
+        positions = {key: position for position, key in enumerate(unique)}
+        
+        results = []
+        for key in keys:
+            start = bounds[positions[key]]
+            stop = bounds[positions[key] + 1]
+            _, scores, total, fuzzy = found[key]
+            results.append({
+                'values': [column[start:stop] for column in values],
+                'scores': scores,
+                'total': total,
+                'fuzzy': fuzzy})
+        return orjson.dumps({'columns': self.PAYLOAD_COLUMNS + ['row'],
+                             'results': results,
+                             'version': catalog.version},
+                            option=orjson.OPT_SERIALIZE_NUMPY)
+    
+    def search_records(self, query: dict) -> list:
+        """
+        Busca vehículos en el dataset y devuelve la primera página de 
+        resultados como una lista de diccionarios, usando la caché de 
+        resultados de search_page(query).
         
-        return result
\ No newline at end of file
+        Args:
+            query (dict): Un diccionario que contiene los criterios de búsqueda.
+            
+        Returns:
+            list: Una lista de diccionarios, uno por vehículo encontrado.
+        """
+        return self.search_page(query)['vehicles']
+    
+    def autocomplete(self, 
+                     criterion: str, 
+                     prefix: str, 
+                     limit: int = None) -> list:
+        """
+        Sugiere los valores más populares de un criterio de texto que 
+        empiezan por un prefijo. No usa el DataFrame del catálogo.
+        
+        Args:
+            criterion (str): Criterio de búsqueda ('brand', 'sub_brand' o 
+                'version').
+            prefix (str): Prefijo escrito por el usuario.
+            limit (int): Número máximo de sugerencias.
+            
+        Returns:
+            list: Una lista de diccionarios con cada valor sugerido y el 
+            número de vehículos que lo tienen.
+            
+        Raises:
+            KeyError: Si el criterio no es un criterio de texto.
+        """
+        catalog = self._current_catalog()
+        completer = catalog.completers[self.TEXT_COLUMNS[criterion]]
+        return [{'value': value, 'count': count}
+                for value, count in completer.complete(prefix, limit)]
+    
+    def similar(self, 
+                row: int, 
+                k: int = None, 
+                better_efficiency: bool = False,
+                version: int = None) -> dict:
+        """
+        Devuelve los vehículos más parecidos a un vehículo del catálogo 
+        según su rendimiento, emisiones, potencia y tamaño. Los vecinos se 
+        obtienen del árbol k-d construido al cargar el catálogo, sin 
+        calcular la distancia a todos los vehículos.
+        
+        Args:
+            row (int): Número de fila del vehículo de referencia, como el 
+                campo 'row' de los resultados de search_page().
+            k (int): Número de vehículos a devolver.
+            better_efficiency (bool): Si es True, solo se devuelven los 
+                vehículos con mayor rendimiento en ciudad que el de 
+                referencia.
+            version (int): Versión del catálogo a la que se refiere la fila
+                o None para usar la versión publicada.
+            
+        Returns:
+            dict: Un diccionario con la lista de vehículos ordenados del más
+            al menos parecido, cada uno con su distancia ('vehicles'), y la 
+            versión del catálogo ('version').
+            
+        Raises:
+            ValueError: Si la fila no existe o pertenece a otra versión del 
+                catálogo.
+        """
+        catalog = self._current_catalog()
+        if version is not None and version != catalog.version:
+            raise ValueError('El catálogo cambió; repita la búsqueda')
+        if not 0 <= row < len(catalog):
+            raise ValueError('Vehículo no válido')
+        
+        # Permitir solo los vehículos más eficientes que el de referencia
+        allowed = None
+        if better_efficiency:
+            allowed = catalog.efficiency > catalog.efficiency[row]
+        rows, distances = catalog.similarity.neighbors(
+            row, k or self.SIMILAR_SIZE, allowed)
+        
+        result = self._build_result(catalog, rows, None)
+        result['distance'] = distances
+        return {'vehicles': result.to_dict(orient='records'),
+                'version': catalog.version}
+    
+    def selection(self, rows: list, version: int = None) -> dict:
+        """
+        Devuelve los vehículos seleccionados en la página de comparación a 
+        partir de su número de fila. La versión del catálogo se devuelve 
+        junto a los vehículos para analizarlos con los mismos datos aunque 
+        se publique otra versión mientras tanto.
+        
+        Args:
+            rows (list): Números de fila de los vehículos, como el campo 
+                'row' de los resultados de search_page().
+            version (int): Versión del catálogo a la que se refieren las 
+                filas o None para usar la versión publicada.
+            
+        Returns:
+            dict: Un diccionario con la lista de vehículos en el orden de 
+            las filas ('vehicles'), los números de fila ('rows') y la versión
+            del catálogo que los contiene ('catalog').
+            
+        Raises:
+            ValueError: Si alguna fila no existe, si hay más de 
+                SELECTION_SIZE o si pertenecen a otra versión del catálogo.
+        """
+        catalog = self._current_catalog()
+        if version is not None and version != catalog.version:
+            raise ValueError('El catálogo cambió; repita la búsqueda')
+        rows = np.asarray(rows, dtype=np.intp).reshape(-1)
+        if len(rows) > self.SELECTION_SIZE:
+            raise ValueError('Demasiados vehículos seleccionados')
+        if ((rows < 0) | (rows >= len(catalog))).any():
+            raise ValueError('Vehículo no válido')
+        
+        result = self._build_result(catalog, rows, None)
+        return {'vehicles': result.to_dict(orient='records'),
+                'rows': rows,
+                'catalog': catalog}
+    
+    def memory_report(self, budget: int = None) -> dict:
+        """
+        Devuelve la memoria que ocupa cada columna del catálogo publicado, 
+        antes (tipos por defecto de pandas) y después de los tipos 
+        compactos, la de sus índices y la memoria residente del proceso 
+        frente a la memoria disponible de la máquina.
+        
+        Args:
+            budget (int): Memoria disponible de la máquina en bytes. Por 
+                defecto es MEMORY_BUDGET.
+            
+        Returns:
+            dict: El informe de VehicleCatalog.memory_report() con la 
+            versión del catálogo ('version'), la memoria disponible 
+            ('budget'), la memoria residente del proceso ('rss') y la que 
+            queda libre ('remaining'). Estas dos son None si el sistema 
+            operativo no permite leer la memoria residente.
+        """
+        catalog = self.catalog
+        report = catalog.memory_report()
+        report['version'] = catalog.version
+        report['budget'] = budget or self.MEMORY_BUDGET
+        report['rss'] = self._resident_memory()
+        report['remaining'] = (None if report['rss'] is None 
+                               else report['budget'] - report['rss'])
+        return report
+    
+    def _resident_memory(self) -> int:
+        """
+        Obtiene la memoria residente del proceso en Linux.
+        
+        Args:
+            Self
+            
+        Returns:
+            int: Memoria residente en bytes o None si no se puede leer.
+        """
+        try:
+            with open('/proc/self/statm', encoding='ascii') as file:
+                pages = int(file.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    
+    def warm_up(self, queries: list) -> int:
+        """
+        Precarga en la caché de resultados la primera página de cada 
+        búsqueda, por ejemplo las más frecuentes del registro de búsquedas, 
+        para que las primeras peticiones tras arrancar un worker no 
+        encuentren la caché vacía.
+        
+        Args:
+            queries (list): Lista de tuplas con el formato de la respuesta 
+                ('records' para search_page() o 'json' para 
+                search_page_json()) y los criterios de la búsqueda, como las 
+                devuelve QueryLog.top().
+            
+        Returns:
+            int: Número de búsquedas precargadas.
+        """
+        start = time.perf_counter()
+        warmed = 0
+        for kind, query, *_ in queries:
+            try:
+                if kind == 'json':
+                    self.search_page_json(query)
+                else:
+                    self.search_page(query)
+            except (ValueError, KeyError, TypeError) as error:
+                logger.warning('No fue posible precargar la búsqueda %s: %s',
+                               query, error)
+                continue
+            warmed += 1
+        if warmed:
+            logger.info('%s búsquedas precargadas en %.0f ms.', warmed,
+                        (time.perf_counter() - start) * 1000)
+        return warmed
@@ -0,0 +1,141 @@
+"""
+Módulo que contiene la clase SimilarityIndex, un índice espacial sobre las
+características numéricas de los vehículos para encontrar los vehículos
+más parecidos a uno dado.
+
+Clases:
+    SimilarityIndex: Árbol k-d sobre las características estandarizadas de
+        cada vehículo.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - numpy
+    - pandas
+    - cKDTree from scipy.spatial
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+
+class SimilarityIndex:
+    """
+    Árbol k-d sobre las características numéricas estandarizadas de cada
+    vehículo. Cada característica se centra en su media y se divide entre su
+    desviación estándar, de modo que todas pesan lo mismo en la distancia
+    euclidiana; los valores nulos se sustituyen por la media. Los vecinos
+    más cercanos de un vehículo se obtienen recorriendo el árbol, en lugar
+    de calcular la distancia a todos los vehículos del catálogo.
+
+    Atributos:
+        DIRECT_SIZE (int): Número de filas permitidas por debajo del cual
+            se calcula directamente su distancia, sin recorrer el árbol.
+        columns (list): Columnas que forman las características.
+        mean (np.ndarray): Media de cada característica.
+        scale (np.ndarray): Desviación estándar de cada característica.
+        tree (cKDTree): Árbol k-d con las características estandarizadas.
+
+    Métodos:
+        neighbors(row, k, allowed): Devuelve los k vehículos más parecidos a
+            una fila del catálogo.
+    """
+    # Definir cuándo se calcula la distancia a las filas permitidas
+    DIRECT_SIZE = 256
+
+
+    def __init__(self, features: pd.DataFrame):
+        """
+        Estandariza las características y construye el árbol k-d.
+
+        Args:
+            features (pd.DataFrame): DataFrame con una columna por
+                característica y una fila por vehículo. Los valores no
+                numéricos se consideran nulos.
+
+        Returns:
+            None
+        """
+        self.columns = list(features.columns)
+        points = np.column_stack([
+            pd.to_numeric(features[column], errors='coerce').to_numpy(
+                dtype=np.float64)
+            for column in self.columns])
+
+        # Estandarizar cada característica; las constantes o vacías no
+        # aportan a la distancia
+        missing = np.isnan(points)
+        present = (~missing).sum(axis=0)
+        sums = np.where(missing, 0, points).sum(axis=0)
+        self.mean = np.divide(sums, present, out=np.zeros(points.shape[1]),
+                              where=present > 0)
+        centered = np.where(missing, 0, points - self.mean)
+        variance = np.divide((centered ** 2).sum(axis=0), present,
+                             out=np.zeros(points.shape[1]),
+                             where=present > 0)
+        self.scale = np.sqrt(variance)
+        self.scale[self.scale == 0] = 1
+        self.tree = cKDTree(centered / self.scale)
+
+    def __len__(self) -> int:
+        """Número de vehículos del índice."""
+        return self.tree.n
+
+    def neighbors(self,
+                  row: int,
+                  k: int,
+                  allowed: np.ndarray = None) -> tuple:
+        """
+        Devuelve los k vehículos más parecidos a una fila del catálogo, sin
+        incluir la propia fila. Si se indican las filas permitidas, se
+        piden al árbol cada vez más vecinos hasta reunir k permitidos, o
+        todos los permitidos si hay menos de k. Cuando hay menos de
+        DIRECT_SIZE filas permitidas, como al pedir vehículos más
+        eficientes que los más eficientes del catálogo, se calcula
+        directamente su distancia en lugar de recorrer el árbol.
+
+        Args:
+            row (int): Número de fila del vehículo de referencia.
+            k (int): Número de vehículos a devolver.
+            allowed (np.ndarray): Arreglo booleano con las filas que pueden
+                devolverse o None si pueden devolverse todas.
+
+        Returns:
+            tuple: Arreglo con los números de fila de los vehículos, del más
+            al menos parecido, y arreglo con su distancia.
+
+        Raises:
+            IndexError: Si la fila no existe en el catálogo.
+        """
+        if not 0 <= row < len(self):
+            raise IndexError(f'La fila {row} no existe en el catálogo')
+
+        point = self.tree.data[row]
+        target = k
+        if allowed is not None:
+            # Contar las filas que pueden devolverse, sin la propia fila
+            candidates = np.flatnonzero(allowed)
+            candidates = candidates[candidates != row]
+            target = min(k, len(candidates))
+            if target == 0:
+                return (np.empty(0, dtype=np.intp),
+                        np.empty(0, dtype=np.float64))
+            if len(candidates) <= self.DIRECT_SIZE:
+                distances = np.sqrt(((self.tree.data[candidates] - point)
+                                     ** 2).sum(axis=1))
+                order = np.lexsort((candidates, distances))[:target]
+                return candidates[order], distances[order]
+
+        count = k + 1
+        while True:
+            count = min(count, len(self))
+            distances, rows = self.tree.query(point, k=count)
+            distances, rows = np.atleast_1d(distances), np.atleast_1d(rows)
+            keep = rows != row
+            if allowed is not None:
+                keep &= allowed[rows]
+            if keep.sum() >= target or count == len(self):
+                return rows[keep][:k], distances[keep][:k]
+            count *= 4
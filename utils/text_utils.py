@@ -0,0 +1,32 @@
+"""
+Módulo con funciones auxiliares para normalizar textos antes de compararlos
+en las búsquedas del catálogo de vehículos.
+
+Clases:
+    No hay clases en este módulo.
+
+Funciones:
+    normalize_text(text): Convierte un texto a minúsculas y elimina sus
+        tildes y diacríticos.
+
+Dependencias:
+    - unicodedata
+"""
+import unicodedata
+
+
+
+def normalize_text(text: str) -> str:
+    """
+    Convierte un texto a minúsculas y elimina sus tildes y diacríticos, de
+    modo que 'Automático' y 'automatico' se consideren iguales.
+
+    Args:
+        text (str): Texto a normalizar.
+
+    Returns:
+        str: Texto normalizado.
+    """
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(char for char in decomposed
+                   if not unicodedata.combining(char))
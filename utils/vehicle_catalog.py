@@ -0,0 +1,423 @@
+"""
+Módulo que contiene la clase VehicleCatalog, una versión inmutable del
+catálogo de vehículos junto con todos los índices que se usan para
+buscar en él.
+
+Clases:
+    VehicleCatalog: Versión del catálogo de vehículos con sus datos e
+        índices, que no se modifica después de construirse.
+
+Funciones:
+    No hay funciones en este módulo.
+
+Dependencias:
+    - pandas
+    - numpy
+    - FuzzyIndex from utils.fuzzy_index
+    - PrefixCompleter from utils.autocomplete
+    - NumericRangeIndex from utils.range_index
+    - VehicleAnalyzer from utils.analyze_vehicles
+    - NGramIndex from utils.ngram_index
+    - QueryParser from utils.query_parser
+    - SimilarityIndex from utils.similarity_index
+"""
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from utils.analyze_vehicles import VehicleAnalyzer
+from utils.autocomplete import PrefixCompleter
+from utils.fuzzy_index import FuzzyIndex
+from utils.ngram_index import NGramIndex
+from utils.query_parser import QueryParser
+from utils.range_index import NumericRangeIndex
+from utils.similarity_index import SimilarityIndex
+
+
+
+class VehicleCatalog:
+    """
+    Versión del catálogo de vehículos con sus datos e índices. Se construye
+    completa antes de publicarse y no se modifica después, de modo que una
+    búsqueda que empezó con una versión termina con ella aunque entretanto
+    se publique otra. Los arreglos de los índices se marcan como de solo
+    lectura y las columnas mapeadas desde el snapshot ya lo son, por lo que
+    varios hilos pueden buscar a la vez en la misma versión sin candados.
+
+    Atributos:
+        TEXT_COLUMNS (list): Lista de columnas de texto que admiten
+            búsqueda difusa y autocompletado.
+        CATEGORICAL_COLUMNS (list): Lista de columnas que se codifican
+            como categorías.
+        RANGE_COLUMNS (list): Lista de columnas numéricas que admiten
+            filtros por rango.
+        FACET_COLUMNS (list): Lista de columnas para las que se cuentan los
+            resultados de cada búsqueda.
+        SIMILARITY_COLUMNS (list): Lista de columnas numéricas con las que
+            se comparan los vehículos para buscar vehículos similares.
+        version (int): Versión del snapshot del que proviene el catálogo.
+        vehicles (pd.DataFrame): Un DataFrame de Pandas que contiene
+            el dataset de vehículos.
+        indexes (dict): Un diccionario con el índice de n-gramas de cada
+            columna categórica.
+        fuzzy_indexes (dict): Un diccionario con el índice de similitud de
+            cada columna de texto.
+        completers (dict): Un diccionario con el autocompletado por prefijo
+            de cada columna de texto.
+        range_indexes (dict): Un diccionario con el índice ordenado de cada
+            columna de RANGE_COLUMNS.
+        model_years (np.ndarray): Año modelo de cada fila.
+        facet_codes (dict): Un diccionario con los códigos enteros de cada
+            fila y los valores de cada columna de FACET_COLUMNS.
+        efficiency (np.ndarray): Rendimiento en ciudad de cada fila.
+        parser (QueryParser): Intérprete de búsquedas de texto libre con el
+            vocabulario del catálogo.
+        similarity (SimilarityIndex): Árbol k-d con las columnas de
+            SIMILARITY_COLUMNS estandarizadas.
+        metrics (dict): Un diccionario con los valores de cada columna
+            numérica del análisis convertidos a float64.
+        complete (np.ndarray): Arreglo booleano que indica las filas sin
+            valores nulos.
+
+    Métodos:
+        __init__(vehicles, version, index_array, prices): Prepara los
+            datos y construye los índices del catálogo.
+        memory_report(): Devuelve la memoria que ocupa cada columna del
+            catálogo y la que ocuparía con los tipos por defecto de pandas.
+        _prepare_data(): Convierte las columnas del DataFrame a los tipos de
+            datos correctos.
+        _build_indexes(index_array): Construye los índices del catálogo.
+        _build_metrics(): Convierte las columnas numéricas del análisis.
+        estimates(prices, date): Devuelve las estimaciones anuales de cada
+            vehículo con los precios vigentes del combustible.
+    """
+
+    # Definir las columnas de texto de la búsqueda
+    TEXT_COLUMNS = ['marca',
+                    'submarca',
+                    'version']
+
+    # Definir las columnas que se codifican como categorías
+    CATEGORICAL_COLUMNS = ['marca',
+                           'submarca',
+                           'version',
+                           'combustible',
+                           'categoria',
+                           'transmision']
+
+    # Definir las columnas numéricas que admiten filtros por rango
+    RANGE_COLUMNS = (VehicleAnalyzer.CUANTITATIVAS
+                     + VehicleAnalyzer.CUANTITATIVAS_DISCRETAS)
+
+    # Definir las columnas para las que se cuentan los resultados
+    FACET_COLUMNS = ['marca',
+                     'modelo',
+                     'combustible',
+                     'categoria',
+                     'transmision']
+
+    # Definir las columnas con las que se comparan los vehículos similares
+    SIMILARITY_COLUMNS = ['rendimiento_ciudad',
+                          'rendimiento_carretera',
+                          'rendimiento_combinado',
+                          'co2',
+                          'nox',
+                          'potencia',
+                          'tamano']
+
+
+    def __init__(self,
+                 vehicles: pd.DataFrame,
+                 version: int = 0,
+                 index_array=None,
+                 prices=None):
+        """
+        Prepara los datos y construye los índices del catálogo.
+
+        Args:
+            vehicles (pd.DataFrame): DataFrame con el catálogo de vehículos.
+                El catálogo pasa a ser propiedad de la instancia.
+            version (int): Versión del snapshot del que proviene el catálogo.
+            index_array (callable): Función que recibe una columna y un tipo
+                de arreglo ('order' o 'sorted') y devuelve el arreglo de
+                índice guardado en el snapshot o None, como
+                CatalogStore.index_array.
+            prices (FuelPriceTable): Tabla de precios del combustible con
+                la que se precalculan las estimaciones anuales, o None para
+                calcularlas en el primer análisis.
+
+        Returns:
+            None
+        """
+        self.version = version
+        self.vehicles = vehicles
+        self._prepare_data()
+        self._build_indexes(index_array or (lambda column, kind: None))
+        self._build_metrics()
+        
+        # Impedir que las búsquedas modifiquen los índices compartidos; los
+        # arreglos de objetos pueden ser las categorías de las columnas, que
+        # pandas necesita escribibles para medir su memoria
+        for array in self._index_arrays(set()):
+            if array.dtype != object:
+                array.flags.writeable = False
+        
+        # Precalcular las estimaciones anuales con los precios vigentes
+        self._estimates = (None, None)
+        if prices is not None:
+            self.estimates(prices)
+
+    def __len__(self) -> int:
+        """Número de vehículos del catálogo."""
+        return len(self.vehicles)
+
+    def memory_report(self) -> dict:
+        """
+        Devuelve la memoria que ocupa cada columna del catálogo y la que
+        ocuparía con los tipos por defecto de pandas (int64, float64 y
+        textos como objetos), junto con la memoria de los índices. La
+        memoria mapeada desde el snapshot se comparte entre todos los
+        workers del servidor, por lo que se indica por separado.
+
+        Args:
+            Self
+
+        Returns:
+            dict: Un diccionario con una lista con el nombre, el tipo, los
+            bytes, los bytes con los tipos por defecto y si está mapeada
+            de cada columna ('columns'), los bytes de los índices mapeados y
+            propios del proceso ('indexes') y los totales ('total').
+        """
+        columns = []
+        addresses = set()
+        for name in self.vehicles.columns:
+            column = self.vehicles[name]
+            if isinstance(column.dtype, pd.CategoricalDtype) or \
+                    column.dtype == object:
+                default = column.astype(object).memory_usage(deep=True,
+                                                             index=False)
+                values = (column.cat.codes.to_numpy()
+                          if isinstance(column.dtype, pd.CategoricalDtype)
+                          else column.to_numpy())
+            else:
+                default = len(column) * 8
+                values = column.to_numpy()
+            addresses.add(values.__array_interface__['data'][0])
+            columns.append({
+                'name': name,
+                'dtype': str(column.dtype),
+                'bytes': int(column.memory_usage(deep=True, index=False)),
+                'default_bytes': int(default),
+                'mapped': self._is_mapped(values)})
+
+        # Sumar los arreglos de los índices según estén mapeados o no
+        indexes = {'mapped': 0, 'private': 0}
+        for array in self._index_arrays(addresses):
+            indexes['mapped' if self._is_mapped(array) else 'private'] += \
+                int(array.nbytes)
+
+        total = {
+            'bytes': sum(column['bytes'] for column in columns),
+            'default_bytes': sum(column['default_bytes']
+                                 for column in columns),
+            'mapped': (sum(column['bytes'] for column in columns
+                           if column['mapped']) + indexes['mapped'])}
+        total['private'] = (total['bytes'] + indexes['mapped']
+                            + indexes['private'] - total['mapped'])
+        return {'columns': columns, 'indexes': indexes, 'total': total}
+
+    def _index_arrays(self, exclude: set) -> list:
+        """
+        Obtiene los arreglos de numpy de todos los índices del catálogo.
+
+        Args:
+            exclude (set): Direcciones de memoria de los arreglos que no se
+                deben incluir, como los de las columnas del catálogo.
+
+        Returns:
+            list: Lista de arreglos, sin repetir los que comparten varios
+            índices.
+        """
+        arrays = {}
+        pending = [self.indexes, self.fuzzy_indexes, self.completers,
+                   self.range_indexes, self.facet_codes, self.model_years,
+                   self.efficiency, self.similarity.tree.data,
+                   self.similarity.tree.indices, self.metrics,
+                   self.complete]
+        while pending:
+            value = pending.pop()
+            if isinstance(value, np.ndarray):
+                address = value.__array_interface__['data'][0]
+                if address not in exclude:
+                    arrays.setdefault((address, value.nbytes), value)
+            elif isinstance(value, dict):
+                pending.extend(value.values())
+            elif isinstance(value, (list, tuple)):
+                pending.extend(value)
+            elif hasattr(value, '__dict__'):
+                pending.extend(vars(value).values())
+        return list(arrays.values())
+
+    def _is_mapped(self, array: np.ndarray) -> bool:
+        """
+        Comprueba si un arreglo está mapeado desde un archivo del snapshot.
+
+        Args:
+            array (np.ndarray): Arreglo de numpy.
+
+        Returns:
+            bool: True si el arreglo o alguno de sus arreglos base está
+            mapeado en memoria.
+        """
+        while array is not None:
+            if isinstance(array, (np.memmap, mmap.mmap)):
+                return True
+            array = getattr(array, 'base', None)
+        return False
+
+    def _prepare_data(self):
+        """Convierte las columnas del DataFrame a los tipos de datos
+        correctos.
+
+        Args:
+            Self
+
+        Returns:
+            None
+        """
+        # Convertir las columnas a los tipos de datos correctos. Las
+        # columnas que ya tienen el tipo correcto no se convierten, para no
+        # copiar las columnas mapeadas desde el snapshot
+        if not np.issubdtype(self.vehicles['modelo'].dtype, np.integer):
+            self.vehicles['modelo'] = self.vehicles['modelo'].astype(int)
+
+        # Codificar las columnas de texto como categorías para guardar cada
+        # valor distinto una sola vez y compararlo mediante códigos enteros
+        for column in self.CATEGORICAL_COLUMNS:
+            if isinstance(self.vehicles[column].dtype, pd.CategoricalDtype):
+                continue
+            if column in self.TEXT_COLUMNS:
+                self.vehicles[column] = self.vehicles[column].astype(str)
+            self.vehicles[column] = self.vehicles[column].astype('category')
+
+    def _build_indexes(self, index_array):
+        """
+        Construye los índices de n-gramas de las columnas categóricas, con
+        sus tablas de búsqueda normalizadas, los índices de similitud de las
+        columnas de texto, los arreglos de autocompletado, los índices
+        ordenados de las columnas numéricas, los códigos de las facetas, el
+        intérprete de búsquedas de texto libre, el árbol k-d de vehículos
+        similares y guarda los valores numéricos que se usan en la búsqueda
+        como arreglos.
+
+        Args:
+            index_array (callable): Función que devuelve los arreglos de
+                índice guardados en el snapshot.
+
+        Returns:
+            None
+        """
+        # Usar las permutaciones ordenadas guardadas en el snapshot
+        self.indexes = {column: NGramIndex(self.vehicles[column],
+                                           order=index_array(column, 'order'))
+                        for column in self.CATEGORICAL_COLUMNS}
+        self.fuzzy_indexes = {column: FuzzyIndex(self.indexes[column].values)
+                              for column in self.TEXT_COLUMNS}
+        self.completers = {}
+        for column in self.TEXT_COLUMNS:
+            categorical = self.vehicles[column].cat
+            counts = np.bincount(categorical.codes[categorical.codes >= 0],
+                                 minlength=len(categorical.categories))
+            self.completers[column] = PrefixCompleter(
+                categorical.categories, counts)
+        self.model_years = self.vehicles['modelo'].to_numpy()
+        self.range_indexes = {
+            column: NumericRangeIndex(self.vehicles[column],
+                                      order=index_array(column, 'order'),
+                                      values=index_array(column, 'sorted'))
+            for column in self.RANGE_COLUMNS}
+
+        # Guardar los códigos enteros y los valores de cada faceta
+        self.facet_codes = {}
+        for column in self.FACET_COLUMNS:
+            if column in self.indexes:
+                codes = self.indexes[column].codes
+                values = self.vehicles[column].cat.categories
+            else:
+                codes, values = pd.factorize(self.vehicles[column], sort=True)
+            self.facet_codes[column] = (codes, list(values))
+        self.efficiency = self.vehicles['rendimiento_ciudad'].to_numpy(
+            dtype=np.float64)
+
+        # Usar el vocabulario de las columnas categóricas para interpretar
+        # las búsquedas de texto libre
+        years = None
+        if len(self.model_years):
+            years = (int(self.model_years.min()), int(self.model_years.max()))
+        self.parser = QueryParser(
+            {column: index.values for column, index in self.indexes.items()},
+            years, self.fuzzy_indexes)
+
+        # Construir el árbol k-d de vehículos similares
+        self.similarity = SimilarityIndex(
+            self.vehicles[self.SIMILARITY_COLUMNS])
+
+    def _build_metrics(self):
+        """
+        Convierte una sola vez las columnas numéricas del análisis de
+        vehículos a float64, con los mismos valores que reciben los análisis
+        de los registros de las búsquedas: las columnas float32 toman el
+        decimal más corto que las representa y los textos que no son
+        números, como '?', se convierten en NaN.
+
+        Args:
+            Self
+
+        Returns:
+            None
+        """
+        self.metrics = {}
+        for column in (VehicleAnalyzer.CUANTITATIVAS_DISCRETAS
+                       + VehicleAnalyzer.CUANTITATIVAS):
+            values = self.vehicles[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(object)
+            if values.dtype == np.float32:
+                self.metrics[column] = values.to_numpy().astype(str).astype(
+                    np.float64)
+            else:
+                self.metrics[column] = pd.to_numeric(
+                    values, errors='coerce').to_numpy(dtype=np.float64)
+        self.complete = self.vehicles.notna().all(axis=1).to_numpy()
+
+    def estimates(self, prices, date=None) -> dict:
+        """
+        Devuelve las emisiones anuales de CO2 y NOx y el costo anual del
+        combustible de cada vehículo del catálogo. Se calculan con los
+        precios vigentes en la fecha y se guardan hasta que esos precios
+        cambien, por ejemplo al entrar en vigencia un precio nuevo.
+
+        Args:
+            prices (FuelPriceTable): Tabla de precios del combustible.
+            date (datetime.date): Fecha de los precios. Por defecto es hoy.
+
+        Returns:
+            dict: Un diccionario con los arreglos de solo lectura de
+            VehicleAnalyzer.estimate para todas las filas.
+        """
+        key = prices.version(date)
+        saved_key, estimates = self._estimates
+        if saved_key == key:
+            return estimates
+
+        estimates = VehicleAnalyzer.estimate(
+            self.metrics['co2'], self.metrics['nox'],
+            self.metrics['rendimiento_ciudad'],
+            prices.prices(self.vehicles['combustible'], date))
+        for array in estimates.values():
+            array.flags.writeable = False
+
+        # Reemplazar las estimaciones guardadas con una sola asignación
+        self._estimates = (key, estimates)
+        return estimates